@@ -0,0 +1,213 @@
+import os
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from StorageManager import StorageManager
+from storagemanager_helper.slotted_page import PAGE_SIZE, SlottedPageView
+from storagemanager_helper.predicate import match_all, project
+from storagemanager_helper.result_cache import retrieval_key
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def _read_page(files, table_path, page_id):
+    with files.open(table_path) as f:
+        f.seek(page_id * PAGE_SIZE)
+        page_bytes = f.read(PAGE_SIZE)
+    if len(page_bytes) < PAGE_SIZE:
+        page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
+    return page_bytes
+
+
+class _TableGate:
+    """asyncio reader/writer gate: reads share a table, writes get it alone.
+    Waiting writers hold off new readers, so a stream of reads cannot
+    starve a write (as in locking.ReadWriteLock)."""
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    async def acquire_read(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writing and not self._waiting_writers)
+            self._readers += 1
+
+    async def release_read(self):
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self):
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writing and self._readers == 0)
+            finally:
+                self._waiting_writers -= 1
+                # Readers held off by a writer that gave up may go ahead
+                self._condition.notify_all()
+            self._writing = True
+
+    async def release_write(self):
+        async with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+class AsyncStorageManager:
+    """asyncio facade over StorageManager.
+
+    Blocking page I/O runs on a bounded thread pool. Concurrent identical
+    read_block / get_stats calls, and concurrent scans touching the same
+    page, share one in-flight executor job instead of each doing the work.
+    """
+
+    def __init__(self, storage_manager=None, base_path='data', max_workers=4, readahead=4):
+        self.storage_manager = storage_manager if storage_manager is not None else StorageManager(base_path)
+        self.readahead = readahead
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._inflight = {}
+        self._table_versions = {}
+        self._gates = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+        self.storage_manager.close()
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _coalesce(self, key, fn, *args):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run(fn, *args))
+            self._inflight[key] = future
+
+            def _forget(done):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            future.add_done_callback(_forget)
+        # Shield so one cancelled caller does not cancel the work others share
+        return asyncio.shield(future)
+
+    def _gate(self, table):
+        gate = self._gates.get(table)
+        if gate is None:
+            gate = self._gates[table] = _TableGate()
+        return gate
+
+    def _version(self, table):
+        return self._table_versions.get(table, 0)
+
+    async def _write(self, table, fn, *args):
+        gate = self._gate(table)
+        await gate.acquire_write()
+        try:
+            return await self._run(fn, *args)
+        finally:
+            # Reads issued after this point must not join work that saw the old data
+            self._table_versions[table] = self._version(table) + 1
+            await gate.release_write()
+
+    async def read_block(self, data_retrieval: DataRetrieval):
+        table = data_retrieval.table
+        gate = self._gate(table)
+        await gate.acquire_read()
+        try:
+            key = ('read', self._version(table), retrieval_key(data_retrieval))
+            rows = await self._coalesce(key, self.storage_manager.read_block, data_retrieval)
+        finally:
+            await gate.release_read()
+        # Callers sharing one result each get their own row dicts
+        return [dict(row) for row in rows]
+
+    async def write_block(self, data_write):
+        return await self._write(data_write.table, self.storage_manager.write_block, data_write)
+
+    async def delete_block(self, data_deletion):
+        return await self._write(data_deletion.table, self.storage_manager.delete_block, data_deletion)
+
+    async def get_stats(self, table_name=None):
+        if table_name:
+            key = ('stats', self._version(table_name), table_name)
+        else:
+            key = ('stats', tuple(sorted(self._table_versions.items())), None)
+        return await self._coalesce(key, self.storage_manager.get_stats, table_name)
+
+    async def _get_page(self, table, table_path, page_id):
+        key = ('page', self._version(table), table_path, page_id)
+        return await self._coalesce(key, _read_page, self.storage_manager.files, table_path, page_id)
+
+    def _decode_page(self, schema, page_bytes, conditions, columns):
+        serializer = self.storage_manager.row_serializer
+        rows = []
+        for _, record_bytes in SlottedPageView(page_bytes).iter_records():
+            row = serializer.deserialize(schema, record_bytes)
+            if match_all(row, conditions):
+                rows.append(project(row, columns))
+        return rows
+
+    async def _scan_page(self, gate, table, table_path, page_id, schema, conditions, columns):
+        # The gate is held only while this one page is read and decoded
+        await gate.acquire_read()
+        try:
+            page_bytes = await self._get_page(table, table_path, page_id)
+            return await self._run(self._decode_page, schema, page_bytes, conditions, columns)
+        finally:
+            await gate.release_read()
+
+    async def scan(self, data_retrieval: DataRetrieval):
+        """Asynchronously iterate the rows of a full table scan, page by page.
+
+        Usage: async for row in asm.scan(DataRetrieval(...)). Pages are read
+        ahead on the executor and shared with any concurrent scan of the same
+        table. The table is only gated while a page is read, never while
+        rows are handed out, so the consumer may write to the table
+        mid-scan; pages read after such a write reflect it. An ordered
+        retrieval is not a page-order scan, so it is answered by read_block
+        instead.
+        """
+        table = data_retrieval.table
+        schema, columns, conditions = self.storage_manager._validate_retrieval(data_retrieval)
+        if data_retrieval.order_by is not None:
+            for row in await self.read_block(data_retrieval):
+                yield row
+            return
+        remaining = data_retrieval.limit
+        if remaining == 0:
+            return
+        table_path = self.storage_manager._get_table_file_path(table)
+        if not os.path.exists(table_path):
+            raise FileNotFoundError(f"File data '{table_path}' tidak ditemukan")
+
+        gate = self._gate(table)
+        pending = deque()
+        try:
+            page_count = -(-(await self._run(os.path.getsize, table_path)) // PAGE_SIZE)
+            next_page = 0
+            while next_page < page_count or pending:
+                while next_page < page_count and len(pending) < self.readahead:
+                    pending.append(asyncio.ensure_future(self._scan_page(
+                        gate, table, table_path, next_page, schema, conditions, columns
+                    )))
+                    next_page += 1
+
+                for row in await pending.popleft():
+                    yield row
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining == 0:
+                            return
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from StorageManager import StorageManager
+from storagemanager_helper.data_generator import DataGenerator
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.condition import Condition
+
+OPERATIONS = [
+    "index_build", "point_lookup", "range_scan", "full_scan",
+    "insert", "update", "delete", "get_stats",
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "total_s": round(total, 6),
+        "ops_per_s": round(len(ordered) / total, 3) if total > 0 else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if ordered else 0.0,
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.student_rows = args.rows
+        self.next_student_id = args.rows + 1
+
+    def run(self):
+        args = self.args
+        base_path = args.base_path or tempfile.mkdtemp(prefix="sm_bench_")
+        results = {}
+        try:
+            row_counts = {
+                "Student": args.rows,
+                "Course": max(1, args.rows // 10),
+                "Attends": args.rows,
+            }
+            start = time.perf_counter()
+            DataGenerator(args.seed).create_database(base_path, row_counts)
+            results["load"] = {"rows": sum(row_counts.values()), "total_s": round(time.perf_counter() - start, 6)}
+            print(f"Loaded {results['load']['rows']} rows in {results['load']['total_s']:.2f}s")
+
+            sm = StorageManager(
+                base_path,
+                parallel_workers=args.parallel_workers,
+                wal=args.wal,
+                stats_mode=args.stats_mode,
+            )
+            try:
+                for operation in args.operations:
+                    latencies = getattr(self, f"bench_{operation}")(sm)
+                    results[operation] = summarize(latencies)
+                    summary = results[operation]
+                    print(f"{operation:>14}: {summary['count']:>6} ops  "
+                          f"p50 {summary['p50_ms']:.3f}ms  p99 {summary['p99_ms']:.3f}ms  "
+                          f"{summary['ops_per_s'] or 0:.1f} ops/s")
+            finally:
+                sm.close()
+        finally:
+            if not args.keep:
+                shutil.rmtree(base_path, ignore_errors=True)
+
+        return {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "rows": args.rows,
+                "ops": args.ops,
+                "write_ops": args.write_ops,
+                "seed": args.seed,
+                "wal": args.wal,
+                "parallel_workers": args.parallel_workers,
+                "stats_mode": args.stats_mode,
+            },
+            "results": results,
+        }
+
+    def random_student_id(self):
+        return self.rng.randint(1, self.student_rows)
+
+    def bench_index_build(self, sm):
+        return [
+            timed(sm._set_index, "Student", "StudentID", "hash"),
+            timed(sm._set_index, "Student", "GPA", "btree"),
+            timed(sm._set_index, "Course", "Year", "btree"),
+        ]
+
+    def bench_point_lookup(self, sm):
+        return [
+            timed(sm.read_block, DataRetrieval("Student", "*", [Condition("StudentID", "=", self.random_student_id())]))
+            for _ in range(self.args.ops)
+        ]
+
+    def bench_range_scan(self, sm):
+        latencies = []
+        for _ in range(self.args.ops):
+            low = round(self.rng.uniform(2.0, 3.9), 2)
+            retrieval = DataRetrieval("Student", "*", [Condition("GPA", ">=", low), Condition("GPA", "<", round(low + 0.05, 2))])
+            latencies.append(timed(sm.read_block, retrieval))
+        return latencies
+
+    def bench_full_scan(self, sm):
+        # FullName is never indexed, so every call reads the whole table
+        return [
+            timed(sm.read_block, DataRetrieval("Student", "*", [Condition("FullName", "=", "Alice Anderson")]))
+            for _ in range(max(1, self.args.write_ops // 10))
+        ]
+
+    def bench_insert(self, sm):
+        latencies = []
+        for _ in range(self.args.ops):
+            row = {"StudentID": self.next_student_id, "FullName": "Bench Mark", "GPA": round(self.rng.uniform(2.0, 4.0), 2)}
+            self.next_student_id += 1
+            latencies.append(timed(sm.write_block, DataWrite("Student", None, [], row)))
+        return latencies
+
+    def bench_update(self, sm):
+        return [
+            timed(sm.write_block, DataWrite(
+                "Student", "GPA", [Condition("StudentID", "=", self.random_student_id())], round(self.rng.uniform(2.0, 4.0), 2)
+            ))
+            for _ in range(self.args.write_ops)
+        ]
+
+    def bench_delete(self, sm):
+        return [
+            timed(sm.delete_block, DataDeletion("Student", [Condition("StudentID", "=", self.random_student_id())]))
+            for _ in range(self.args.write_ops)
+        ]
+
+    def bench_get_stats(self, sm):
+        # The first call may analyze; the rest should be catalog lookups
+        return [timed(sm.get_stats, "Student") for _ in range(self.args.ops)]
+
+
+def compare(baseline_path, current, threshold):
+    """Print per-operation changes against a saved run; returns the regressions."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\nComparison with {baseline_path} (revision {baseline['meta'].get('revision')})")
+    for operation, result in current["results"].items():
+        old = baseline["results"].get(operation)
+        if not old or "p50_ms" not in result or "p50_ms" not in old or not old["p50_ms"]:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"]
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(operation)
+        print(f"{operation:>14}: p50 {old['p50_ms']:.3f}ms -> {result['p50_ms']:.3f}ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="StorageManager benchmark")
+    parser.add_argument("--rows", type=int, default=10000, help="Student rows to generate (10^4 - 10^7)")
+    parser.add_argument("--ops", type=int, default=1000, help="Operations per lookup/insert/stats benchmark")
+    parser.add_argument("--write-ops", type=int, default=50, help="Operations for update/delete (full scans each)")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help="Comma separated subset of " + ",".join(OPERATIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-path", help="Directory for the generated database (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated database")
+    parser.add_argument("--wal", action="store_true")
+    parser.add_argument("--parallel-workers", type=int, default=0)
+    parser.add_argument("--stats-mode", choices=["exact", "sketch"], default="exact")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    args.operations = [op.strip() for op in args.operations.split(",") if op.strip()]
+    unknown = [op for op in args.operations if op not in OPERATIONS]
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = Benchmark(args).run()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(args.compare, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,216 @@
 import os
 import math
+import random
+import shutil
+import threading
+from collections import Counter
+from itertools import islice
+from contextlib import contextmanager, closing, nullcontext
 from storagemanager_helper.row_serializer import RowSerializer
 from storagemanager_model.statistic import Statistic
 from storagemanager_helper.schema_manager import SchemaManager
-from storagemanager_helper.slotted_page import SlottedPage, PAGE_SIZE
+from storagemanager_helper.slotted_page import SlottedPage, SlottedPageView, PAGE_SIZE, HEADER_SIZE, SLOT_SIZE, read_page_view, iter_page_views
 from storagemanager_model.condition import Condition
 from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_aggregation import DataAggregation
+from storagemanager_model.data_join import DataJoin
+from storagemanager_model.query_plan import QueryPlan
 from storagemanager_model.index import HashIndexEntry
-from storagemanager_helper.index import HashIndexManager, BPlusTreeIndexManager
+from storagemanager_helper.index import HashIndexManager, BPlusTreeIndexManager, COMPOSITE_SEPARATOR, key_columns, index_key
+from storagemanager_helper.predicate import match_all, match_condition, project, coerce_operand, coerce_conditions
+from storagemanager_helper.locking import LockManager
+from storagemanager_helper.wal import WriteAheadLog, WAL_FILENAME
+from storagemanager_helper.batch import BatchSession
+from storagemanager_helper.metrics import Metrics, count
+from storagemanager_helper.file_pool import FileHandlePool
+from storagemanager_helper.stats_catalog import StatsCatalog, TableStats, estimate_distinct, MAX_EXACT_DISTINCT
+from storagemanager_helper.clustering import ClusterCatalog, ClusterSpec, REINDEX_SUFFIX, sort_key
+from storagemanager_helper.hyperloglog import HyperLogLog, precision_for_error
+from storagemanager_helper.histogram import (
+    ColumnHistogram, Reservoir, NUM_BUCKETS, NUM_MCV, DEFAULT_EQ_SELECTIVITY, DEFAULT_RANGE_SELECTIVITY,
+    widen, extremes_selectivity
+)
+from storagemanager_helper.parallel_scan import ParallelScanner, scan_pages, collect_column, collect_stats, collect_sketches, aggregate_pages
+from storagemanager_helper.aggregation import AGGREGATE_FUNCTIONS, AggregateSet, aggregate_records, merge_groups
+from storagemanager_helper.ordering import RowCollector
+from storagemanager_helper.external_sort import ExternalSorter, SORT_DIRNAME, DEFAULT_SORT_MEMORY
+from storagemanager_helper.join import JOIN_METHODS, JOIN_BATCH_ROWS, JOIN_BATCH_PAGES, HashJoin, merge_join, qualify
+from storagemanager_helper.bloom import BloomFilter, BloomFilterManager, DEFAULT_BITS_PER_KEY, filter_size
+from storagemanager_helper.zone_map import ZoneMap, ZoneMapManager
+from storagemanager_helper.result_cache import ResultCache, retrieval_key
+
+# Exact-mode histograms are rebuilt once this share of the rows has changed
+HISTOGRAM_REFRESH_FRACTION = 0.1
+
+
 class StorageManager:
-    def __init__(self, base_path='data'):
+    def __init__(self, base_path='data', parallel_workers=0, wal=False,
+                 group_commit_delay=0.0, checkpoint_bytes=16 * 1024 * 1024, stats_save_interval=1000,
+                 stats_mode='exact', stats_sample_rate=1.0, stats_error_bound=0.01, stats_max_sample_pages=1024,
+                 stats_max_exact_distinct=MAX_EXACT_DISTINCT,
+                 trace_hook=None, collect_metrics=True, max_open_files=32, sort_memory_bytes=DEFAULT_SORT_MEMORY,
+                 result_cache_bytes=0):
         self.base_path = base_path
         self.storage_path = base_path
         self.row_serializer = RowSerializer()
         self.schema_manager = SchemaManager(base_path)
         self.hash_index_manager = HashIndexManager(base_path)
         self.bplus_tree_index_manager = BPlusTreeIndexManager(base_path)
+        self.bloom_filter_manager = BloomFilterManager(base_path)
+        self.zone_map_manager = ZoneMapManager(base_path)
+        # Full scans, stats and index rebuilds fan out over worker processes
+        # when parallel_workers > 0; the default keeps everything in-process
+        self.parallel_scanner = ParallelScanner(parallel_workers) if parallel_workers > 0 else None
+        self.locks = LockManager()
+        # trace_hook, if given, is called with an OperationTrace after every
+        # public call; metrics() returns the running totals. collect_metrics
+        # False drops the few microseconds this adds to each call
+        self._metrics = Metrics(trace_hook, enabled=collect_metrics)
+        # Table files stay open between calls; paths are resolved once per table
+        self.files = FileHandlePool(max_open_files)
+        self._table_paths = {}
+        # Indexes per table and index type, so writes do not list the index
+        # directory each time; _set_index refreshes a table's entry
+        self._table_indexes = {}
+        # Memory each sort (sort_block, index builds, cluster) may buffer
+        # before spilling sorted runs to disk
+        self.sort_memory_bytes = sort_memory_bytes
+        # result_cache_bytes > 0 keeps read_block results, up to that much
+        # memory, until a write to their table
+        self.result_cache = ResultCache(result_cache_bytes) if result_cache_bytes > 0 else None
         
         if not os.path.exists(self.storage_path):
             os.makedirs(self.storage_path)
+        # Runs of sorts cut short by a crash
+        shutil.rmtree(os.path.join(self.storage_path, SORT_DIRNAME), ignore_errors=True)
         
         schema_file = os.path.join(self.storage_path, 'schema.dat')
         if os.path.exists(schema_file):
             self.schema_manager.load_schemas()
+        for table in self.schema_manager.list_tables():
+            self._get_table_file_path(table)
+
+        # A log left by a crashed WAL-enabled instance is always redone, even
+        # when this instance does not log its own writes
+        self._recover()
+        self._finish_interrupted_cluster()
+        self.cluster_catalog = ClusterCatalog(base_path)
+        self.cluster_catalog.load()
+
+        self.checkpoint_bytes = checkpoint_bytes
+        self.wal = WriteAheadLog(base_path, group_commit_delay) if wal else None
+        self._dirty_lock = threading.Lock()
+        self._dirty_indexes = set()
+        self._unsynced_tables = set()
+
+        # stats_mode 'exact' keeps a value count per distinct value; 'sketch'
+        # keeps a HyperLogLog per column (precision from stats_error_bound)
+        # and may analyze a page sample of at most stats_max_sample_pages.
+        # An exact-mode column past stats_max_exact_distinct distinct values
+        # falls back to a sketch
+        if stats_mode not in ('exact', 'sketch'):
+            raise ValueError("stats_mode must be 'exact' or 'sketch'")
+        if not 0 < stats_sample_rate <= 1:
+            raise ValueError("stats_sample_rate must be in (0, 1]")
+        self.stats_mode = stats_mode
+        self.stats_sample_rate = stats_sample_rate
+        self.stats_precision = precision_for_error(stats_error_bound)
+        self.stats_max_sample_pages = stats_max_sample_pages
+        self.stats_save_interval = stats_save_interval
+        self.stats_catalog = StatsCatalog(base_path, stats_max_exact_distinct, self.stats_precision)
+        self.stats_catalog.load(self._table_fingerprints())
+        for table, table_stats in list(self.stats_catalog.tables.items()):
+            # Entries gathered in the other stats_mode are re-analyzed in this one
+            if (table_stats.sketches is not None) != (stats_mode == 'sketch'):
+                self.stats_catalog.invalidate(table)
 
     def _get_table_file_path(self, table_name: str) -> str:
+        cached_path = self._table_paths.get(table_name)
+        if cached_path is not None:
+            return cached_path
+
         exact_path = os.path.join(self.base_path, f"{table_name}.dat")
-        if os.path.exists(exact_path):
-            return exact_path
-        
         lower_path = os.path.join(self.base_path, f"{table_name.lower()}.dat")
-        if os.path.exists(lower_path):
-            return lower_path
-        
         upper_path = os.path.join(self.base_path, f"{table_name.upper()}.dat")
-        if os.path.exists(upper_path):
-            return upper_path
+        for path in (exact_path, lower_path, upper_path):
+            if os.path.exists(path):
+                # Only paths that exist are remembered, so a table file
+                # created later is still found
+                self._table_paths[table_name] = path
+                return path
         
         return lower_path
 
-    def read_block(self, data_retrieval: DataRetrieval):
+    def _table_file_exists(self, table_name):
+        return table_name in self._table_paths or os.path.exists(self._get_table_file_path(table_name))
+
+    def _list_indexes(self, manager, table_name):
+        indexes = self._table_indexes.get((table_name, manager))
+        if indexes is None:
+            indexes = self._table_indexes[(table_name, manager)] = manager.list_indexes(table_name)
+        return indexes
+
+    def _invalidate_indexes(self, table_name):
+        """Forget the cached index list of a table; call after creating or
+        dropping one of its indexes."""
+        for manager in (self.hash_index_manager, self.bplus_tree_index_manager):
+            self._table_indexes.pop((table_name, manager), None)
+
+    def _invalidate_table_file(self, table_name):
+        """Forget the resolved path and pooled handle of a table file; call
+        after dropping, renaming or replacing it."""
+        path = self._table_paths.pop(table_name, None)
+        if path is not None:
+            self.files.invalidate(path)
+
+    def _parallel_page_count(self, table_path):
+        if self.parallel_scanner is None:
+            return 0
+        page_count = -(-os.path.getsize(table_path) // PAGE_SIZE)
+        if not self.parallel_scanner.should_parallelize(page_count):
+            return 0
+        return page_count
+
+    def _parallel_map(self, fn, table_path, schema, page_count, *args):
+        # Workers cannot report into this thread's trace, so their page reads
+        # are charged up front
+        count('pages_read', page_count)
+        count('bytes_read', page_count * PAGE_SIZE)
+        return self.parallel_scanner.map(fn, table_path, schema, page_count, *args)
+
+    def _sorter(self, key=None, reverse=False, memory_bytes=None):
+        return ExternalSorter(os.path.join(self.storage_path, SORT_DIRNAME), key, reverse,
+                              memory_bytes or self.sort_memory_bytes)
+
+    def batch(self, tables=None):
+        """Start a BatchSession: `with sm.batch() as b: b.write_block(...)`.
+        A batch writing to several tables should list them in tables."""
+        return BatchSession(self, tables)
+
+    def metrics(self, reset=False):
+        """Snapshot of the I/O and CPU counters and latency histograms, per
+        operation and per table. reset=True starts a new measuring window."""
+        snapshot = self._metrics.snapshot()
+        if reset:
+            self._metrics.reset()
+        return snapshot
+
+    def set_trace_hook(self, trace_hook):
+        """Call trace_hook(OperationTrace) after every public call; None stops tracing."""
+        self._metrics.trace_hook = trace_hook
+
+    def close(self):
+        if self.wal is not None:
+            self.checkpoint()
+            self.wal.close()
+            self.wal = None
+        elif self.stats_catalog.unsaved_changes:
+            self.save_stats()
+        if self.parallel_scanner is not None:
+            self.parallel_scanner.close()
+        self.files.close()
+
+    def _validate_retrieval(self, data_retrieval: DataRetrieval):
         table = data_retrieval.table
         columns = data_retrieval.column
         conditions = data_retrieval.conditions or []
@@ -61,335 +232,1643 @@ class StorageManager:
             if cond.column not in schema_attrs:
                 raise ValueError(f"Kolom '{cond.column}' tidak ada di tabel '{table}'")
 
-        index_used = False
-        results = []
+        order_by = data_retrieval.order_by
+        if order_by is not None and order_by not in schema_attrs:
+            raise ValueError(f"Kolom '{order_by}' tidak ada di tabel '{table}'")
+        limit = data_retrieval.limit
+        if limit is not None and (not isinstance(limit, int) or limit < 0):
+            raise ValueError("limit must be a non-negative integer")
+
+        return schema, columns, coerce_conditions(schema, conditions)
+
+    def read_block(self, data_retrieval: DataRetrieval):
+        with self._metrics.operation('read_block', data_retrieval.table):
+            if self.result_cache is not None:
+                key = retrieval_key(data_retrieval)
+                results = self.result_cache.get(key)
+                if results is not None:
+                    count('rows_matched', len(results))
+                    return results
+                # Taken before the rows are read, so a write that lands
+                # meanwhile keeps them out of the cache
+                version = self.result_cache.version(data_retrieval.table)
+
+            with self.locks.table(data_retrieval.table).read():
+                results = self._read_block(data_retrieval)
+            if self.result_cache is not None:
+                self.result_cache.put(key, version, results)
+            count('rows_matched', len(results))
+            return results
+
+    def sort_block(self, data_retrieval: DataRetrieval, memory_bytes=None):
+        """Iterator over the rows read_block would return, for retrievals
+        with an order_by, that holds at most memory_bytes (default
+        sort_memory_bytes) of them in memory. A full scan is sorted
+        externally: sorted runs are spilled under base_path and their merge
+        streamed back. The table is locked only while the runs are made."""
+        if data_retrieval.order_by is None:
+            raise ValueError("sort_block needs an order_by column")
+        with self._metrics.operation('sort_block', data_retrieval.table):
+            with self.locks.table(data_retrieval.table).read():
+                return self._sort_block(data_retrieval, memory_bytes)
 
+    def _sort_block(self, data_retrieval: DataRetrieval, memory_bytes=None):
+        table = data_retrieval.table
+        schema, columns, conditions = self._validate_retrieval(data_retrieval)
+        order_by = data_retrieval.order_by
+
+        access_path, index_column, _ = self._choose_access_path(table, conditions)
+        if (data_retrieval.limit is not None or access_path != 'full_scan'
+                or self._order_index(table, order_by, access_path, index_column) is not None):
+            # A top-K heap, an index range or an index walk already keeps
+            # this bounded or in order
+            return iter(self._read_block(data_retrieval))
+
+        table_path = self._get_table_file_path(table)
+        if not self._table_file_exists(table):
+            raise FileNotFoundError(f"File data '{table_path}' tidak ditemukan")
+
+        # Runs hold raw records, decoded again only as they are streamed out
+        read_order = self.row_serializer.column_reader(schema, (order_by,))
+        sorter = self._sorter(lambda record_bytes: sort_key(read_order(record_bytes)[0]),
+                              data_retrieval.descending, memory_bytes)
+        try:
+            pages = self._pruned_pages(table, schema, conditions, table_path)
+            with self.files.open(table_path) as f:
+                for _, page in iter_page_views(f, self.locks.page_reader(table), pages):
+                    count('rows_deserialized', page.record_count)
+                    for _, record_bytes in page.iter_records():
+                        if conditions and not self._match_all(self.row_serializer.deserialize(schema, record_bytes),
+                                                              conditions):
+                            continue
+                        sorter.append(bytes(record_bytes))
+        except BaseException:
+            sorter.close()
+            raise
+        return self._iter_sorted(sorter, schema, columns)
+
+    def _iter_sorted(self, sorter, schema, columns):
+        with sorter:
+            for record_bytes in sorter:
+                yield self._project(self.row_serializer.deserialize(schema, record_bytes), columns)
+
+    def join_block(self, data_join: DataJoin, memory_bytes=None):
+        """Iterator over the rows of an equi-join, each a dict keyed by
+        'Table.Column'. Tables are read in batches, each under its own
+        table lock, so no lock is held while the caller consumes rows;
+        writes made meanwhile may or may not be seen. Hash and sort-merge
+        joins buffer at most memory_bytes (default sort_memory_bytes) of
+        rows before spilling under base_path. Planning and every batch are
+        recorded as join_block operations."""
+        with self._metrics.operation('join_block', data_join.right):
+            plan = self._plan_join(data_join)
+        return self._join_rows(plan, memory_bytes or self.sort_memory_bytes)
+
+    def _plan_join(self, data_join: DataJoin):
+        right = data_join.right
+        right_schema = self.schema_manager.get_table_schema(right)
+        if right_schema is None:
+            raise ValueError(f"Tabel '{right}' tidak ditemukan")
+        right_attrs = [attr["name"] for attr in right_schema.get_attributes()]
+        for column in (data_join.right_column, *(cond.column for cond in data_join.right_conditions)):
+            if column not in right_attrs:
+                raise ValueError(f"Kolom '{column}' tidak ada di tabel '{right}'")
+
+        left = data_join.left
+        if isinstance(left, DataJoin):
+            if data_join.left_conditions:
+                raise ValueError("left_conditions only apply when left is a table")
+            left = self._plan_join(left)
+            left_conditions = []
+            tables = left['tables']
+            left_output = left['columns'] or left['output']
+            left_column = data_join.left_column
+            if left_column not in left_output:
+                raise ValueError(f"Kolom '{left_column}' tidak ada di hasil join")
+        else:
+            left_schema = self.schema_manager.get_table_schema(left)
+            if left_schema is None:
+                raise ValueError(f"Tabel '{left}' tidak ditemukan")
+            left_attrs = [attr["name"] for attr in left_schema.get_attributes()]
+            for column in (data_join.left_column, *(cond.column for cond in data_join.left_conditions)):
+                if column not in left_attrs:
+                    raise ValueError(f"Kolom '{column}' tidak ada di tabel '{left}'")
+            left_conditions = coerce_conditions(left_schema, data_join.left_conditions)
+            tables = [left]
+            left_output = [f"{left}.{name}" for name in left_attrs]
+            left_column = f"{left}.{data_join.left_column}"
+        if right in tables:
+            raise ValueError(f"Tabel '{right}' sudah ada di join")
+
+        output = left_output + [f"{right}.{name}" for name in right_attrs]
+        columns = data_join.columns
+        if columns == "*":
+            columns = None
+        elif isinstance(columns, str):
+            columns = [columns]
+        for column in columns or ():
+            if column not in output:
+                raise ValueError(f"Kolom '{column}' tidak ada di hasil join")
+
+        method = data_join.method
+        if method is not None and method not in JOIN_METHODS:
+            raise ValueError(f"Metode join '{method}' tidak dikenal")
+        index = self._join_index(right, data_join.right_column)
+        if method == 'index_nested_loop' and index is None:
+            raise ValueError(f"Kolom '{data_join.right_column}' di tabel '{right}' tidak memiliki indeks")
+        if method is None:
+            method = self._choose_join_method(left, data_join, index)
+
+        return {
+            'left': left, 'left_column': left_column, 'left_conditions': left_conditions,
+            'right': right, 'right_column': data_join.right_column,
+            'right_conditions': coerce_conditions(right_schema, data_join.right_conditions),
+            'method': method, 'index': index, 'columns': columns, 'output': output, 'tables': tables + [right],
+        }
+
+    def _join_index(self, table, column):
+        """(manager, index column) of an index to probe table.column with,
+        or None."""
+        for manager in (self.hash_index_manager, self.bplus_tree_index_manager):
+            if any(idx['column'] == column for idx in self._list_indexes(manager, table)):
+                return manager, column
+        index_column = self._leading_btree(table, column)
+        return (self.bplus_tree_index_manager, index_column) if index_column is not None else None
+
+    def _choose_join_method(self, left, data_join: DataJoin, index):
+        if index is not None:
+            if not isinstance(left, str):
+                return 'index_nested_loop'
+            # A probe costs about a page per outer row; a scan reads them all
+            outer_rows = self.get_stats(left).n_r
+            for cond in data_join.left_conditions:
+                outer_rows *= self.estimate_selectivity(left, cond)
+            if outer_rows <= self.get_stats(data_join.right).b_r:
+                return 'index_nested_loop'
+        if (isinstance(left, str) and self._leading_btree(left, data_join.left_column) is not None
+                and self._leading_btree(data_join.right, data_join.right_column) is not None):
+            return 'sort_merge'
+        return 'hash'
+
+    def _join_rows(self, plan, memory_bytes):
+        rows = self._join_stream(plan, memory_bytes)
+        if plan['columns'] is None:
+            return rows
+        return ({column: row[column] for column in plan['columns']} for row in rows)
+
+    def _join_stream(self, plan, memory_bytes):
+        right = plan['right']
+        right_column = f"{right}.{plan['right_column']}"
+        if plan['method'] == 'index_nested_loop':
+            for batch in self._join_side_batches(plan['left'], plan['left_conditions'], memory_bytes):
+                yield from self._index_join_batch(plan, batch)
+
+        elif plan['method'] == 'hash':
+            # The right table is the build side; left rows stream past it
+            build = (row for batch in self._scan_batches(right, plan['right_conditions']) for row in batch)
+            probe = (row for batch in self._join_side_batches(plan['left'], plan['left_conditions'], memory_bytes)
+                     for row in batch)
+            temp_dir = os.path.join(self.storage_path, SORT_DIRNAME)
+            with HashJoin(right_column, plan['left_column'], temp_dir, memory_bytes) as hash_join:
+                yield from hash_join.join(build, probe)
+
+        else:
+            left_rows = self._sorted_join_rows(plan['left'], plan['left_column'], plan['left_conditions'], memory_bytes)
+            right_rows = self._sorted_join_rows(right, right_column, plan['right_conditions'], memory_bytes)
+            yield from merge_join(left_rows, right_rows, plan['left_column'], right_column)
+
+    def _join_side_batches(self, side, conditions, memory_bytes):
+        # side: a table name, or the plan of a nested join
+        if isinstance(side, str):
+            yield from self._scan_batches(side, conditions)
+            return
+        rows = self._join_rows(side, memory_bytes)
+        while True:
+            batch = list(islice(rows, JOIN_BATCH_ROWS))
+            if not batch:
+                return
+            yield batch
+
+    def _scan_batches(self, table, conditions):
+        """Qualified rows of table matching conditions, in lists read a few
+        pages at a time, each under its own table lock."""
+        schema = self.schema_manager.get_table_schema(table)
+        table_path = self._get_table_file_path(table)
+        page_id = 0
+        while True:
+            with self._metrics.operation('join_block', table), self.locks.table(table).read():
+                if not self._table_file_exists(table):
+                    return
+                end = min(page_id + JOIN_BATCH_PAGES, -(-os.path.getsize(table_path) // PAGE_SIZE))
+                rows = []
+                with self.files.open(table_path) as f:
+                    latch = self.locks.page_reader(table)
+                    for current_page_id in range(page_id, end):
+                        page = read_page_view(f, current_page_id, latch)
+                        count('rows_deserialized', page.record_count)
+                        for _, record_bytes in page.iter_records():
+                            row = self.row_serializer.deserialize(schema, record_bytes)
+                            if self._match_all(row, conditions):
+                                rows.append(qualify(table, row))
+            if end <= page_id:
+                return
+            page_id = end
+            if rows:
+                yield rows
+
+    def _index_join_batch(self, plan, outer_rows):
+        """Index nested-loop join of a batch of outer rows: every distinct
+        key is probed once, and the matching RIDs are fetched in page order
+        so each page is read once per batch."""
+        table = plan['right']
+        manager, index_column = plan['index']
+        composite = COMPOSITE_SEPARATOR in index_column
+        schema = self.schema_manager.get_table_schema(table)
+
+        with self._metrics.operation('join_block', table), self.locks.table(table).read():
+            probes = []
+            rids_by_key = {}
+            for position, row in enumerate(outer_rows):
+                key = row[plan['left_column']]
+                if key is None:
+                    continue
+                rids = rids_by_key.get(key)
+                if rids is None:
+                    if composite:
+                        rids = manager.scan_range(table, index_column, (key,), (key,))
+                    else:
+                        rids = manager.search(table, index_column, key)
+                    rids_by_key[key] = rids
+                probes.extend((rid, position) for rid in rids)
+            probes.sort()
+            matches = self._fetch_positions(table, schema, probes, plan['right_conditions'])
+
+        # Back to outer row order
+        matches.sort(key=lambda match: match[0])
+        return [{**outer_rows[position], **qualify(table, row)} for position, row in matches]
+
+    def _fetch_positions(self, table, schema, probes, conditions):
+        # probes: ((page_id, slot_id), position) pairs in page order; returns
+        # (position, row) for the rows that match conditions
+        matches = []
+        table_path = self._get_table_file_path(table)
+        with self.files.open(table_path) as f:
+            latch = self.locks.page_reader(table)
+            page = None
+            current_page_id = None
+            for (page_id, slot_id), position in probes:
+                if page_id != current_page_id:
+                    page = read_page_view(f, page_id, latch)
+                    current_page_id = page_id
+                row = self.row_serializer.deserialize(schema, page.get_record(slot_id))
+                if conditions and not self._match_all(row, conditions):
+                    continue
+                matches.append((position, row))
+        count('rows_deserialized', len(probes))
+        return matches
+
+    def _sorted_join_rows(self, side, column, conditions, memory_bytes):
+        """Rows of one input of a sort-merge join, ascending on column:
+        walked from a B+ tree led by it when side is such a table,
+        otherwise sorted externally."""
+        index_column = None
+        if isinstance(side, str):
+            index_column = self._leading_btree(side, column.split('.', 1)[1])
+        if index_column is not None:
+            for batch in self._index_order_batches(side, index_column, conditions):
+                yield from batch
+            return
+
+        with self._sorter(lambda row: sort_key(row[column]), memory_bytes=memory_bytes) as sorter:
+            for batch in self._join_side_batches(side, conditions, memory_bytes):
+                sorter.extend(batch)
+            yield from sorter
+
+    def _index_order_batches(self, table, index_column, conditions):
+        """Qualified rows of table in index key order, skipping NULL keys.
+        Each batch ends between two keys, so the next one resumes the walk
+        past the last key under a fresh table lock."""
+        composite = COMPOSITE_SEPARATOR in index_column
+        schema = self.schema_manager.get_table_schema(table)
+        last_key = None
+        while True:
+            with self._metrics.operation('join_block', table), self.locks.table(table).read():
+                bounds = {}
+                if last_key is not None:
+                    bounds = {'lower': (last_key,) if composite else last_key, 'lower_inclusive': False}
+                probes = []
+                exhausted = True
+                with closing(self.bplus_tree_index_manager.iter_range(table, index_column, **bounds)) as entries:
+                    for key, rid in entries:
+                        key = key[0] if composite else key
+                        if key is None:
+                            continue
+                        if len(probes) >= JOIN_BATCH_ROWS and key != last_key:
+                            exhausted = False
+                            break
+                        probes.append((rid, len(probes)))
+                        last_key = key
+                probes.sort()
+                matches = self._fetch_positions(table, schema, probes, conditions)
+
+            matches.sort(key=lambda match: match[0])
+            if matches:
+                yield [qualify(table, row) for _, row in matches]
+            if exhausted:
+                return
+
+    def _needed_columns(self, schema, columns, conditions):
+        if columns == "*" or columns is None:
+            needed = {attr["name"] for attr in schema.get_attributes()}
+        else:
+            needed = set(columns)
+        needed.update(cond.column for cond in conditions)
+        return needed
+
+    def _covers(self, manager, table, column, needed):
+        return needed is not None and needed <= {*key_columns(column), *manager.index_include(table, column)}
+
+    def _btree_bounds(self, columns, conditions):
+        """scan_range bounds a B+ tree keyed on columns can seek with: '='
+        on its leading columns, then '<', '<=', '>' or '>=' on the next one.
+        Returns (bounds, indices of the conditions they enforce); bounds is
+        None when the index cannot be used."""
+        prefix = []
+        used = []
+        for column in columns:
+            match = next((i for i, cond in enumerate(conditions)
+                          if cond.column == column and cond.operation == "="), None)
+            if match is None:
+                break
+            prefix.append(conditions[match].operand)
+            used.append(match)
+
+        bounds = {'lower': tuple(prefix), 'upper': tuple(prefix),
+                  'lower_inclusive': True, 'upper_inclusive': True}
+        if len(prefix) < len(columns):
+            for side, ops in (('lower', (">", ">=")), ('upper', ("<", "<="))):
+                match = next((i for i, cond in enumerate(conditions)
+                              if cond.column == columns[len(prefix)] and cond.operation in ops), None)
+                if match is not None:
+                    bounds[side] = tuple(prefix) + (conditions[match].operand,)
+                    bounds[f'{side}_inclusive'] = conditions[match].operation in ("<=", ">=")
+                    used.append(match)
+
+        if not used:
+            return None, used
+        for side in ('lower', 'upper'):
+            if not bounds[side]:
+                bounds[side] = None
+            elif len(columns) == 1:
+                # Single-column indexes are keyed by plain values
+                bounds[side] = bounds[side][0]
+        return bounds, used
+
+    def _choose_access_path(self, table, conditions, needed=None):
+        """Returns (access_path, index_column, locations). An '=' lookup is
+        probed here, since an empty probe means falling back to a scan;
+        for a B+ tree range the caller runs the scan (locations is None).
+        When an index also holds every column in needed, the path is
+        '<type>_index_only' and locations are (key, included values) pairs."""
         if len(conditions) == 1:
             cond = conditions[0]
             if cond.operation == "=":
-                index_locations = self.hash_index_manager.search(table, cond.column, cond.operand)
-                
-                if not index_locations:
-                    index_locations = self.bplus_tree_index_manager.search(table, cond.column, cond.operand)
-
-                if index_locations:
-                    index_used = True
-                    table_path = self._get_table_file_path(table)
-                    
-                    with open(table_path, "rb") as f:
-                        for page_id, slot_id in index_locations:
-                            f.seek(page_id * PAGE_SIZE)
-                            page_bytes = f.read(PAGE_SIZE)
-                            
-                            if len(page_bytes) < PAGE_SIZE:
-                                page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
-                            
-                            page = SlottedPage()
-                            page.load(page_bytes)
-                            
-                            try:
-                                record_bytes = page.get_record(slot_id)
-                                row = self.row_serializer.deserialize(schema, record_bytes)
-                                results.append(self._project(row, columns))
-                            except:
-                                pass 
+                for manager, access_path in ((self.hash_index_manager, 'hash_index'),
+                                             (self.bplus_tree_index_manager, 'btree_index')):
+                    if self._covers(manager, table, cond.column, needed):
+                        index_locations = manager.search(table, cond.column, cond.operand, with_included=True)
+                        access_path += '_only'
+                    else:
+                        index_locations = manager.search(table, cond.column, cond.operand)
+
+                    if index_locations:
+                        return access_path, cond.column, index_locations
             
             elif cond.operation in (">", "<", ">=", "<="):
-                btree_indexes = self.bplus_tree_index_manager.list_indexes(table)
-                has_btree = any(idx['column'] == cond.column for idx in btree_indexes)
-                
-                if has_btree:
-                    index_used = True
-                    table_path = self._get_table_file_path(table)
-                    
-                    if cond.operation in (">", ">="):
-                        index_data = self.bplus_tree_index_manager.load_index(table, cond.column)
-                        if index_data and index_data['root']:
-                            node = index_data['root']
-                            while not node.is_leaf:
-                                node = node.children[-1]
-                            max_key = node.keys[-1] if node.keys else cond.operand
-                            
-                            if cond.operation == ">":
-                                range_results = self.bplus_tree_index_manager.range_search(
-                                    table, cond.column, cond.operand, max_key
-                                )
-                                range_results = [(k, v) for k, v in range_results if k > cond.operand]
-                            else:  # >=
-                                range_results = self.bplus_tree_index_manager.range_search(
-                                    table, cond.column, cond.operand, max_key
-                                )
-                        else:
-                            range_results = []
-                    
-                    else:  # < or <=
-                        index_data = self.bplus_tree_index_manager.load_index(table, cond.column)
-                        if index_data and index_data['root']:
-                            node = index_data['root']
-                            while not node.is_leaf:
-                                node = node.children[0]
-                            min_key = node.keys[0] if node.keys else cond.operand
-                            
-                            if cond.operation == "<":
-                                range_results = self.bplus_tree_index_manager.range_search(
-                                    table, cond.column, min_key, cond.operand
-                                )
-                                range_results = [(k, v) for k, v in range_results if k < cond.operand]
-                            else:  # <=
-                                range_results = self.bplus_tree_index_manager.range_search(
-                                    table, cond.column, min_key, cond.operand
-                                )
-                        else:
-                            range_results = []
-                    
-                    with open(table_path, "rb") as f:
-                        for key, (page_id, slot_id) in range_results:
-                            f.seek(page_id * PAGE_SIZE)
-                            page_bytes = f.read(PAGE_SIZE)
-                            
-                            if len(page_bytes) < PAGE_SIZE:
-                                page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
-                            
-                            page = SlottedPage()
-                            page.load(page_bytes)
-                            
-                            try:
-                                record_bytes = page.get_record(slot_id)
-                                row = self.row_serializer.deserialize(schema, record_bytes)
-                                results.append(self._project(row, columns))
-                            except:
-                                pass
-    
-        # Full table scan
-        if not index_used:
+                btree_indexes = self._list_indexes(self.bplus_tree_index_manager, table)
+                if any(idx['column'] == cond.column for idx in btree_indexes):
+                    if self._covers(self.bplus_tree_index_manager, table, cond.column, needed):
+                        return 'btree_index_only', cond.column, None
+                    return 'btree_index', cond.column, None
+
+        # Otherwise take the B+ tree (composite or not) whose key prefix
+        # the conditions pin down furthest; the rest are checked per row
+        best_column, best_used = None, 0
+        for idx in self._list_indexes(self.bplus_tree_index_manager, table):
+            columns = key_columns(idx['column'])
+            if len(conditions) == 1 and len(columns) == 1:
+                continue
+            _, used = self._btree_bounds(columns, conditions)
+            if len(used) > best_used:
+                best_column, best_used = idx['column'], len(used)
+        if best_column is not None:
+            if self._covers(self.bplus_tree_index_manager, table, best_column, needed):
+                return 'btree_index_only', best_column, None
+            return 'btree_index', best_column, None
+
+        return 'full_scan', None, None
+
+    def _order_index(self, table, order_by, access_path, index_column):
+        """B+ tree led by order_by to stream rows from in order, or None to
+        sort them instead. Walking the index only pays off when the rows
+        would otherwise come from a full scan, or from that same index."""
+        if order_by is None:
+            return None
+        if access_path.startswith('btree') and key_columns(index_column)[0] == order_by:
+            return index_column
+        if access_path == 'full_scan':
+            return self._leading_btree(table, order_by)
+        return None
+
+    def _leading_btree(self, table, column):
+        # The B+ tree with the narrowest key that starts with column
+        ordered = [idx['column'] for idx in self._list_indexes(self.bplus_tree_index_manager, table)
+                   if key_columns(idx['column'])[0] == column]
+        return min(ordered, key=len) if ordered else None
+
+    def _pruned_pages(self, table, schema, conditions, table_path, access=None):
+        """Ids of the pages a scan has to read when Bloom filters ('='
+        conditions) or the zone map (comparisons) rule some out: those
+        every one of them admits. None when nothing is ruled out, to read
+        them all. access, if given, gets the access path."""
+        bloom_columns = self.bloom_filter_manager.list_filters(table)
+        zone_map = self.zone_map_manager.get_zone_map(table)
+        if not conditions or (not bloom_columns and zone_map is None):
+            return None
+
+        page_count = -(-os.path.getsize(table_path) // PAGE_SIZE)
+        pages, access_path = None, None
+        for cond in conditions:
+            bloom = self.bloom_filter_manager.get_filter(table, cond.column) if cond.column in bloom_columns else None
+            if cond.operation != '=' or bloom is None:
+                continue
+            admitted = bloom.candidate_pages(cond.operand, page_count)
+            if admitted is None:
+                continue
+            pages = admitted if pages is None else sorted(set(pages).intersection(admitted))
+            access_path = 'bloom_scan'
+        if zone_map is not None:
+            admitted = zone_map.candidate_pages(
+                [(cond.column, cond.operation, cond.operand) for cond in conditions], page_count)
+            if admitted is not None:
+                pages = admitted if pages is None else sorted(set(pages).intersection(admitted))
+                access_path = access_path or 'zone_map_scan'
 
+        if pages is None or len(pages) == page_count:
+            return None
+        count('pages_skipped', page_count - len(pages))
+        if access is not None:
+            access['access_path'] = access_path
+        return pages
+
+    def _table_pages(self, table, schema, conditions, table_path):
+        # Page ids an update or delete has to visit
+        pages = self._pruned_pages(table, schema, conditions, table_path)
+        if pages is None:
+            pages = range(-(-os.path.getsize(table_path) // PAGE_SIZE))
+        return pages
+
+    def _read_block(self, data_retrieval: DataRetrieval, access=None):
+        # access, if given, is filled in with the path actually taken
+        table = data_retrieval.table
+        schema, columns, conditions = self._validate_retrieval(data_retrieval)
+        order_by = data_retrieval.order_by
+        descending = data_retrieval.descending
+        limit = data_retrieval.limit
+
+        # Rows keep the order column until they are sorted
+        fetch_columns = columns
+        if order_by is not None and columns not in ("*", None) and order_by not in columns:
+            fetch_columns = [*columns, order_by]
+
+        needed = self._needed_columns(schema, fetch_columns, conditions)
+        access_path, index_column, locations = self._choose_access_path(table, conditions, needed)
+        order_index = self._order_index(table, order_by, access_path, index_column)
+        if order_index is not None:
+            index_column = order_index
+            covered = self._covers(self.bplus_tree_index_manager, table, order_index, needed)
+            access_path = 'btree_index_only' if covered else 'btree_index'
+        if access is not None:
+            access.update(access_path=access_path, index_column=index_column, ordered=order_index is not None)
+
+        if order_index is not None:
+            results = self._index_order_rows(table, schema, access_path, order_index, fetch_columns,
+                                             conditions, descending, limit)
+            return self._strip_order_column(results, fetch_columns, columns, order_by)
+
+        # Without an order the first limit matches will do
+        fetch_limit = limit if order_by is None else None
+        if order_by is not None or limit is not None:
+            results = RowCollector(order_by, descending, limit)
+        else:
+            results = []
+
+        if access_path != 'full_scan':
+            index_only = access_path.endswith('_only')
+            if locations is None:
+                bounds, _ = self._btree_bounds(key_columns(index_column), conditions)
+                locations = self.bplus_tree_index_manager.scan_range(
+                    table, index_column, with_included=index_only, **bounds
+                )
+            # A single condition is enforced by the index itself
+            residual = conditions if len(conditions) > 1 else None
+            if index_only:
+                manager = self._index_manager(access_path.split('_')[0])
+                results.extend(self._index_only_rows(schema, index_column, manager.index_include(table, index_column),
+                                                     locations, fetch_columns, residual, fetch_limit))
+            else:
+                results.extend(self._fetch_rows(table, schema, locations, fetch_columns, residual, fetch_limit))
+
+        else:
+            # Full table scan
             table_path = self._get_table_file_path(table)
-            if not os.path.exists(table_path):
+            if not self._table_file_exists(table):
                 raise FileNotFoundError(f"File data '{table_path}' tidak ditemukan")
 
-            results = []
+            # Pages the Bloom filters or zone map rule out are skipped,
+            # which beats reading all of them in parallel
+            pages = self._pruned_pages(table, schema, conditions, table_path, access)
+            page_count = self._parallel_page_count(table_path) if pages is None else 0
+            if page_count:
+                if access is not None:
+                    access['access_path'] = 'parallel_full_scan'
+                # Worker processes cannot take page latches, so hold off
+                # appends to this table until the scan is done
+                with self.locks.append(table):
+                    for scanned, chunk in self._parallel_map(scan_pages, table_path, schema, page_count, conditions, fetch_columns):
+                        count('rows_deserialized', scanned)
+                        results.extend(chunk)
 
-            with open(table_path, "rb") as f:
-                while True:
-                    page_bytes = f.read(PAGE_SIZE)
-                    if not page_bytes:
-                        break
-                    if len(page_bytes) < PAGE_SIZE:
-                        page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
+            else:
+                with self.files.open(table_path) as f:
+                    for _, page in iter_page_views(f, self.locks.page_reader(table), pages):
+                        if fetch_limit is not None and results.full:
+                            break
+                        count('rows_deserialized', page.record_count)
+                        for _, record_bytes in page.iter_records():
+                            try:
+                                row = self.row_serializer.deserialize(schema, record_bytes)
+                            except Exception as e:
+                                raise ValueError(f"Gagal decode record: {e}")
 
-                    page = SlottedPage()
-                    page.load(page_bytes)
+                            if not self._match_all(row, conditions):
+                                continue
 
-                    for slot_idx in range(page.record_count):
-                        try:
-                            record_bytes = page.get_record(slot_idx)
-                            row = self.row_serializer.deserialize(schema, record_bytes)
-                        except Exception as e:
-                            raise ValueError(f"Gagal decode record: {e}")
+                            results.append(self._project(row, fetch_columns))
 
-                        if not self._match_all(row, conditions):
-                            continue
+        if isinstance(results, RowCollector):
+            results = results.rows()
+        return self._strip_order_column(results, fetch_columns, columns, order_by)
+
+    def _index_order_rows(self, table, schema, access_path, index_column, columns, conditions, descending, limit):
+        """Rows in index key order (descending walks the leaves backwards),
+        streamed from the B+ tree so the walk stops after limit rows."""
+        bounds, used = self._btree_bounds(key_columns(index_column), conditions)
+        # Conditions the bounds do not cover are checked per row; a single
+        # one they do is enforced by the index itself
+        residual = None if len(conditions) == 1 and used else conditions
+        index_only = access_path.endswith('_only')
+        entries = self.bplus_tree_index_manager.iter_range(
+            table, index_column, descending=descending, with_included=index_only, **(bounds or {})
+        )
+        with closing(entries):
+            if index_only:
+                include = self.bplus_tree_index_manager.index_include(table, index_column)
+                return self._index_only_rows(schema, index_column, include, entries, columns, residual, limit)
+            return self._fetch_rows(table, schema, (rid for _, rid in entries), columns, residual, limit)
+
+    def _strip_order_column(self, rows, fetch_columns, columns, order_by):
+        # Drop the order column when it was only fetched to sort by
+        if fetch_columns is not columns:
+            for row in rows:
+                del row[order_by]
+        return rows
+
+    def aggregate_block(self, data_aggregation: DataAggregation):
+        """Evaluate COUNT/SUM/MIN/MAX/AVG over the matching rows without
+        building row dicts. Returns one dict per group, keyed by the group
+        columns and labels like 'COUNT(*)' or 'MAX(GPA)'; without group_by
+        a single dict."""
+        with self._metrics.operation('aggregate_block', data_aggregation.table):
+            with self.locks.table(data_aggregation.table).read():
+                return self._aggregate_block(data_aggregation)
+
+    def _validate_aggregation(self, data_aggregation: DataAggregation):
+        table = data_aggregation.table
+        schema = self.schema_manager.get_table_schema(table)
+        if schema is None:
+            raise ValueError(f"Tabel '{table}' tidak ditemukan")
+        schema_types = {attr["name"]: attr.get("type") for attr in schema.get_attributes()}
 
-                        results.append(self._project(row, columns))
+        if not data_aggregation.aggregates:
+            raise ValueError("aggregates must not be empty")
+        aggregates = []
+        for function, column in data_aggregation.aggregates:
+            function = function.upper()
+            if function not in AGGREGATE_FUNCTIONS:
+                raise ValueError(f"Fungsi agregat '{function}' tidak dikenal")
+            if column == '*':
+                if function != 'COUNT':
+                    raise ValueError(f"Fungsi '{function}' tidak bisa dipakai pada kolom '*'")
+            elif column not in schema_types:
+                raise ValueError(f"Kolom '{column}' tidak ada di tabel '{table}'")
+            elif function in ('SUM', 'AVG') and schema_types[column] not in ('int', 'float'):
+                raise ValueError(f"Fungsi '{function}' tidak bisa dipakai pada kolom '{column}'")
+            aggregates.append((function, column))
 
+        group_by = data_aggregation.group_by
+        if group_by is None:
+            group_by = ()
+        elif isinstance(group_by, str):
+            group_by = (group_by,)
+        else:
+            group_by = tuple(group_by)
+        conditions = data_aggregation.conditions or []
+        for column in (*group_by, *(cond.column for cond in conditions)):
+            if column not in schema_types:
+                raise ValueError(f"Kolom '{column}' tidak ada di tabel '{table}'")
+
+        return schema, aggregates, group_by, coerce_conditions(schema, conditions)
+
+    def _aggregate_block(self, data_aggregation: DataAggregation, access=None):
+        # access, if given, is filled in with the path actually taken
+        table = data_aggregation.table
+        schema, aggregates, group_by, conditions = self._validate_aggregation(data_aggregation)
+        aggregate_set = AggregateSet(aggregates)
+        labels = aggregate_set.labels()
+
+        if not group_by:
+            values = self._aggregate_from_indexes(table, aggregates, conditions, access)
+            if values is not None:
+                return [dict(zip(labels, values))]
+
+        table_path = self._get_table_file_path(table)
+        if not self._table_file_exists(table):
+            raise FileNotFoundError(f"File data '{table_path}' tidak ditemukan")
+
+        groups = {}
+        pruned = {'access_path': 'full_scan'}
+        pages = self._pruned_pages(table, schema, conditions, table_path, pruned)
+        page_count = self._parallel_page_count(table_path) if pages is None else 0
+        if page_count:
+            if access is not None:
+                access.update(access_path='parallel_full_scan', index_column=None)
+            with self.locks.append(table):
+                for scanned, chunk in self._parallel_map(aggregate_pages, table_path, schema, page_count,
+                                                         conditions, group_by, aggregates):
+                    count('rows_deserialized', scanned)
+                    merge_groups(aggregate_set, groups, chunk)
+        else:
+            if access is not None:
+                access.update(access_path=pruned['access_path'], index_column=None)
+            with self.files.open(table_path) as f:
+                records = (record_bytes
+                           for _, page in iter_page_views(f, self.locks.page_reader(table), pages)
+                           for _, record_bytes in page.iter_records())
+                _, scanned = aggregate_records(schema, records, conditions, group_by, aggregate_set, groups)
+            count('rows_deserialized', scanned)
+
+        if not group_by:
+            matched, state = groups.get((), (0, aggregate_set.new_state()))
+            return [dict(zip(labels, aggregate_set.result(state, matched)))]
+
+        results = []
+        for key in sorted(groups, key=sort_key):
+            matched, state = groups[key]
+            row = dict(zip(group_by, key))
+            row.update(zip(labels, aggregate_set.result(state, matched)))
+            results.append(row)
         return results
 
+    def _aggregate_from_indexes(self, table, aggregates, conditions, access=None):
+        """Aggregate values answered without reading the table, or None:
+        COUNT(*) by counting index entries (or from the row count in index
+        or stats metadata), MIN/MAX from the ends of a B+ tree."""
+        if conditions:
+            # Only a single condition is enforced entirely by the index
+            if len(conditions) != 1 or any(aggregate != ('COUNT', '*') for aggregate in aggregates):
+                return None
+            access_path, index_column, locations = self._choose_access_path(table, conditions)
+            if access_path == 'full_scan':
+                return None
+            if locations is None:
+                bounds, _ = self._btree_bounds(key_columns(index_column), conditions)
+                locations = self.bplus_tree_index_manager.scan_range(table, index_column, **bounds)
+            if access is not None:
+                access.update(access_path=access_path, index_column=index_column)
+            return [len(locations)] * len(aggregates)
+
+        values = []
+        for function, column in aggregates:
+            if function == 'COUNT' and column == '*':
+                value = self._metadata_row_count(table)
+                if value is None:
+                    return None
+            elif function in ('MIN', 'MAX'):
+                index_column = next((idx['column'] for idx in self._list_indexes(self.bplus_tree_index_manager, table)
+                                     if key_columns(idx['column'])[0] == column), None)
+                if index_column is None:
+                    return None
+                key = self.bplus_tree_index_manager.endpoint_key(table, index_column, last=function == 'MAX')
+                value = key[0] if isinstance(key, tuple) else key
+            else:
+                return None
+            values.append(value)
+
+        if access is not None:
+            access.update(access_path='metadata', index_column=None)
+        return values
+
+    def _metadata_row_count(self, table):
+        # Every index holds one entry per row
+        for manager, column_name, _ in self._index_columns(table):
+            index_data = manager.load_index(table, column_name)
+            if index_data is not None:
+                return index_data['metadata']['num_entries']
+        # Sketch-mode row counts are estimates
+        table_stats = self.stats_catalog.get(table)
+        if table_stats is not None and table_stats.sketches is None:
+            return table_stats.n_r
+        return None
+
+    def explain(self, data_retrieval: DataRetrieval, analyze=False):
+        """QueryPlan for a read_block call: the access path it takes, the
+        indexes it could use and estimated rows/pages from the table stats.
+        analyze=True also runs the query and records what it actually cost."""
+        with self._metrics.operation('explain', data_retrieval.table):
+            table = data_retrieval.table
+            schema, columns, conditions = self._validate_retrieval(data_retrieval)
+
+            stats = self.get_stats(table)
+            selectivities = [self.estimate_selectivity(table, cond) for cond in conditions]
+            estimated_rows = stats.n_r
+            for selectivity in selectivities:
+                estimated_rows *= selectivity
+
+            cluster_spec = self.cluster_catalog.get(table)
+
+            def index_pages(rows, column=None):
+                if cluster_spec is not None and column == cluster_spec.column and stats.n_r:
+                    # Clustered on this key: matching rows share pages
+                    return min(stats.b_r, math.ceil(rows * stats.b_r / stats.n_r))
+                # Unclustered: in the worst case every row sits on its own page
+                return min(stats.b_r, math.ceil(rows))
+
+            order_by, limit = data_retrieval.order_by, data_retrieval.limit
+            if order_by is not None and columns not in ("*", None) and order_by not in columns:
+                columns = [*columns, order_by]
+            needed = self._needed_columns(schema, columns, conditions)
+            candidates = []
+            for manager in (self.hash_index_manager, self.bplus_tree_index_manager):
+                for idx in self._list_indexes(manager, table):
+                    leading = key_columns(idx['column'])[0]
+                    matching = [i for i, cond in enumerate(conditions) if cond.column == leading]
+                    supported = ('=',) if idx['type'] == 'hash' else ('=', '<', '<=', '>', '>=')
+                    candidate = {
+                        'type': idx['type'], 'column': idx['column'], 'usable': False, 'reason': None,
+                        'include': manager.index_include(table, idx['column']),
+                        'covering': self._covers(manager, table, idx['column'], needed),
+                    }
+                    if not matching:
+                        candidate['reason'] = "no condition on this column" if leading == idx['column'] \
+                            else f"no condition on leading column '{leading}'"
+                    elif all(conditions[i].operation not in supported for i in matching):
+                        candidate['reason'] = f"operation '{conditions[matching[0]].operation}' not supported"
+                    elif idx['type'] == 'hash' and len(conditions) > 1:
+                        candidate['reason'] = "only single-condition queries use an index"
+                    else:
+                        if idx['type'] == 'hash':
+                            used = matching[:1]
+                        else:
+                            _, used = self._btree_bounds(key_columns(idx['column']), conditions)
+                        rows = stats.n_r
+                        for i in used:
+                            rows *= selectivities[i]
+                        pages = 0 if candidate['covering'] else index_pages(rows, idx['column'])
+                        candidate.update(usable=True, estimated_rows=rows, estimated_pages=pages)
+                    candidates.append(candidate)
+
+            with self.locks.table(table).read():
+                access_path, index_column, _ = self._choose_access_path(table, conditions, needed)
+                order_index = self._order_index(table, order_by, access_path, index_column)
+            if order_index is not None:
+                chosen = next(c for c in candidates if c['type'] == 'btree' and c['column'] == order_index)
+                chosen['reason'] = "rows read in order_by order"
+                index_column = order_index
+                access_path = 'btree_index_only' if chosen['covering'] else 'btree_index'
+                # The walk covers the index range, or stops after about
+                # limit / selectivity entries
+                walked = chosen['estimated_rows'] if chosen['usable'] else stats.n_r
+                if limit is not None and estimated_rows:
+                    walked = min(walked, limit * walked / estimated_rows)
+                estimated_pages = 0 if chosen['covering'] else index_pages(walked, order_index)
+            elif access_path == 'full_scan':
+                estimated_pages = stats.b_r
+                for candidate in candidates:
+                    if candidate['usable']:
+                        # An '=' probe that finds nothing falls back to a scan
+                        candidate['reason'] = "no index entry matched; read_block scans instead"
+                table_path = self._get_table_file_path(table)
+                if self._table_file_exists(table):
+                    pruned = {}
+                    with self.locks.table(table).read():
+                        pages = self._pruned_pages(table, schema, conditions, table_path, pruned)
+                    if pages is not None:
+                        # The filters are consulted up front, so this is
+                        # what the scan will read
+                        access_path = pruned['access_path']
+                        estimated_pages = len(pages)
+                    elif self._parallel_page_count(table_path):
+                        access_path = 'parallel_full_scan'
+            else:
+                # Rows the index range yields are fetched before any other
+                # condition is checked (none at all for index-only paths)
+                chosen = next(c for c in candidates
+                              if c['usable'] and c['column'] == index_column and c['type'] == access_path.split('_')[0])
+                estimated_pages = chosen['estimated_pages']
+
+            if limit is not None:
+                estimated_rows = min(estimated_rows, limit)
+            plan = QueryPlan(table, access_path, index_column, candidates, estimated_rows, estimated_pages)
+            if not analyze:
+                return plan
+
+            # A private Metrics scope isolates the query's own counters from
+            # the estimation above (and works with collect_metrics off)
+            access = {}
+            with Metrics().operation('read_block', table) as trace:
+                with self.locks.table(table).read():
+                    results = self._read_block(data_retrieval, access)
+            plan.actual = {
+                'access_path': access['access_path'],
+                'pages_read': trace.counters.get('pages_read', 0),
+                'rows_examined': trace.counters.get('rows_deserialized', 0),
+                'rows_returned': len(results),
+                'index_entries_scanned': trace.counters.get('index_entries_scanned', 0),
+                'elapsed_ms': trace.duration * 1000,
+            }
+            return plan
+
+    def _index_only_rows(self, schema, index_column, include, entries, columns, conditions=None, limit=None):
+        # Rows rebuilt from covering index entries, without touching the heap
+        composite = COMPOSITE_SEPARATOR in index_column
+        rows = []
+        for key, included in entries:
+            if limit is not None and len(rows) >= limit:
+                break
+            values = dict(zip(include, included))
+            if composite:
+                values.update(zip(key_columns(index_column), key))
+            else:
+                values[index_column] = key
+            row = {attr["name"]: values[attr["name"]] for attr in schema.get_attributes() if attr["name"] in values}
+            if conditions and not self._match_all(row, conditions):
+                continue
+            rows.append(self._project(row, columns))
+        return rows
+
+    def _fetch_rows(self, table, schema, locations, columns, conditions=None, limit=None):
+        # conditions, if given, are checked on each fetched row; locations
+        # may be a lazy iterable, which is abandoned after limit rows
+        rows = []
+        fetched = 0
+        table_path = self._get_table_file_path(table)
+
+        with self.files.open(table_path) as f:
+            page = None
+            current_page_id = None
+            latch = self.locks.page_reader(table)
+            for page_id, slot_id in locations:
+                if limit is not None and len(rows) >= limit:
+                    break
+                if page_id != current_page_id:
+                    page = read_page_view(f, page_id, latch)
+                    current_page_id = page_id
+
+                try:
+                    record_bytes = page.get_record(slot_id)
+                    row = self.row_serializer.deserialize(schema, record_bytes)
+                    fetched += 1
+                    if conditions and not self._match_all(row, conditions):
+                        continue
+                    rows.append(self._project(row, columns))
+                except:
+                    pass
+
+        count('rows_deserialized', fetched)
+        return rows
+
+    def _scan_column(self, table_name, column_name, include=()):
+        """Yield (key, page_id, slot_id, included values) for every row of a
+        table, in page order."""
+        schema = self.schema_manager.get_table_schema(table_name)
+        table_path = self._get_table_file_path(table_name)
+        if schema is None or not self._table_file_exists(table_name):
+            return
+
+        page_count = self._parallel_page_count(table_path)
+        if page_count:
+            for chunk in self._parallel_map(collect_column, table_path, schema, page_count, column_name, tuple(include)):
+                count('rows_deserialized', len(chunk))
+                yield from chunk
+            return
+
+        with self.files.open(table_path) as f:
+            for page_id, page in iter_page_views(f):
+                count('rows_deserialized', page.record_count)
+                for slot_id in range(page.record_count):
+                    try:
+                        row = self.row_serializer.deserialize(schema, page.get_record(slot_id))
+                    except Exception:
+                        continue
+                    yield index_key(row, column_name), page_id, slot_id, tuple(row.get(c) for c in include)
+
     def _match_all(self, row, conditions):
-        for cond in conditions:
-            if not self._match(row, cond):
-                return False
-        return True
+        return match_all(row, conditions)
 
     def _match(self, row, cond: Condition):
-        a = row.get(cond.column)
-        b = cond.operand
-        op = cond.operation
-
-        if isinstance(a, (int, float)) and isinstance(b, str):
-            s = b.strip()
-            if s.replace('.', '', 1).lstrip('+-').isdigit():
-                b = float(s) if '.' in s else int(s)
-
-        if op == "=": return a == b
-        if op in ("<>", "!="): return a != b
-        if op == ">": return a > b
-        if op == ">=": return a >= b
-        if op == "<": return a < b
-        if op == "<=": return a <= b
-        return False
+        return match_condition(row, cond)
 
     def _project(self, row, columns):
-        if columns == "*" or columns is None:
-            return row
-        if isinstance(columns, str):
-            columns = [columns]
-        return {c: row[c] for c in columns}
+        return project(row, columns)
 
 
     def write_block(self, data_write):
+        with self._metrics.operation('write_block', data_write.table):
+            table = data_write.table
+            schema, table_path, column, conditions = self._validate_write(data_write)
+
+            if column is None and not conditions:
+                # Appends only touch the tail page, so they run alongside readers
+                with self.locks.table(table).read(), self.locks.append(table):
+                    result = self._insert_record(table, table_path, schema, data_write.new_value)
+            else:
+                with self.locks.table(table).write():
+                    result = self._update_record(table, table_path, schema, conditions, column, data_write.new_value)
+                count('rows_matched', result)
+
+            self._after_write([table])
+            return result
+
+    def _validate_write(self, data_write):
         table = data_write.table
         column = data_write.column
         conditions = data_write.conditions
-        new_value = data_write.new_value
 
         schema = self.schema_manager.get_table_schema(table)
         if schema is None:
             raise ValueError(f"Tabel '{table}' tidak ditemukan")
 
         table_path = self._get_table_file_path(table)
-        if not os.path.exists(table_path):
+        if not self._table_file_exists(table):
             raise FileNotFoundError(f"File data '{table_path}' tidak ditemukan")
 
         if column is None and not conditions:
-            return self._insert_record(table_path, schema, new_value)
-        else:
-            schema_attrs = [attr["name"] for attr in schema.get_attributes()] 
-            if column != "*" and column is not None:
-                if isinstance(column, str):
-                    column = [column]
-                for col in column:
-                    if col not in schema_attrs:
-                        raise ValueError(f"Kolom '{col}' tidak ada di tabel '{table}'")
-            
-            if conditions:
-                for cond in conditions:
-                    if cond.column not in schema_attrs:
-                        raise ValueError(f"Kolom '{cond.column}' tidak ada di tabel '{table}'")   
-            return self._update_record(table_path, schema, conditions, column, new_value)
+            return schema, table_path, column, conditions
+
+        schema_attrs = [attr["name"] for attr in schema.get_attributes()]
+        if column != "*" and column is not None:
+            if isinstance(column, str):
+                column = [column]
+            for col in column:
+                if col not in schema_attrs:
+                    raise ValueError(f"Kolom '{col}' tidak ada di tabel '{table}'")
+
+        if conditions:
+            for cond in conditions:
+                if cond.column not in schema_attrs:
+                    raise ValueError(f"Kolom '{cond.column}' tidak ada di tabel '{table}'")
+            conditions = coerce_conditions(schema, conditions)
 
-    def _insert_record(self, table_path, schema, new_record):
+        return schema, table_path, column, conditions
+
+    def _insert_record(self, table_name, table_path, schema, new_record):
         record_bytes = self.row_serializer.serialize(schema, new_record)
-        table_name = os.path.basename(table_path)[:-4]
 
-        with open(table_path, "rb+") as f:
+        unique_indexes = self._unique_indexes(table_name)
+        if unique_indexes:
+            # Keys are compared in their stored form
+            self._check_unique(table_name, unique_indexes, [self.row_serializer.deserialize(schema, record_bytes)])
+
+        with self.files.open(table_path) as f:
             f.seek(0, os.SEEK_END)
             file_size = f.tell()
 
-            if file_size == 0:
-                page = SlottedPage()
-                page_id = 0
-                slot_id= page.add_record(record_bytes)
-                f.seek(0)
-                f.write(page.serialize())
-            else:
-                page_id = (file_size // PAGE_SIZE) - 1
+            page = None
+            page_id = (file_size // PAGE_SIZE) - 1
+            if page_id >= 0:
                 f.seek(page_id * PAGE_SIZE)
-                page_bytes = f.read(PAGE_SIZE)
-
                 page = SlottedPage()
-                page.load(page_bytes)
+                page.load(f.read(PAGE_SIZE))
+                count('pages_read')
+                count('bytes_read', PAGE_SIZE)
+                try:
+                    slot_id = page.add_record(record_bytes)
+                except Exception:
+                    page = None
 
-            try:
-                slot_id = page.add_record(record_bytes)
-                f.seek(page_id * PAGE_SIZE)
-                f.write(page.serialize())
-            except Exception:
-                f.seek(0, os.SEEK_END)
+            if page is None:
                 page = SlottedPage()
                 page_id = file_size // PAGE_SIZE
                 slot_id = page.add_record(record_bytes)
-                f.write(page.serialize())
-        
-        hash_indexes = self.hash_index_manager.list_indexes(table_name)
-        for idx in hash_indexes:
-            column_name = idx['column']
-            key_value = new_record.get(column_name)
-            self.hash_index_manager.insert_entry(table_name, column_name, key_value, page_id, slot_id)
-            self.hash_index_manager.save_index(table_name, column_name)
-        
-        btree_indexes = self.bplus_tree_index_manager.list_indexes(table_name)
-        for idx in btree_indexes:
-            column_name = idx['column']
-            key_value = new_record.get(column_name)
-            self.bplus_tree_index_manager.insert_entry(table_name, column_name, key_value, page_id, slot_id)
-            self.bplus_tree_index_manager.save_index(table_name, column_name)
-        
-        
+
+            self._commit_pages(table_name, f, {page_id: page.serialize()})
+
+        self._apply_ops(self._insert_ops(table_name, schema, record_bytes, page_id, slot_id))
+        self._save_indexes(table_name)
+
         return 1
 
-    def _update_record(self, table_path, schema, conditions, column, new_value):
+    def _update_record(self, table_name, table_path, schema, conditions, column, new_value):
         rows_affected = 0
-        table_name = os.path.basename(table_path)[:-4]
-
-        if not isinstance(new_value, dict):
-            if isinstance(column, list) and len(column) == 1:
-                new_value = {column[0]: new_value}
-            elif isinstance(column, str):
-                new_value = {column: new_value}
-            else:
-                raise ValueError("new_value must be a dictionary")
-        
-        with open(table_path, "rb+") as f:
-            page_id = 0
+        new_value = self._normalize_new_value(column, new_value)
+        index_columns = self._index_columns(table_name)
+        unique_indexes = self._unique_indexes(table_name, new_value)
+        old_records = []
+        new_records = []
+        pending_ops = []
+        dirty_pages = {}
 
-            while True:
+        with self.files.open(table_path) as f:
+            for page_id in self._table_pages(table_name, schema, conditions, table_path):
                 page_start = page_id * PAGE_SIZE
                 f.seek(page_start)
                 page_bytes = f.read(PAGE_SIZE)
                 if not page_bytes:
                     break
                 
+                count('pages_read')
+                count('bytes_read', len(page_bytes))
                 if len(page_bytes) < PAGE_SIZE:
                     page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
                 
-                page = SlottedPage()
-                page.load(page_bytes)
-                
-                page_modified = False 
+                view = SlottedPageView(page_bytes)
+                count('rows_deserialized', view.record_count)
+                # Only promote to a mutable page once a row actually matches
+                page = None
 
-                for slot_id in range(page.record_count):
+                for slot_id in range(view.record_count):
                     try:  
-                        record_bytes = page.get_record(slot_id)
+                        record_bytes = (view if page is None else page).get_record(slot_id)
                         record = self.row_serializer.deserialize(schema, record_bytes)
                     except:
                         continue  
 
                     if self._match_all(record, conditions):
+                        if page is None:
+                            page = view.to_page()
                       
-                        hash_indexes = self.hash_index_manager.list_indexes(table_name)
-                        for idx in hash_indexes:
-                            column_name = idx['column']
-                            if column_name in new_value:
-                                old_key = record[column_name]
-                                new_key = new_value[column_name]
-                                self.hash_index_manager.update_entry(
-                                    table_name, column_name, old_key, new_key, page_id, slot_id
-                                )
-                        btree_indexes = self.bplus_tree_index_manager.list_indexes(table_name)
-                        for idx in btree_indexes:
-                            column_name = idx['column']
-                            if column_name in new_value:
-                                old_key = record[column_name]
-                                new_key = new_value[column_name]
-                                self.bplus_tree_index_manager.update_entry(
-                                    table_name, column_name, old_key, new_key, page_id, slot_id
-                                )
-
-                        for col in column:
-                            record[col] = new_value[col]
-
-                        new_record_bytes = self.row_serializer.serialize(schema, record)
-                        page.update_record(slot_id, new_record_bytes)
-                        page_modified = True 
+                        if unique_indexes:
+                            old_records.append(dict(record))
+                        # Index and stats changes follow only once the pages are committed
+                        pending_ops.extend(self._update_row(
+                            table_name, schema, index_columns, page, page_id, slot_id, record, column, new_value
+                        ))
+                        if unique_indexes:
+                            new_records.append(self.row_serializer.deserialize(schema, page.get_record(slot_id)))
                         rows_affected += 1
                 
-                if page_modified:
-                    f.seek(page_start)
-                    f.write(page.serialize())
-                
-                page_id += 1
-       
-        hash_indexes = self.hash_index_manager.list_indexes(table_name)
-        for idx in hash_indexes:
-            self.hash_index_manager.save_index(table_name, idx['column'])
-        
-        btree_indexes = self.bplus_tree_index_manager.list_indexes(table_name)
-        for idx in btree_indexes:
-            self.bplus_tree_index_manager.save_index(table_name, idx['column'])
-        
+                if page is not None:
+                    dirty_pages[page_id] = page.serialize()
+
+            if unique_indexes:
+                self._check_unique(table_name, unique_indexes, new_records, old_records)
+            self._commit_pages(table_name, f, dirty_pages)
+
+        self._apply_ops(pending_ops)
+
+        if rows_affected:
+            self._save_indexes(table_name)
+
         return rows_affected
 
+    def _normalize_new_value(self, column, new_value):
+        if not isinstance(new_value, dict):
+            if isinstance(column, list) and len(column) == 1:
+                new_value = {column[0]: new_value}
+            elif isinstance(column, str):
+                new_value = {column: new_value}
+            else:
+                raise ValueError("new_value must be a dictionary")
+        return new_value
+
+    def _index_columns(self, table_name):
+        """(manager, column, included columns) for every index on a table."""
+        return [
+            (manager, idx['column'], manager.index_include(table_name, idx['column']))
+            for manager in (self.hash_index_manager, self.bplus_tree_index_manager)
+            for idx in self._list_indexes(manager, table_name)
+        ]
+
+    def _unique_indexes(self, table_name, new_value=None):
+        """(manager, column) of the unique indexes on a table; with new_value,
+        only those whose key an update touches."""
+        return [
+            (manager, column_name)
+            for manager, column_name, _ in self._index_columns(table_name)
+            if manager.is_unique(table_name, column_name)
+            and (new_value is None or any(c in new_value for c in key_columns(column_name)))
+        ]
+
+    def _check_unique(self, table_name, unique_indexes, new_records, old_records=(), pending=None):
+        """Raise before anything is written if new_records (stored form)
+        would put a duplicate key into a unique index. Keys of old_records,
+        the rows being rewritten or deleted, count as free. pending holds
+        {column: (claimed, freed)} key sets of a batch whose index changes
+        are not applied yet, and is updated in place. NULL keys never clash."""
+        for manager, column_name in unique_indexes:
+            if pending is not None:
+                claimed, freed = pending.setdefault(column_name, (set(), set()))
+            else:
+                claimed, freed = set(), set()
+
+            for record in old_records:
+                key = index_key(record, column_name)
+                claimed.discard(key)
+                freed.add(key)
+
+            seen = set()
+            for record in new_records:
+                key = index_key(record, column_name)
+                if key is None or (isinstance(key, tuple) and None in key):
+                    continue
+                # One probe; a freed key's index entry is about to go away
+                if key in seen or key in claimed or (key not in freed and manager.search(table_name, column_name, key)):
+                    raise ValueError(f"Nilai {key!r} melanggar indeks unik '{column_name}' di tabel '{table_name}'")
+                seen.add(key)
+
+            claimed.update(seen)
+            freed.difference_update(seen)
+
+    # Index and stats maintenance is expressed as (bound method, args) pairs
+    # so callers can defer it until their pages are committed
+
+    def _insert_ops(self, table_name, schema, record_bytes, page_id, slot_id):
+        # Index keys and stats use the stored form (truncated strings,
+        # rounded floats), not the caller's dict
+        record = self.row_serializer.deserialize(schema, record_bytes)
+        ops = [
+            (manager.insert_entry, (table_name, column_name, index_key(record, column_name), page_id, slot_id,
+                                    tuple(record.get(c) for c in include)))
+            for manager, column_name, include in self._index_columns(table_name)
+        ]
+        ops.extend(
+            (self.bloom_filter_manager.add, (table_name, column_name, page_id, record[column_name]))
+            for column_name in self.bloom_filter_manager.list_filters(table_name)
+        )
+        if self.zone_map_manager.get_zone_map(table_name) is not None:
+            ops.append((self.zone_map_manager.add, (table_name, page_id, record)))
+        ops.append((self.stats_catalog.record_insert, (table_name, record, len(record_bytes))))
+        return ops
+
+    def _update_row(self, table_name, schema, index_columns, page, page_id, slot_id, record, column, new_value):
+        old_record = dict(record)
+        for col in column:
+            record[col] = new_value[col]
+
+        new_record_bytes = self.row_serializer.serialize(schema, record)
+        page.update_record(slot_id, new_record_bytes)
+        new_record = self.row_serializer.deserialize(schema, new_record_bytes)
+
+        # A covering index also has to follow changes to its included columns
+        ops = [
+            (manager.update_entry, (table_name, column_name, index_key(old_record, column_name), index_key(new_record, column_name),
+                                    page_id, slot_id, tuple(new_record[c] for c in include)))
+            for manager, column_name, include in index_columns
+            if any(c in new_value for c in key_columns(column_name) + include)
+        ]
+        # The old value's bits (and zone bounds) stay until a rebuild
+        ops.extend(
+            (self.bloom_filter_manager.add, (table_name, column_name, page_id, new_record[column_name]))
+            for column_name in self.bloom_filter_manager.list_filters(table_name)
+            if column_name in new_value
+        )
+        zone_map = self.zone_map_manager.get_zone_map(table_name)
+        if zone_map is not None and any(c in new_value for c in zone_map.columns):
+            ops.append((self.zone_map_manager.add, (table_name, page_id, new_record)))
+        ops.append((self.stats_catalog.record_update, (table_name, old_record, new_record)))
+        return ops
+
+    def _delete_ops(self, table, index_columns, page_id, records, sizes, slot_map):
+        # Compaction renumbers the surviving slots of a page, so every entry
+        # pointing at a deleted or moved slot has to follow it
+        ops = []
+        for old_slot, new_slot in enumerate(slot_map):
+            if new_slot == old_slot:
+                continue
+
+            record = records[old_slot]
+            for manager, column_name, include in index_columns:
+                key_value = index_key(record, column_name)
+                ops.append((manager.delete_entry, (table, column_name, key_value, page_id, old_slot)))
+                if new_slot is not None:
+                    ops.append((manager.insert_entry, (table, column_name, key_value, page_id, new_slot,
+                                                       tuple(record[c] for c in include))))
+            if new_slot is None:
+                ops.append((self.stats_catalog.record_delete, (table, record, sizes[old_slot])))
+        return ops
+
+    def _apply_ops(self, ops):
+        for fn, args in ops:
+            fn(*args)
+
+    def _commit_pages(self, table_name, f, page_images):
+        if not page_images:
+            return
+        self._log_pages({table_name: page_images})
+        self._write_pages(table_name, f, page_images)
+
+    def _log_pages(self, images_by_table):
+        # Every table's pages go in one WAL transaction, so a batch touching
+        # several tables is redone all-or-nothing
+        if self.wal is None or not any(images_by_table.values()):
+            return
+
+        txn_id = self.wal.begin()
+        for table_name, page_images in images_by_table.items():
+            for page_id in sorted(page_images):
+                self.wal.log_page(txn_id, table_name, page_id, page_images[page_id])
+        self.wal.commit(txn_id)
+        with self._dirty_lock:
+            self._unsynced_tables.update(t for t, page_images in images_by_table.items() if page_images)
+
+    def _write_pages(self, table_name, f, page_images):
+        for page_id in sorted(page_images):
+            with self.locks.page(table_name, page_id).write():
+                f.seek(page_id * PAGE_SIZE)
+                f.write(page_images[page_id])
+                f.flush()
+            count('pages_written')
+            count('bytes_written', len(page_images[page_id]))
+
+    def _save_indexes(self, table_name):
+        # With a WAL the index files are only rewritten at checkpoint;
+        # recovery rebuilds them from the redone pages instead
+        for manager in (self.hash_index_manager, self.bplus_tree_index_manager):
+            for idx in self._list_indexes(manager, table_name):
+                if self.wal is not None:
+                    with self._dirty_lock:
+                        self._dirty_indexes.add((idx['type'], table_name, idx['column']))
+                else:
+                    manager.save_index(table_name, idx['column'])
+        for column_name in self.bloom_filter_manager.list_filters(table_name):
+            if self.wal is not None:
+                with self._dirty_lock:
+                    self._dirty_indexes.add(('bloom', table_name, column_name))
+            else:
+                self.bloom_filter_manager.save_filter(table_name, column_name)
+        if self.zone_map_manager.get_zone_map(table_name) is not None:
+            if self.wal is not None:
+                with self._dirty_lock:
+                    self._dirty_indexes.add(('zone_map', table_name, None))
+            else:
+                self.zone_map_manager.save_zone_map(table_name)
+
+    def _index_manager(self, index_type):
+        return self.hash_index_manager if index_type == 'hash' else self.bplus_tree_index_manager
+
+    def _recover(self):
+        wal_path = os.path.join(self.base_path, WAL_FILENAME)
+        if not os.path.exists(wal_path) or os.path.getsize(wal_path) == 0:
+            return
+
+        log = WriteAheadLog(self.base_path)
+        images_by_table = {}
+        for table_name, page_id, page_bytes in log.replay():
+            images_by_table.setdefault(table_name, []).append((page_id, page_bytes))
+
+        for table_name, images in images_by_table.items():
+            table_path = self._get_table_file_path(table_name)
+            with open(table_path, "r+b" if os.path.exists(table_path) else "w+b") as f:
+                for page_id, page_bytes in images:
+                    f.seek(page_id * PAGE_SIZE)
+                    f.write(page_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+
+            for manager in (self.hash_index_manager, self.bplus_tree_index_manager):
+                for idx in self._list_indexes(manager, table_name):
+                    manager.rebuild_index(table_name, idx['column'], self)
+            self._rebuild_page_summaries(table_name)
+
+        log.reset()
+        log.close()
+
+    @contextmanager
+    def _all_tables_locked(self):
+        # Sorted order, so two callers can never deadlock on each other
+        tables = sorted(self.schema_manager.list_tables())
+        for table in tables:
+            self.locks.table(table).acquire_write()
+        try:
+            yield
+        finally:
+            for table in reversed(tables):
+                self.locks.table(table).release_write()
+
+    def checkpoint(self):
+        """Flush everything the WAL covers (table files, deferred index
+        saves) and empty the log."""
+        if self.wal is None:
+            return
+
+        with self._metrics.operation('checkpoint'), self._all_tables_locked():
+            self._checkpoint()
+
+    def _checkpoint(self):
+        # Caller holds every table lock
+        with self._dirty_lock:
+            unsynced_tables, self._unsynced_tables = self._unsynced_tables, set()
+            dirty_indexes, self._dirty_indexes = self._dirty_indexes, set()
+
+        for table in unsynced_tables:
+            table_path = self._get_table_file_path(table)
+            if self._table_file_exists(table):
+                with self.files.open(table_path) as f:
+                    os.fsync(f.fileno())
+
+        for index_type, table, column in dirty_indexes:
+            if index_type == 'bloom':
+                self.bloom_filter_manager.save_filter(table, column)
+            elif index_type == 'zone_map':
+                self.zone_map_manager.save_zone_map(table)
+            else:
+                self._index_manager(index_type).save_index(table, column)
+
+        self.wal.reset()
+        self.stats_catalog.save(self._table_fingerprints())
+
+    def _after_write(self, tables=()):
+        self._invalidate_results(tables)
+        if self.wal is not None and self.wal.size() >= self.checkpoint_bytes:
+            self.checkpoint()
+        elif self.stats_catalog.unsaved_changes >= self.stats_save_interval:
+            self.save_stats()
+
+        for table in tables:
+            spec = self.cluster_catalog.get(table)
+            if spec is not None and spec.recluster_threshold is not None and self._table_file_exists(table):
+                page_count = -(-os.path.getsize(self._get_table_file_path(table)) // PAGE_SIZE)
+                if spec.needs_recluster(page_count):
+                    self.cluster(table)
+
+    def _invalidate_results(self, tables):
+        if self.result_cache is not None:
+            for table in tables:
+                self.result_cache.invalidate(table)
+
+    def set_cluster_key(self, table_name, column, recluster_threshold=None):
+        """Make column (or a list of columns) the table's clustering key,
+        which cluster() sorts by. With recluster_threshold, a write that
+        leaves more than that fraction of the pages appended since the last
+        cluster() reclusters the table. column=None drops the option."""
+        if column is None:
+            self.cluster_catalog.put(table_name, None)
+            return True
+        if recluster_threshold is not None and not 0 < recluster_threshold <= 1:
+            raise ValueError("recluster_threshold must be in (0, 1]")
+
+        column = self._cluster_column(table_name, column)
+        spec = self.cluster_catalog.get(table_name)
+        # Pages sorted by an earlier key are not sorted by a new one
+        clustered_pages = spec.clustered_pages if spec is not None and spec.column == column else 0
+        self.cluster_catalog.put(table_name, ClusterSpec(column, recluster_threshold, clustered_pages))
+        return True
+
+    def _cluster_column(self, table_name, column):
+        schema = self.schema_manager.get_table_schema(table_name)
+        if schema is None:
+            raise ValueError(f"Tabel '{table_name}' tidak ditemukan")
+
+        schema_attrs = [attr["name"] for attr in schema.get_attributes()]
+        # A stored clustering key is already joined with COMPOSITE_SEPARATOR
+        columns = key_columns(column) if isinstance(column, str) else list(column)
+        for c in columns:
+            if c not in schema_attrs:
+                raise ValueError(f"Kolom '{c}' tidak ada di tabel '{table_name}'")
+        return COMPOSITE_SEPARATOR.join(columns)
+
+    def cluster(self, table_name, column=None):
+        """Rewrite a table with its rows sorted by column (default: the
+        table's clustering key) and re-point every index at the new
+        locations, so range scans on that key read contiguous pages. The
+        column becomes the clustering key. Returns the new page count."""
+        with self._metrics.operation('cluster', table_name):
+            spec = self.cluster_catalog.get(table_name)
+            if column is None:
+                if spec is None:
+                    raise ValueError(f"Tabel '{table_name}' belum memiliki kunci cluster")
+                column = spec.column
+            column = self._cluster_column(table_name, column)
+            if not self._table_file_exists(table_name):
+                raise FileNotFoundError(f"File data '{self._get_table_file_path(table_name)}' tidak ditemukan")
+
+            page_count = self._rewrite_table(table_name, column)
+            threshold = spec.recluster_threshold if spec is not None else None
+            self.cluster_catalog.put(table_name, ClusterSpec(column, threshold, page_count))
+            return page_count
+
+    def vacuum(self, table_name):
+        """Rewrite a table with its rows packed into as few pages as they
+        fit, dropping the space deleted rows left behind, and rebuild its
+        indexes, Bloom filters and zone map (so values no longer in the
+        table stop matching). Rows keep their order. Returns the new page
+        count."""
+        with self._metrics.operation('vacuum', table_name):
+            if self.schema_manager.get_table_schema(table_name) is None:
+                raise ValueError(f"Tabel '{table_name}' tidak ditemukan")
+            if not self._table_file_exists(table_name):
+                raise FileNotFoundError(f"File data '{self._get_table_file_path(table_name)}' tidak ditemukan")
+
+            page_count = self._rewrite_table(table_name)
+            spec = self.cluster_catalog.get(table_name)
+            if spec is not None and spec.clustered_pages > page_count:
+                # The sorted prefix can only have shrunk
+                self.cluster_catalog.put(table_name, ClusterSpec(spec.column, spec.recluster_threshold, page_count))
+            return page_count
+
+    def _rewrite_table(self, table_name, column=None):
+        if self.wal is not None:
+            # The log holds page images of the old layout; checkpointing
+            # first leaves nothing to redo onto the rewritten file
+            with self._all_tables_locked():
+                self._checkpoint()
+                page_count = self._write_table(table_name, column)
+        else:
+            with self.locks.table(table_name).write():
+                page_count = self._write_table(table_name, column)
+
+        # Same rows, new file: refresh the fingerprints saved with the stats
+        if self.stats_catalog.get(table_name) is not None:
+            self.save_stats()
+        return page_count
+
+    def _write_table(self, table_name, column=None):
+        """Write the table's records into a fresh file, sorted by column
+        if given (in stored order otherwise), swap it in and rebuild the
+        indexes, Bloom filters and zone map against it. Returns the page
+        count."""
+        schema = self.schema_manager.get_table_schema(table_name)
+        table_path = self._get_table_file_path(table_name)
+        index_columns = self._index_columns(table_name)
+        blooms, zone_maps = self._cleared_page_summaries(table_name)
+
+        if column is None:
+            records = nullcontext(self._iter_table_bytes(table_path))
+        else:
+            # Records are sorted within sort_memory_bytes, spilling runs to
+            # disk; a composite key sorts as the tuple of its columns
+            read_key = self.row_serializer.column_reader(schema, key_columns(column))
+            records = self._sorter(lambda record_bytes: sort_key(read_key(record_bytes)))
+            try:
+                records.extend(self._iter_table_bytes(table_path))
+            except BaseException:
+                records.close()
+                raise
+        with records as records:
+            # Entries for every index are collected while the new file is
+            # written; B+ tree ones are sorted again for bulk loading
+            index_entries = [
+                self._sorter(lambda entry: sort_key(entry[0])) if manager is self.bplus_tree_index_manager else []
+                for manager, _, _ in index_columns
+            ]
+            try:
+                page_count = 0
+                tmp_path = table_path + '.cluster'
+                with open(tmp_path, 'wb') as f:
+                    page = SlottedPage()
+                    for record_bytes in records:
+                        try:
+                            slot_id = page.add_record(record_bytes)
+                        except Exception:
+                            self._write_cluster_page(f, page)
+                            page_count += 1
+                            page = SlottedPage()
+                            slot_id = page.add_record(record_bytes)
+                        record = self.row_serializer.deserialize(schema, record_bytes)
+                        for (_, index_column, include), entries in zip(index_columns, index_entries):
+                            entries.append((index_key(record, index_column), page_count, slot_id,
+                                            tuple(record.get(c) for c in include)))
+                        for bloom in blooms:
+                            bloom.add(page_count, record[bloom.column])
+                        for zone_map in zone_maps:
+                            zone_map.add(page_count, record)
+                    if page.record_count:
+                        self._write_cluster_page(f, page)
+                        page_count += 1
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                # Until every index is saved again, the marker makes a restart
+                # rebuild this table's indexes
+                marker_path = table_path + REINDEX_SUFFIX
+                open(marker_path, 'wb').close()
+                os.replace(tmp_path, table_path)
+                self._invalidate_table_file(table_name)
+                # Same rows, but cached results hold them in the old order
+                self._invalidate_results([table_name])
+
+                for (manager, index_column, include), entries in zip(index_columns, index_entries):
+                    unique = manager.is_unique(table_name, index_column)
+                    manager.create_index(table_name, index_column, include=include, unique=unique)
+                    if manager is self.bplus_tree_index_manager:
+                        manager.bulk_load(table_name, index_column, entries)
+                    else:
+                        for key, page_id, slot_id, included in entries:
+                            manager.insert_entry(table_name, index_column, key, page_id, slot_id, included)
+                    manager.save_index(table_name, index_column)
+                self._install_page_summaries(table_name, blooms, zone_maps)
+                os.remove(marker_path)
+            finally:
+                for entries in index_entries:
+                    if isinstance(entries, ExternalSorter):
+                        entries.close()
+        return page_count
+
+    def _iter_table_bytes(self, table_path):
+        # The file is released once the last record is taken
+        with self.files.open(table_path) as f:
+            for _, page in iter_page_views(f):
+                count('rows_deserialized', page.record_count)
+                for _, record_bytes in page.iter_records():
+                    yield bytes(record_bytes)
+
+    def _write_cluster_page(self, f, page):
+        image = page.serialize()
+        f.write(image)
+        count('pages_written')
+        count('bytes_written', len(image))
+
+    def _finish_interrupted_cluster(self):
+        for table_name in self.schema_manager.list_tables():
+            table_path = self._get_table_file_path(table_name)
+            if os.path.exists(table_path + '.cluster'):
+                # Crashed before the swap: the old file is still intact
+                os.remove(table_path + '.cluster')
+            if os.path.exists(table_path + REINDEX_SUFFIX):
+                for manager in (self.hash_index_manager, self.bplus_tree_index_manager):
+                    for idx in self._list_indexes(manager, table_name):
+                        manager.rebuild_index(table_name, idx['column'], self)
+                self._rebuild_page_summaries(table_name)
+                os.remove(table_path + REINDEX_SUFFIX)
+
     def delete_block(self, data_deletion):
+        with self._metrics.operation('delete_block', data_deletion.table):
+            with self.locks.table(data_deletion.table).write():
+                rows_deleted = self._delete_block(data_deletion)
+            count('rows_matched', rows_deleted)
+            self._after_write([data_deletion.table])
+            return rows_deleted
+
+    def _delete_block(self, data_deletion):
+        table = data_deletion.table
+        schema, table_path, conditions = self._validate_deletion(data_deletion)
+
+        rows_deleted = 0
+        index_columns = self._index_columns(table)
+        pending_ops = []
+        dirty_pages = {}
+
+        with self.files.open(table_path) as f:
+            for page_id in self._table_pages(table, schema, conditions, table_path):
+                page_start = page_id * PAGE_SIZE
+                f.seek(page_start)
+                page_bytes = f.read(PAGE_SIZE)
+                if not page_bytes:
+                    break
+                count('pages_read')
+                count('bytes_read', len(page_bytes))
+
+                view = SlottedPageView(page_bytes)
+                count('rows_deserialized', view.record_count)
+                records = []
+                sizes = []
+                doomed = []
+
+                for slot_id, record_bytes in view.iter_records():
+                    record = self.row_serializer.deserialize(schema, record_bytes)
+                    records.append(record)
+                    sizes.append(len(record_bytes))
+                    if self._match_all(record, conditions):
+                        doomed.append(slot_id)
+
+                if doomed:
+                    page = view.to_page()
+                    slot_map = page.delete_records(doomed)
+                    dirty_pages[page_id] = page.serialize()
+                    pending_ops.extend(self._delete_ops(table, index_columns, page_id, records, sizes, slot_map))
+                    rows_deleted += len(doomed)
+
+            self._commit_pages(table, f, dirty_pages)
+
+        self._apply_ops(pending_ops)
+
+        if rows_deleted:
+            self._save_indexes(table)
+
+        return rows_deleted
+
+    def _validate_deletion(self, data_deletion):
         table = data_deletion.table
         conditions = data_deletion.conditions
 
@@ -402,58 +1881,186 @@ class StorageManager:
             if cond.column not in schema_attrs:
                 raise ValueError(f"Kolom '{cond.column}' tidak ada di tabel '{table}'")
 
-        table_path = os.path.join(self.base_path, f"{table}.dat")
-        if not os.path.exists(table_path):
+        table_path = self._get_table_file_path(table)
+        if not self._table_file_exists(table):
             raise FileNotFoundError(f"File data '{table_path}' tidak ditemukan")
 
-        rows_deleted = 0
-        pages = []
+        return schema, table_path, coerce_conditions(schema, conditions)
 
-        with open(table_path, "rb+") as f:
-            while page_bytes := f.read(PAGE_SIZE):
-                page = SlottedPage()
-                page.load(page_bytes)
+    def _set_index(self, table, column, index_type, include=None, unique=None):
+        """Build (or rebuild) an index on table.column. A list of columns
+        makes a composite B+ tree keyed on their values in that order.
+        include lists extra columns stored in each entry, making a covering
+        index that answers queries on those columns without reading the
+        table. unique=True turns the index into a constraint (a primary
+        key is a unique index): inserts and updates that would duplicate a
+        non-NULL key are rejected. None keeps what an existing index has."""
+        schema = self.schema_manager.get_table_schema(table)
+        if schema is None:
+            raise ValueError(f"Tabel '{table}' tidak ditemukan")
+        
+        schema_attrs = [attr["name"] for attr in schema.get_attributes()]
+        columns = [column] if isinstance(column, str) else list(column)
+        for c in columns:
+            if c not in schema_attrs:
+                raise ValueError(f"Kolom '{c}' tidak ada di tabel '{table}'")
+        if len(set(columns)) != len(columns):
+            raise ValueError("Composite index columns must be distinct")
+        if len(columns) > 1 and index_type.lower() != 'btree':
+            raise ValueError(f"Index '{index_type}' tidak mendukung kolom gabungan")
+        column = COMPOSITE_SEPARATOR.join(columns)
 
-                i = 0
-                while i < page.record_count:
-                    record_bytes = page.get_record(i)
-                    record = self.row_serializer.deserialize(schema, record_bytes)
+        if include is not None:
+            if isinstance(include, str):
+                include = [include]
+            for c in include:
+                if c not in schema_attrs:
+                    raise ValueError(f"Kolom '{c}' tidak ada di tabel '{table}'")
+            # The key is in every entry already
+            include = tuple(dict.fromkeys(c for c in include if c not in columns))
+        
+        if index_type.lower() == 'hash':
+            manager = self.hash_index_manager
+        elif index_type.lower() == 'btree':
+            manager = self.bplus_tree_index_manager
+        else:
+            raise ValueError(f"Index type '{index_type}' tidak tersedia.")
 
-                    if self._match_all(record, conditions):
-                        page.delete_record(i)
-                        rows_deleted += 1
-                        continue     
-                    else:
-                        i += 1
+        with self._metrics.operation('set_index', table), self.locks.table(table).write():
+            if unique and not manager.is_unique(table, column):
+                # Checked up front, so a failed attempt leaves any existing
+                # index as it was
+                seen = set()
+                for key, _, _, _ in self._scan_column(table, column):
+                    if key is None or (isinstance(key, tuple) and None in key):
+                        continue
+                    if key in seen:
+                        raise ValueError(f"Kolom '{column}' di tabel '{table}' memiliki nilai duplikat {key!r}")
+                    seen.add(key)
+            try:
+                manager.rebuild_index(table, column, self, include=include, unique=unique)
+            finally:
+                self._invalidate_indexes(table)
+        return True
 
-                pages.append(page)
+    def _drop_index(self, table, column, index_type):
+        """Drop the index _set_index built on table.column (a list of
+        columns names a composite one)."""
+        if index_type.lower() not in ('hash', 'btree'):
+            raise ValueError(f"Index type '{index_type}' tidak tersedia.")
+        index_type = index_type.lower()
+        manager = self._index_manager(index_type)
+        column = column if isinstance(column, str) else COMPOSITE_SEPARATOR.join(column)
 
-            f.seek(0)
-            for page in pages:
-                f.write(page.serialize())
+        with self._metrics.operation('drop_index', table), self.locks.table(table).write():
+            try:
+                manager.drop_index(table, column)
+            finally:
+                self._invalidate_indexes(table)
+            with self._dirty_lock:
+                self._dirty_indexes.discard((index_type, table, column))
+        return True
 
-            f.truncate(len(pages) * PAGE_SIZE)
+    def set_bloom_filter(self, table, column, pages_per_segment=1, bits_per_key=DEFAULT_BITS_PER_KEY):
+        """Keep a Bloom filter on table.column, so scans with an '='
+        condition on it skip the pages that cannot hold the value; an
+        existence check for a missing value reads next to nothing. Every
+        segment of pages_per_segment pages gets its own bitmap of about
+        bits_per_key bits per row it can hold (10 gives ~1% false
+        positives); bigger segments mean a smaller filter that rules out
+        fewer pages. Inserts and updates keep it current, vacuum() and a
+        new set_bloom_filter() rebuild it."""
+        schema = self.schema_manager.get_table_schema(table)
+        if schema is None:
+            raise ValueError(f"Tabel '{table}' tidak ditemukan")
+        if column not in [attr["name"] for attr in schema.get_attributes()]:
+            raise ValueError(f"Kolom '{column}' tidak ada di tabel '{table}'")
+        if pages_per_segment < 1:
+            raise ValueError("pages_per_segment must be at least 1")
+        if bits_per_key <= 0:
+            raise ValueError("bits_per_key must be positive")
 
-        return rows_deleted
+        rows_per_page = max(1, (PAGE_SIZE - HEADER_SIZE) // (self._record_width(schema) + SLOT_SIZE))
+        num_bits, num_hashes = filter_size(rows_per_page, pages_per_segment, bits_per_key)
+        with self._metrics.operation('set_bloom_filter', table), self.locks.table(table).write():
+            self._rebuild_page_summaries(table, [BloomFilter(table, column, pages_per_segment, num_bits, num_hashes)], [])
+        return True
 
+    def drop_bloom_filter(self, table, column):
+        with self._metrics.operation('drop_bloom_filter', table), self.locks.table(table).write():
+            self.bloom_filter_manager.drop_filter(table, column)
+        return True
 
-    def _set_index(self, table, column, index_type):
+    def set_zone_map(self, table, columns=None):
+        """Keep a zone map on table: the min and max of columns (default:
+        all of them) on every page, so scans with =, <, <=, > or >=
+        conditions on those columns skip pages whose range cannot match.
+        It prunes well on columns whose values follow the page order, like
+        increasing IDs, a year or a clustering key. Inserts and updates
+        widen the ranges, vacuum() and a new set_zone_map() tighten them."""
         schema = self.schema_manager.get_table_schema(table)
         if schema is None:
             raise ValueError(f"Tabel '{table}' tidak ditemukan")
-        
-        schema_attrs = [attr["name"] for attr in schema.get_attributes()]
-        if column not in schema_attrs:
-            raise ValueError(f"Kolom '{column}' tidak ada di tabel '{table}'")
-    
-        if index_type.lower() == 'hash':
-            self.hash_index_manager.rebuild_index(table, column, self)
-            return True
-        elif index_type.lower() == 'btree':
-            self.bplus_tree_index_manager.rebuild_index(table, column, self)
-            return True
-        else:
-            raise ValueError(f"Index type '{index_type}' tidak tersedia.")        
+        types = {attr["name"]: attr["type"] for attr in schema.get_attributes()}
+        if columns is None:
+            columns = list(types)
+        elif isinstance(columns, str):
+            columns = [columns]
+        for c in columns:
+            if c not in types:
+                raise ValueError(f"Kolom '{c}' tidak ada di tabel '{table}'")
+        columns = list(dict.fromkeys(columns))
+
+        with self._metrics.operation('set_zone_map', table), self.locks.table(table).write():
+            self._rebuild_page_summaries(table, [], [ZoneMap(table, columns, [types[c] for c in columns])])
+        return True
+
+    def drop_zone_map(self, table):
+        with self._metrics.operation('drop_zone_map', table), self.locks.table(table).write():
+            self.zone_map_manager.drop_zone_map(table)
+        return True
+
+    def _cleared_page_summaries(self, table_name):
+        # Empty copies of the table's Bloom filters and zone map, to rebuild
+        blooms = [self.bloom_filter_manager.get_filter(table_name, c).cleared()
+                  for c in self.bloom_filter_manager.list_filters(table_name)]
+        zone_map = self.zone_map_manager.get_zone_map(table_name)
+        return blooms, [] if zone_map is None else [zone_map.cleared()]
+
+    def _install_page_summaries(self, table_name, blooms, zone_maps):
+        for bloom in blooms:
+            self.bloom_filter_manager.put_filter(bloom)
+            self.bloom_filter_manager.save_filter(table_name, bloom.column)
+        for zone_map in zone_maps:
+            self.zone_map_manager.put_zone_map(zone_map)
+            self.zone_map_manager.save_zone_map(table_name)
+
+    def _rebuild_page_summaries(self, table_name, blooms=None, zone_maps=None):
+        """Fill Bloom filters and zone maps (default: empty copies of the
+        table's own) from the table file, then put them in use and save
+        them."""
+        cleared_blooms, cleared_zone_maps = self._cleared_page_summaries(table_name)
+        blooms = cleared_blooms if blooms is None else blooms
+        zone_maps = cleared_zone_maps if zone_maps is None else zone_maps
+        if not blooms and not zone_maps:
+            return
+
+        schema = self.schema_manager.get_table_schema(table_name)
+        columns = list(dict.fromkeys([bloom.column for bloom in blooms] +
+                                     [c for zone_map in zone_maps for c in zone_map.columns]))
+        read_values = self.row_serializer.column_reader(schema, columns)
+        if self._table_file_exists(table_name):
+            with self.files.open(self._get_table_file_path(table_name)) as f:
+                for page_id, page in iter_page_views(f):
+                    count('rows_deserialized', page.record_count)
+                    for _, record_bytes in page.iter_records():
+                        record = dict(zip(columns, read_values(record_bytes)))
+                        for bloom in blooms:
+                            bloom.add(page_id, record[bloom.column])
+                        for zone_map in zone_maps:
+                            zone_map.add(page_id, record)
+
+        self._install_page_summaries(table_name, blooms, zone_maps)
 
     def _calculate_tree_depth(self, node):
         if node is None:
@@ -470,87 +2077,52 @@ class StorageManager:
     
     def get_stats(self, table_name=None):
         if table_name is None or table_name == '':
-            return self._get_all_stats()
+            with self._metrics.operation('get_stats'):
+                return self._get_all_stats()
         else:
-            return self._get_table_stats(table_name)
+            with self._metrics.operation('get_stats', table_name), self.locks.table(table_name).read():
+                return self._get_table_stats(table_name)
     
     def _get_all_stats(self):
         all_stats = {}
         tables = self.schema_manager.list_tables()
         
         for table in tables:
-            all_stats[table] = self._get_table_stats(table)
+            with self.locks.table(table).read():
+                all_stats[table] = self._get_table_stats(table)
         
         return all_stats
     
     def _get_table_stats(self, table_name):
         schema = self.schema_manager.get_table_schema(table_name)
-        
+
         if schema is None:
             return Statistic(n_r=0, b_r=0, l_r=0, f_r=0, v_a_r={}, i_r={})
-        
+
         table_file = self._get_table_file_path(table_name)
-        
-        if not os.path.exists(table_file):
+
+        if not self._table_file_exists(table_name):
             return Statistic(n_r=0, b_r=0, l_r=0, f_r=0, v_a_r={}, i_r={})
-        
-        n_r = 0
-        l_r = 0
-        v_a_r = {}
-        i_r = {}
-        
+
+        table_stats = self.stats_catalog.get(table_name)
+        if table_stats is None:
+            table_stats = self._analyze_table(table_name, schema, table_file)
+
         attributes = schema.get_attributes()
-        for attr in attributes:
-            attr_type = attr['type']
-            attr_size = attr['size']
-            
-            if attr_type == 'int':
-                l_r += 4
-            elif attr_type == 'float':
-                l_r += 4
-            elif attr_type == 'char':
-                l_r += attr_size
-            elif attr_type == 'varchar':
-                l_r += 4 + (attr_size // 2)
-        
-        file_size = os.path.getsize(table_file)
-        page_count = file_size // 4096
-        
-        serializer = RowSerializer()
-        distinct_values = {attr['name']: set() for attr in attributes}
-        
-        try:
-            with open(table_file, 'rb') as f:
-                for page_num in range(page_count):
-                    page_data = f.read(4096)
-                    if len(page_data) < 4096:
-                        break
-                    
-                    page = SlottedPage()
-                    page.load(page_data)
-                    
-                    n_r += page.record_count
-                    
-                    for i in range(page.record_count):
-                        try:
-                            record_bytes = page.get_record(i)
-                            record = serializer.deserialize(schema, record_bytes)
-                            
-                            for attr_name, value in record.items():
-                                distinct_values[attr_name].add(str(value))
-                        except:
-                            pass
-        except:
-            pass
-        
-        for attr_name, values in distinct_values.items():
-            v_a_r[attr_name] = len(values)
-        
+        n_r = table_stats.n_r
+        if n_r > 0:
+            l_r = max(1, round(table_stats.total_bytes / n_r))
+        else:
+            l_r = self._record_width(schema)
+
+        v_a_r = {attr['name']: min(table_stats.distinct(attr['name']), n_r) for attr in attributes}
+
+        i_r = {}
         for attr in attributes:
             attr_name = attr['name']
             i_r[attr_name] = {'Type': 'none', 'Value': None}
         
-        hash_indexes = self.hash_index_manager.list_indexes(table_name)
+        hash_indexes = self._list_indexes(self.hash_index_manager, table_name)
         for idx in hash_indexes:
             column_name = idx['column']
             index_type = idx['type']
@@ -564,12 +2136,13 @@ class StorageManager:
                     i_r[column_name] = {'Type': 'hash', 'Value': 200}
         
         # Collect B+ tree indexes
-        btree_indexes = self.bplus_tree_index_manager.list_indexes(table_name)
+        btree_indexes = self._list_indexes(self.bplus_tree_index_manager, table_name)
         for idx in btree_indexes:
             column_name = idx['column']
             index_type = idx['type']
             
-            if index_type == 'btree':
+            # i_r is per attribute; composite indexes show up in explain()
+            if index_type == 'btree' and COMPOSITE_SEPARATOR not in column_name:
                 index_data = self.bplus_tree_index_manager.load_index(table_name, column_name)
                 if index_data and index_data.get('root'):
                     depth = self._calculate_tree_depth(index_data['root'])
@@ -577,17 +2150,247 @@ class StorageManager:
                 else:
                     i_r[column_name] = {'Type': 'btree', 'Value': 0}
         
-        page_size = 4096
-        if l_r > 0:
-            f_r = page_size // l_r
-            if f_r == 0:
-                f_r = 1
-        else:
-            f_r = 1
-        
-        if f_r > 0 and n_r > 0:
+        # A record costs its bytes plus a slot in the page directory
+        f_r = max(1, (PAGE_SIZE - HEADER_SIZE) // (l_r + SLOT_SIZE))
+
+        if n_r > 0:
             b_r = math.ceil(n_r / f_r)
         else:
-            b_r = page_count
-        
+            b_r = os.path.getsize(table_file) // PAGE_SIZE
+
         return Statistic(n_r=n_r, b_r=b_r, l_r=l_r, f_r=f_r, v_a_r=v_a_r, i_r=i_r)
+
+    def _record_width(self, schema):
+        l_r = 0
+        for attr in schema.get_attributes():
+            if attr['type'] in ('int', 'float'):
+                l_r += 4
+            elif attr['type'] == 'char':
+                l_r += attr['size']
+            elif attr['type'] == 'varchar':
+                l_r += 4 + attr['size']
+        return l_r
+
+    def analyze(self, table_name=None, sample_rate=None):
+        """Rebuild the stats catalog entry of one table (or all tables), e.g.
+        after bulk changes made outside this StorageManager. In sketch mode
+        sample_rate overrides stats_sample_rate for this call."""
+        tables = [table_name] if table_name else self.schema_manager.list_tables()
+        for table in tables:
+            schema = self.schema_manager.get_table_schema(table)
+            if schema is None:
+                raise ValueError(f"Tabel '{table}' tidak ditemukan")
+            table_file = self._get_table_file_path(table)
+            if not self._table_file_exists(table):
+                continue
+            with self._metrics.operation('analyze', table), self.locks.table(table).read():
+                self.stats_catalog.invalidate(table)
+                self._analyze_table(table, schema, table_file, sample_rate)
+        self.save_stats()
+
+    def _analyze_table(self, table_name, schema, table_file, sample_rate=None):
+        # Appends are held off so the scan and the catalog entry agree;
+        # updates and deletes are already excluded by the caller's table lock
+        with self.locks.append(table_name):
+            table_stats = self.stats_catalog.get(table_name)
+            if table_stats is not None:
+                return table_stats
+
+            page_count = os.path.getsize(table_file) // PAGE_SIZE
+            if self.stats_mode == 'sketch':
+                if sample_rate is None:
+                    sample_rate = self.stats_sample_rate
+                table_stats = self._analyze_sketch(table_name, schema, table_file, page_count, sample_rate)
+            else:
+                table_stats = self._analyze_exact(table_name, schema, table_file, page_count)
+
+            self.stats_catalog.put(table_name, table_stats)
+            return table_stats
+
+    def _iter_table_records(self, table_name, table_file, page_ids):
+        latch = self.locks.page_reader(table_name)
+        with self.files.open(table_file) as f:
+            for page_id in page_ids:
+                for _, record_bytes in read_page_view(f, page_id, latch).iter_records():
+                    yield record_bytes
+
+    def _analyze_exact(self, table_name, schema, table_file, page_count):
+        table_stats = TableStats(value_counts={attr['name']: Counter() for attr in schema.get_attributes()})
+
+        if self._parallel_page_count(table_file):
+            for chunk_n_r, chunk_bytes, chunk_counts in self._parallel_map(collect_stats, table_file, schema, page_count):
+                table_stats.n_r += chunk_n_r
+                table_stats.total_bytes += chunk_bytes
+                for attr_name, counts in chunk_counts.items():
+                    table_stats.value_counts[attr_name].update(counts)
+        else:
+            for record_bytes in self._iter_table_records(table_name, table_file, range(page_count)):
+                table_stats.n_r += 1
+                table_stats.total_bytes += len(record_bytes)
+                for attr_name, value in self.row_serializer.deserialize(schema, record_bytes).items():
+                    table_stats.value_counts[attr_name][value] += 1
+
+        count('rows_deserialized', table_stats.n_r)
+        table_stats.histograms = {
+            attr_name: ColumnHistogram.build(counts) for attr_name, counts in table_stats.value_counts.items()
+        }
+        table_stats.extremes = {
+            attr_name: [min(counts), max(counts)] for attr_name, counts in table_stats.value_counts.items() if counts
+        }
+        return table_stats
+
+    def _analyze_sketch(self, table_name, schema, table_file, page_count, sample_rate):
+        columns = [attr['name'] for attr in schema.get_attributes()]
+        sample_pages = min(page_count, self.stats_max_sample_pages, math.ceil(page_count * sample_rate))
+
+        if sample_rate >= 1 or sample_pages >= page_count:
+            # Every row, but only one fixed-size sketch per column in memory
+            table_stats = TableStats(
+                sketches={column: HyperLogLog(self.stats_precision) for column in columns}
+            )
+            if self._parallel_page_count(table_file):
+                samples = []
+                for chunk_n_r, chunk_bytes, chunk_sketches, chunk_extremes, chunk_sample in self._parallel_map(
+                    collect_sketches, table_file, schema, page_count, self.stats_precision
+                ):
+                    table_stats.n_r += chunk_n_r
+                    table_stats.total_bytes += chunk_bytes
+                    for column, sketch in chunk_sketches.items():
+                        table_stats.sketches[column].merge(sketch)
+                    for column, (low, high) in chunk_extremes.items():
+                        widen(table_stats.extremes, column, low)
+                        widen(table_stats.extremes, column, high)
+                    samples.append(chunk_sample)
+                sample = Reservoir.merge(samples)
+            else:
+                sample = Reservoir()
+                for record_bytes in self._iter_table_records(table_name, table_file, range(page_count)):
+                    record = self.row_serializer.deserialize(schema, record_bytes)
+                    table_stats.n_r += 1
+                    table_stats.total_bytes += len(record_bytes)
+                    for column, value in record.items():
+                        table_stats.sketches[column].add(value)
+                        widen(table_stats.extremes, column, value)
+                    sample.add(record)
+            count('rows_deserialized', table_stats.n_r)
+
+            # The reservoir only holds every row of a small table
+            sampled = sample.seen > len(sample.items)
+            table_stats.histograms = {
+                column: ColumnHistogram.build(Counter(record[column] for record in sample.items), sampled=sampled)
+                for column in columns
+            }
+            return table_stats
+
+        # Page-level sample: read sample_pages random pages and scale up
+        page_ids = sorted(random.sample(range(page_count), max(1, sample_pages)))
+        sample_counts = {column: Counter() for column in columns}
+        sample_rows = 0
+        sample_bytes = 0
+        for record_bytes in self._iter_table_records(table_name, table_file, page_ids):
+            sample_rows += 1
+            sample_bytes += len(record_bytes)
+            for column, value in self.row_serializer.deserialize(schema, record_bytes).items():
+                sample_counts[column][value] += 1
+
+        count('rows_deserialized', sample_rows)
+        scale = page_count / len(page_ids)
+        table_stats = TableStats(
+            n_r=round(sample_rows * scale),
+            total_bytes=round(sample_bytes * scale),
+            sketches={},
+        )
+        for column, counts in sample_counts.items():
+            sketch = HyperLogLog(self.stats_precision)
+            for value in counts:
+                sketch.add(value)
+            table_stats.sketches[column] = sketch
+            estimate = min(estimate_distinct(counts, sample_rows, table_stats.n_r), table_stats.n_r)
+            table_stats.distinct_offsets[column] = estimate - sketch.count()
+            table_stats.histograms[column] = ColumnHistogram.build(counts, sampled=True)
+        return table_stats
+
+    def estimate_selectivity(self, table_name, condition: Condition):
+        """Estimated fraction of table_name's rows that satisfy condition,
+        from the catalog's MCV lists and equi-depth histograms."""
+        schema = self.schema_manager.get_table_schema(table_name)
+        if schema is None:
+            raise ValueError(f"Tabel '{table_name}' tidak ditemukan")
+        attr_types = {attr['name']: attr['type'] for attr in schema.get_attributes()}
+        if condition.column not in attr_types:
+            raise ValueError(f"Kolom '{condition.column}' tidak ada di tabel '{table_name}'")
+
+        table_file = self._get_table_file_path(table_name)
+        if not self._table_file_exists(table_name):
+            return 0.0
+
+        with self._metrics.operation('estimate_selectivity', table_name), self.locks.table(table_name).read():
+            table_stats = self.stats_catalog.get(table_name)
+            if table_stats is None:
+                table_stats = self._analyze_table(table_name, schema, table_file)
+            elif (table_stats.sketches is None
+                  and table_stats.changes_since_histograms > HISTOGRAM_REFRESH_FRACTION * max(table_stats.n_r, 1)):
+                # Exact counts are always current, so stale histograms can be
+                # rebuilt from them without a scan
+                self.stats_catalog.rebuild_histograms(table_name, NUM_BUCKETS, NUM_MCV)
+
+        if table_stats.n_r <= 0:
+            return 0.0
+
+        column_type = attr_types[condition.column]
+        probe = 0 if column_type == 'int' else 0.0 if column_type == 'float' else ''
+        value = coerce_operand(probe, condition.operand)
+        if column_type == 'float' and isinstance(value, (int, float)):
+            value = round(float(value), 2)
+
+        # Exact extremes rule values out; a sampled histogram's bounds do not
+        extremes = table_stats.extremes.get(condition.column)
+        if extremes is not None:
+            selectivity = extremes_selectivity(extremes[0], extremes[1], condition.operation, value)
+            if selectivity is not None:
+                return selectivity
+
+        distinct = min(table_stats.distinct(condition.column), table_stats.n_r)
+        histogram = table_stats.histograms.get(condition.column)
+        try:
+            if histogram is not None:
+                return histogram.selectivity(condition.operation, value, distinct, table_stats.n_r)
+        except TypeError:
+            pass
+
+        # No usable histogram: System R style defaults
+        if condition.operation == '=':
+            return 1 / distinct if distinct else DEFAULT_EQ_SELECTIVITY
+        if condition.operation in ('<>', '!='):
+            return 1 - (1 / distinct if distinct else DEFAULT_EQ_SELECTIVITY)
+        return DEFAULT_RANGE_SELECTIVITY
+
+    def _table_fingerprint(self, table):
+        table_file = self._get_table_file_path(table)
+        if not os.path.exists(table_file):
+            return None
+        st = os.stat(table_file)
+        return (st.st_size, st.st_mtime_ns)
+
+    def _table_fingerprints(self):
+        fingerprints = {}
+        for table in self.schema_manager.list_tables():
+            fingerprint = self._table_fingerprint(table)
+            if fingerprint is not None:
+                fingerprints[table] = fingerprint
+        return fingerprints
+
+    def save_stats(self):
+        # Each entry is encoded under its own table's lock and the file is
+        # written after the last one is released, so a save holds up the
+        # writers of one table at a time, and only while it is encoded
+        saved_changes = self.stats_catalog.unsaved_changes
+        entries = []
+        for table in sorted(self.schema_manager.list_tables()):
+            if self.stats_catalog.get(table) is None:
+                continue
+            with self.locks.table(table).write():
+                entry = self.stats_catalog.encode_table(table, self._table_fingerprint(table))
+            if entry is not None:
+                entries.append(entry)
+        self.stats_catalog.write(entries, saved_changes)
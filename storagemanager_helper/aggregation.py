@@ -0,0 +1,115 @@
+from storagemanager_helper.row_serializer import RowSerializer
+from storagemanager_helper.predicate import match_all
+
+AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'MIN', 'MAX', 'AVG')
+
+
+def aggregate_label(function, column):
+    return f"{function}({column})"
+
+
+class AggregateSet:
+    """The aggregates of one aggregate_block call and their running state.
+
+    A state is a list with one accumulator per aggregate; states of
+    different page ranges merge, so workers can fold their chunks
+    independently."""
+
+    def __init__(self, aggregates):
+        self.aggregates = [(function.upper(), column) for function, column in aggregates]
+        # Columns decoded per row; COUNT(*) needs none
+        self.columns = tuple(dict.fromkeys(column for _, column in self.aggregates if column != '*'))
+        self._positions = [
+            None if column == '*' else self.columns.index(column) for _, column in self.aggregates
+        ]
+
+    def labels(self):
+        return [aggregate_label(function, column) for function, column in self.aggregates]
+
+    def new_state(self):
+        return [[0, 0] if function == 'AVG' else (0 if function in ('COUNT', 'SUM') else None)
+                for function, _ in self.aggregates]
+
+    def add(self, state, values):
+        for i, (function, _) in enumerate(self.aggregates):
+            position = self._positions[i]
+            if position is None:
+                state[i] += 1
+                continue
+            value = values[position]
+            if value is None:
+                continue
+            if function == 'COUNT':
+                state[i] += 1
+            elif function == 'SUM':
+                state[i] += value
+            elif function == 'MIN':
+                if state[i] is None or value < state[i]:
+                    state[i] = value
+            elif function == 'MAX':
+                if state[i] is None or value > state[i]:
+                    state[i] = value
+            else:
+                state[i][0] += value
+                state[i][1] += 1
+
+    def merge(self, state, other):
+        for i, (function, _) in enumerate(self.aggregates):
+            if function in ('COUNT', 'SUM'):
+                state[i] += other[i]
+            elif function == 'AVG':
+                state[i][0] += other[i][0]
+                state[i][1] += other[i][1]
+            elif other[i] is not None and (
+                state[i] is None or (other[i] < state[i] if function == 'MIN' else other[i] > state[i])
+            ):
+                state[i] = other[i]
+
+    def result(self, state, matched):
+        # SQL semantics: SUM of no rows is NULL, COUNT is 0
+        values = []
+        for i, (function, _) in enumerate(self.aggregates):
+            if function == 'AVG':
+                total, n = state[i]
+                values.append(total / n if n else None)
+            elif function == 'SUM' and not matched:
+                values.append(None)
+            else:
+                values.append(state[i])
+        return values
+
+
+def aggregate_records(schema, records, conditions, group_by, aggregate_set, groups=None):
+    """Fold raw records into groups ({group key: [rows matched, state]}),
+    decoding only the columns the conditions, grouping and aggregates
+    use. Returns (groups, records scanned)."""
+    serializer = RowSerializer()
+    condition_columns = tuple(dict.fromkeys(cond.column for cond in conditions))
+    read_conditions = serializer.column_reader(schema, condition_columns)
+    read_group = serializer.column_reader(schema, group_by)
+    read_values = serializer.column_reader(schema, aggregate_set.columns)
+    groups = {} if groups is None else groups
+
+    scanned = 0
+    for record_bytes in records:
+        scanned += 1
+        if conditions and not match_all(dict(zip(condition_columns, read_conditions(record_bytes))), conditions):
+            continue
+        key = read_group(record_bytes)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0, aggregate_set.new_state()]
+        group[0] += 1
+        aggregate_set.add(group[1], read_values(record_bytes))
+    return groups, scanned
+
+
+def merge_groups(aggregate_set, groups, other):
+    for key, (matched, state) in other.items():
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [matched, state]
+        else:
+            group[0] += matched
+            aggregate_set.merge(group[1], state)
+    return groups
@@ -0,0 +1,267 @@
+from storagemanager_helper.slotted_page import SlottedPage, SlottedPageView, PAGE_SIZE
+from storagemanager_helper.metrics import count
+
+
+class _TableState:
+    def __init__(self, lock, f, page_count):
+        self.lock = lock
+        self.f = f
+        self.page_count = page_count
+        self.pages = {}
+        self.pending_ops = []
+        # Unique keys claimed and freed by this batch: {column: (claimed, freed)}
+        self.unique_keys = {}
+
+
+class BatchSession:
+    """Many inserts, updates and deletes applied as one unit.
+
+    Each table is locked exclusively and opened once, on first touch. Changed
+    pages stay in memory and index/stats maintenance is queued; commit()
+    writes the pages (as one WAL transaction when logging is on), applies the
+    queued operations and saves each touched index once. rollback() simply
+    drops everything, since nothing reaches disk before commit.
+
+    The session holds its table locks until it ends, so the same thread must
+    not call the StorageManager directly on those tables meanwhile. Locks
+    are always taken in table name order, the order checkpoint() takes
+    them in, so two sessions can never wait on each other. tables, if
+    given, are locked up front and are the only ones the session may
+    touch; otherwise touching a table that sorts before one already held
+    is rejected, as waiting for it could deadlock.
+    """
+
+    def __init__(self, storage_manager, tables=None):
+        self.storage_manager = storage_manager
+        self._tables = {}
+        self._finished = False
+        self._declared = None
+        if tables is not None:
+            tables = sorted(set([tables] if isinstance(tables, str) else tables))
+            try:
+                for table_name in tables:
+                    if storage_manager.schema_manager.get_table_schema(table_name) is None:
+                        raise ValueError(f"Tabel '{table_name}' tidak ditemukan")
+                    self._table(table_name, storage_manager._get_table_file_path(table_name))
+            except BaseException:
+                self._release()
+                raise
+            self._declared = frozenset(tables)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._finished:
+            return False
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def _table(self, table_name, table_path):
+        if self._finished:
+            raise RuntimeError("Batch sudah selesai")
+
+        state = self._tables.get(table_name)
+        if state is None:
+            if self._declared is not None:
+                raise ValueError(f"Tabel '{table_name}' tidak dideklarasikan di batch ini")
+            held = max(self._tables, default=None)
+            if held is not None and table_name < held:
+                raise ValueError(f"Tabel '{table_name}' harus dikunci sebelum '{held}'; "
+                                 f"deklarasikan lewat batch(tables=[...])")
+            lock = self.storage_manager.locks.table(table_name)
+            lock.acquire_write()
+            try:
+                f = self.storage_manager.files.open(table_path)
+            except Exception:
+                lock.release_write()
+                raise
+            f.seek(0, 2)
+            state = _TableState(lock, f, -(-f.tell() // PAGE_SIZE))
+            self._tables[table_name] = state
+        return state
+
+    def _page_source(self, state, page_id):
+        # Pages changed earlier in the batch shadow the file
+        page = state.pages.get(page_id)
+        if page is not None:
+            return page
+        state.f.seek(page_id * PAGE_SIZE)
+        page_bytes = state.f.read(PAGE_SIZE)
+        count('pages_read')
+        count('bytes_read', len(page_bytes))
+        return SlottedPageView(page_bytes.ljust(PAGE_SIZE, b"\x00"))
+
+    def _page_for_write(self, state, page_id, source, staged=None):
+        # staged, if given, collects copies instead, for changes that may
+        # still be rejected
+        pages = state.pages if staged is None else staged
+        page = pages.get(page_id)
+        if page is None:
+            page = pages[page_id] = source.copy() if isinstance(source, SlottedPage) else source.to_page()
+        return page
+
+    def write_block(self, data_write):
+        sm = self.storage_manager
+        table = data_write.table
+        with sm._metrics.operation('batch_write_block', table):
+            schema, table_path, column, conditions = sm._validate_write(data_write)
+            state = self._table(table, table_path)
+
+            if column is None and not conditions:
+                return self._insert(state, table, schema, data_write.new_value)
+            rows_affected = self._update(state, table, schema, conditions, column, data_write.new_value)
+            count('rows_matched', rows_affected)
+            return rows_affected
+
+    def _insert(self, state, table, schema, new_record):
+        sm = self.storage_manager
+        record_bytes = sm.row_serializer.serialize(schema, new_record)
+
+        unique_indexes = sm._unique_indexes(table)
+        if unique_indexes:
+            sm._check_unique(table, unique_indexes, [sm.row_serializer.deserialize(schema, record_bytes)],
+                             pending=state.unique_keys)
+
+        page_id = state.page_count - 1
+        slot_id = None
+        if page_id >= 0:
+            source = self._page_source(state, page_id)
+            page = source if isinstance(source, SlottedPage) else source.to_page()
+            try:
+                slot_id = page.add_record(record_bytes)
+                state.pages[page_id] = page
+            except Exception:
+                slot_id = None
+
+        if slot_id is None:
+            page = SlottedPage()
+            page_id = state.page_count
+            slot_id = page.add_record(record_bytes)
+            state.pages[page_id] = page
+            state.page_count += 1
+
+        state.pending_ops.extend(sm._insert_ops(table, schema, record_bytes, page_id, slot_id))
+        return 1
+
+    def _update(self, state, table, schema, conditions, column, new_value):
+        sm = self.storage_manager
+        new_value = sm._normalize_new_value(column, new_value)
+        index_columns = sm._index_columns(table)
+        unique_indexes = sm._unique_indexes(table, new_value)
+        # With a unique key at stake, rows are rewritten on staged copies so
+        # a violation leaves the batch's pages untouched
+        staged = {} if unique_indexes else None
+        old_records = []
+        new_records = []
+        ops = []
+        rows_affected = 0
+
+        for page_id in range(state.page_count):
+            source = self._page_source(state, page_id)
+            count('rows_deserialized', source.record_count)
+            for slot_id in range(source.record_count):
+                record = sm.row_serializer.deserialize(schema, source.get_record(slot_id))
+                if not sm._match_all(record, conditions):
+                    continue
+
+                page = self._page_for_write(state, page_id, source, staged)
+                if unique_indexes:
+                    old_records.append(dict(record))
+                ops.extend(sm._update_row(
+                    table, schema, index_columns, page, page_id, slot_id, record, column, new_value
+                ))
+                if unique_indexes:
+                    new_records.append(sm.row_serializer.deserialize(schema, page.get_record(slot_id)))
+                source = page
+                rows_affected += 1
+
+        if unique_indexes:
+            sm._check_unique(table, unique_indexes, new_records, old_records, pending=state.unique_keys)
+            state.pages.update(staged)
+        state.pending_ops.extend(ops)
+        return rows_affected
+
+    def delete_block(self, data_deletion):
+        sm = self.storage_manager
+        with sm._metrics.operation('batch_delete_block', data_deletion.table):
+            rows_deleted = self._delete(data_deletion)
+            count('rows_matched', rows_deleted)
+            return rows_deleted
+
+    def _delete(self, data_deletion):
+        sm = self.storage_manager
+        table = data_deletion.table
+        schema, table_path, conditions = sm._validate_deletion(data_deletion)
+        state = self._table(table, table_path)
+        index_columns = sm._index_columns(table)
+        unique_indexes = sm._unique_indexes(table)
+        rows_deleted = 0
+
+        for page_id in range(state.page_count):
+            source = self._page_source(state, page_id)
+            count('rows_deserialized', source.record_count)
+            records = []
+            sizes = []
+            doomed = []
+            for slot_id in range(source.record_count):
+                record_bytes = source.get_record(slot_id)
+                record = sm.row_serializer.deserialize(schema, record_bytes)
+                records.append(record)
+                sizes.append(len(record_bytes))
+                if sm._match_all(record, conditions):
+                    doomed.append(slot_id)
+
+            if doomed:
+                if unique_indexes:
+                    # Deleted keys may be inserted again later in the batch
+                    sm._check_unique(table, unique_indexes, [], [records[i] for i in doomed], pending=state.unique_keys)
+                page = self._page_for_write(state, page_id, source)
+                slot_map = page.delete_records(doomed)
+                state.pending_ops.extend(sm._delete_ops(table, index_columns, page_id, records, sizes, slot_map))
+                rows_deleted += len(doomed)
+
+        return rows_deleted
+
+    def commit(self):
+        if self._finished:
+            raise RuntimeError("Batch sudah selesai")
+
+        sm = self.storage_manager
+        with sm._metrics.operation('batch_commit'):
+            self._commit()
+
+    def _commit(self):
+        sm = self.storage_manager
+        tables = list(self._tables)
+        try:
+            images_by_table = {
+                table: {page_id: page.serialize() for page_id, page in state.pages.items()}
+                for table, state in self._tables.items()
+            }
+            sm._log_pages(images_by_table)
+            for table, state in self._tables.items():
+                sm._write_pages(table, state.f, images_by_table[table])
+
+            for table, state in self._tables.items():
+                sm._apply_ops(state.pending_ops)
+                if state.pending_ops:
+                    sm._save_indexes(table)
+        finally:
+            self._release()
+
+        sm._after_write(tables)
+
+    def rollback(self):
+        if not self._finished:
+            self._release()
+
+    def _release(self):
+        self._finished = True
+        for state in self._tables.values():
+            state.f.close()
+            state.lock.release_write()
+        self._tables = {}
@@ -0,0 +1,190 @@
+import os
+import math
+import struct
+import hashlib
+import threading
+from storagemanager_helper.metrics import count
+
+BLOOM_DIRNAME = 'blooms'
+BLOOM_MAGIC = b'BLM1'
+DEFAULT_BITS_PER_KEY = 10
+MIN_SEGMENT_BITS = 64
+
+
+def bloom_key(value):
+    """Bytes hashed for value, or None when it cannot be hashed. Values
+    that compare equal encode alike (3 and 3.0 both as an int), since
+    an '=' predicate matches them to each other."""
+    if value is None:
+        return b'n'
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and math.isfinite(value) and value == int(value):
+        value = int(value)
+    if isinstance(value, int):
+        return b'i' + str(value).encode('utf-8')
+    if isinstance(value, float):
+        return b'f' + repr(value).encode('utf-8')
+    if isinstance(value, str):
+        return b's' + value.encode('utf-8')
+    return None
+
+
+class BloomFilter:
+    """Bloom filter over one column of a table, one bitmap per segment of
+    pages_per_segment consecutive pages. A clear bit means no row on those
+    pages ever held the value; rows deleted or updated away leave their
+    bits set until the filter is rebuilt."""
+
+    def __init__(self, table, column, pages_per_segment, num_bits, num_hashes, segments=None):
+        self.table = table
+        self.column = column
+        self.pages_per_segment = pages_per_segment
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.segments = segments if segments is not None else []
+        self._mutex = threading.Lock()
+
+    def _positions(self, key):
+        # Double hashing: k probes from the two halves of one digest
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, page_id, value):
+        key = bloom_key(value)
+        if key is None:
+            return
+        segment_id = page_id // self.pages_per_segment
+        with self._mutex:
+            while len(self.segments) <= segment_id:
+                self.segments.append(bytearray(self.num_bits // 8))
+            bits = self.segments[segment_id]
+            for position in self._positions(key):
+                bits[position >> 3] |= 1 << (position & 7)
+
+    def candidate_pages(self, value, page_count):
+        """Page ids below page_count that may hold value, or None when the
+        filter cannot tell (value is not hashable here)."""
+        key = bloom_key(value)
+        if key is None:
+            return None
+        positions = self._positions(key)
+        pages = []
+        for segment_id in range(-(-page_count // self.pages_per_segment)):
+            if segment_id < len(self.segments):
+                bits = self.segments[segment_id]
+                if not all(bits[position >> 3] & (1 << (position & 7)) for position in positions):
+                    continue
+            else:
+                # Pages appended since this filter last saw a row
+                continue
+            first = segment_id * self.pages_per_segment
+            pages.extend(range(first, min(first + self.pages_per_segment, page_count)))
+        return pages
+
+    def cleared(self):
+        """Empty filter with the same shape, to rebuild into."""
+        return BloomFilter(self.table, self.column, self.pages_per_segment, self.num_bits, self.num_hashes)
+
+    def serialize(self):
+        table_bytes = self.table.encode('utf-8')
+        column_bytes = self.column.encode('utf-8')
+        with self._mutex:
+            segments = [bytes(bits) for bits in self.segments]
+        result = bytearray(BLOOM_MAGIC)
+        result += struct.pack('<H', len(table_bytes)) + table_bytes
+        result += struct.pack('<H', len(column_bytes)) + column_bytes
+        result += struct.pack('<IIII', self.pages_per_segment, self.num_bits, self.num_hashes, len(segments))
+        for bits in segments:
+            result += bits
+        return bytes(result)
+
+    @classmethod
+    def deserialize(cls, data):
+        if data[:4] != BLOOM_MAGIC:
+            raise ValueError("not a bloom filter file")
+        offset = 4
+        names = []
+        for _ in range(2):
+            length = struct.unpack_from('<H', data, offset)[0]
+            offset += 2
+            names.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        pages_per_segment, num_bits, num_hashes, segment_count = struct.unpack_from('<IIII', data, offset)
+        offset += 16
+        segment_bytes = num_bits // 8
+        segments = [
+            bytearray(data[offset + i * segment_bytes:offset + (i + 1) * segment_bytes])
+            for i in range(segment_count)
+        ]
+        return cls(names[0], names[1], pages_per_segment, num_bits, num_hashes, segments)
+
+
+def filter_size(rows_per_page, pages_per_segment, bits_per_key=DEFAULT_BITS_PER_KEY):
+    """(bits per segment, hash count) for about bits_per_key bits per row
+    a full segment can hold; 10 bits per key gives ~1% false positives."""
+    num_bits = max(MIN_SEGMENT_BITS, math.ceil(rows_per_page * pages_per_segment * bits_per_key))
+    num_bits = -(-num_bits // 8) * 8
+    num_hashes = max(1, round(bits_per_key * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilterManager:
+    """Bloom filters of every table, one sidecar file each under blooms/.
+    All are loaded at startup; they are small next to the tables."""
+
+    def __init__(self, base_path='data'):
+        self.bloom_path = os.path.join(base_path, BLOOM_DIRNAME)
+        os.makedirs(self.bloom_path, exist_ok=True)
+        self.filters = {}
+        self._mutex = threading.Lock()
+
+        for filename in os.listdir(self.bloom_path):
+            if filename.endswith('.bloom'):
+                with open(os.path.join(self.bloom_path, filename), 'rb') as f:
+                    bloom = BloomFilter.deserialize(f.read())
+                self.filters[(bloom.table, bloom.column)] = bloom
+
+    def _get_filename(self, table_name, column_name):
+        return os.path.join(self.bloom_path, f"{table_name}_{column_name}.bloom")
+
+    def put_filter(self, bloom):
+        """Start using bloom for its table and column, replacing any filter
+        there; save_filter() persists it."""
+        with self._mutex:
+            self.filters[(bloom.table, bloom.column)] = bloom
+
+    def get_filter(self, table_name, column_name):
+        return self.filters.get((table_name, column_name))
+
+    def list_filters(self, table_name):
+        """Columns of table_name that carry a Bloom filter."""
+        with self._mutex:
+            return [column for table, column in self.filters if table == table_name]
+
+    def add(self, table_name, column_name, page_id, value):
+        bloom = self.filters.get((table_name, column_name))
+        if bloom is not None:
+            bloom.add(page_id, value)
+
+    def save_filter(self, table_name, column_name):
+        bloom = self.filters.get((table_name, column_name))
+        if bloom is None:
+            return False
+        data = bloom.serialize()
+        path = self._get_filename(table_name, column_name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        count('bytes_written', len(data))
+        return True
+
+    def drop_filter(self, table_name, column_name):
+        with self._mutex:
+            self.filters.pop((table_name, column_name), None)
+        path = self._get_filename(table_name, column_name)
+        if os.path.exists(path):
+            os.remove(path)
+        return True
@@ -0,0 +1,97 @@
+import os
+import struct
+import threading
+
+CLUSTER_FILENAME = 'cluster.dat'
+CLUSTER_VERSION = 1
+
+# Left next to a table file while cluster() swaps it in; on startup its
+# presence means the indexes may still point into the old layout
+REINDEX_SUFFIX = '.reindex'
+
+
+def sort_key(value):
+    """Orders keys the way the B+ tree does: NULL first, composite keys
+    column by column."""
+    if isinstance(value, tuple):
+        return tuple(sort_key(part) for part in value)
+    return (value is not None, value)
+
+
+class ClusterSpec:
+    def __init__(self, column, recluster_threshold=None, clustered_pages=0):
+        self.column = column
+        # Fraction of the table's pages appended since the last cluster()
+        # that makes the next write recluster; None leaves it to the caller
+        self.recluster_threshold = recluster_threshold
+        # Page count right after the last cluster(); pages past it are in
+        # insertion order
+        self.clustered_pages = clustered_pages
+
+    def needs_recluster(self, page_count):
+        if self.recluster_threshold is None or page_count == 0:
+            return False
+        return (page_count - self.clustered_pages) / page_count > self.recluster_threshold
+
+
+class ClusterCatalog:
+    """Clustering key of each table, persisted to cluster.dat."""
+
+    def __init__(self, base_path='data'):
+        self.path = os.path.join(base_path, CLUSTER_FILENAME)
+        self.tables = {}
+        self._mutex = threading.Lock()
+
+    def get(self, table_name):
+        with self._mutex:
+            return self.tables.get(table_name)
+
+    def put(self, table_name, spec):
+        with self._mutex:
+            if spec is None:
+                self.tables.pop(table_name, None)
+            else:
+                self.tables[table_name] = spec
+            self._save()
+
+    def _encode_name(self, name):
+        name_bytes = name.encode('utf-8')
+        return struct.pack('<H', len(name_bytes)) + name_bytes
+
+    def _decode_name(self, data, offset):
+        length = struct.unpack_from('<H', data, offset)[0]
+        offset += 2
+        return data[offset:offset + length].decode('utf-8'), offset + length
+
+    def _save(self):
+        result = bytearray(struct.pack('<BI', CLUSTER_VERSION, len(self.tables)))
+        for table_name, spec in self.tables.items():
+            result += self._encode_name(table_name)
+            result += self._encode_name(spec.column)
+            # A negative threshold stands for None
+            threshold = -1.0 if spec.recluster_threshold is None else spec.recluster_threshold
+            result += struct.pack('<dQ', threshold, spec.clustered_pages)
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(result)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        self.tables = {}
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        version, table_count = struct.unpack_from('<BI', data, 0)
+        if version != CLUSTER_VERSION:
+            return
+        offset = 5
+        for _ in range(table_count):
+            table_name, offset = self._decode_name(data, offset)
+            column, offset = self._decode_name(data, offset)
+            threshold, clustered_pages = struct.unpack_from('<dQ', data, offset)
+            offset += 16
+            self.tables[table_name] = ClusterSpec(column, None if threshold < 0 else threshold, clustered_pages)
@@ -0,0 +1,88 @@
+import os
+import random
+import string
+from storagemanager_helper import init
+from storagemanager_helper.schema_manager import SchemaManager
+from storagemanager_helper.row_serializer import RowSerializer
+from storagemanager_helper.slotted_page import SlottedPage
+
+
+class DataGenerator:
+    """Streams synthetic rows and writes them straight into table pages.
+
+    Rows are produced lazily, so 10^7-row tables never sit in memory. The
+    default schemas get init.py's rows (sequential keys, name pools, GPA in
+    [2, 4], Attends referencing existing keys); any other schema gets
+    type-driven values, with its first int column as a sequential key.
+    """
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.serializer = RowSerializer()
+
+    def random_value(self, attr_type, size):
+        rng = self.random
+        if attr_type == "int":
+            return rng.randint(0, 2 ** 31 - 1)
+        if attr_type == "float":
+            return round(rng.uniform(0, 1000), 2)
+        length = size if attr_type == "char" else rng.randint(1, max(1, size))
+        return "".join(rng.choices(string.ascii_letters, k=length))
+
+    def generic_rows(self, schema, count):
+        attributes = schema.get_attributes()
+        key = next((attr["name"] for attr in attributes if attr["type"] == "int"), None)
+        for i in range(1, count + 1):
+            row = {}
+            for attr in attributes:
+                if attr["name"] == key:
+                    row[attr["name"]] = i
+                else:
+                    row[attr["name"]] = self.random_value(attr["type"], attr["size"])
+            yield row
+
+    def rows_for(self, table_name, schema, count, row_counts=None):
+        row_counts = row_counts or {}
+        if table_name == "Student":
+            return init.student_rows(count, self.random)
+        if table_name == "Course":
+            return init.course_rows(count, self.random)
+        if table_name == "Attends":
+            return init.attends_rows(count, row_counts.get("Student", count), row_counts.get("Course", count), self.random)
+        return self.generic_rows(schema, count)
+
+    def write_table(self, table_path, schema, rows):
+        """Pack rows into slotted pages and write them out; returns the row count."""
+        written = 0
+        page = SlottedPage()
+        with open(table_path, "wb") as f:
+            for row in rows:
+                record_bytes = self.serializer.serialize(schema, row)
+                try:
+                    page.add_record(record_bytes)
+                except Exception:
+                    if page.record_count == 0:
+                        raise ValueError(f"Record terlalu besar untuk satu page ({len(record_bytes)} bytes)")
+                    f.write(page.serialize())
+                    page = SlottedPage()
+                    page.add_record(record_bytes)
+                written += 1
+            if page.record_count > 0:
+                f.write(page.serialize())
+        return written
+
+    def create_database(self, base_path, row_counts, schemas=None):
+        """Write schema.dat and one table file per schema, with row_counts
+        ({table: rows}) rows each. schemas defaults to init.default_schemas()."""
+        schemas = schemas if schemas is not None else init.default_schemas()
+        os.makedirs(base_path, exist_ok=True)
+
+        manager = SchemaManager(base_path)
+        for table_name, schema in schemas.items():
+            manager.add_table_schema(table_name, schema)
+        manager.save_schemas()
+
+        for table_name, schema in schemas.items():
+            count = row_counts.get(table_name, 0)
+            table_path = os.path.join(base_path, f"{table_name}.dat")
+            self.write_table(table_path, schema, self.rows_for(table_name, schema, count, row_counts))
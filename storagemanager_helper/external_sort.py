@@ -0,0 +1,169 @@
+import os
+import sys
+import heapq
+import pickle
+import shutil
+import tempfile
+from storagemanager_helper.metrics import count
+
+# Spill files of in-progress sorts and joins live in this directory under
+# base_path; what a crash leaves behind is removed on the next startup
+SORT_DIRNAME = 'sort_tmp'
+DEFAULT_SORT_MEMORY = 16 * 1024 * 1024
+
+# Items are pickled to spill files in batches of this many, which is also
+# how many items of each file a reader holds in memory
+SPILL_BATCH_ITEMS = 512
+
+
+def approximate_size(item):
+    """Rough memory footprint of a sort item, in bytes."""
+    if isinstance(item, (bytes, bytearray, str)):
+        return len(item) + 49
+    if isinstance(item, (tuple, list)):
+        return 56 + 8 * len(item) + sum(approximate_size(part) for part in item)
+    if isinstance(item, dict):
+        return 232 + 8 * len(item) + sum(approximate_size(value) for value in item.values())
+    return sys.getsizeof(item)
+
+
+class SpillFile:
+    """Items written to disk in pickled batches and read back in order.
+
+    Append, then iterate (which finishes writing); remove() deletes it."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._batch = []
+
+    def append(self, item):
+        self._batch.append(item)
+        if len(self._batch) == SPILL_BATCH_ITEMS:
+            self._flush()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def _flush(self):
+        pickle.dump(self._batch, self._file, pickle.HIGHEST_PROTOCOL)
+        self._batch = []
+
+    def finish(self):
+        if self._file is not None:
+            if self._batch:
+                self._flush()
+            count('bytes_written', self._file.tell())
+            self._file.close()
+            self._file = None
+
+    def __iter__(self):
+        self.finish()
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def remove(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def spill_directory(temp_dir, prefix):
+    """Fresh private directory under temp_dir for one operation's files."""
+    os.makedirs(temp_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir=temp_dir)
+
+
+class ExternalSorter:
+    """Sorts any number of items within a memory budget.
+
+    Items appended are buffered until their approximate size passes
+    memory_bytes, then sorted and spilled to a run file in a private
+    directory under temp_dir. Iterating merges the runs k ways (in several
+    passes when there are more than max_fan_in of them) and yields the
+    items in order; when nothing was spilled they are sorted in memory.
+    The sort is stable. Close it (or use it as a context manager) to
+    remove the run files.
+    """
+
+    def __init__(self, temp_dir, key=None, reverse=False, memory_bytes=DEFAULT_SORT_MEMORY,
+                 item_size=approximate_size, max_fan_in=64):
+        if memory_bytes <= 0:
+            raise ValueError("memory_bytes must be positive")
+        if max_fan_in < 2:
+            raise ValueError("max_fan_in must be at least 2")
+        self.temp_dir = temp_dir
+        self.key = key
+        self.reverse = reverse
+        self.memory_bytes = memory_bytes
+        self.item_size = item_size
+        self.max_fan_in = max_fan_in
+        self.runs_written = 0
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._runs = []
+        self._run_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def append(self, item):
+        self._buffer.append(item)
+        self._buffered_bytes += self.item_size(item)
+        if self._buffered_bytes >= self.memory_bytes:
+            self._spill()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iter__(self):
+        if not self._runs:
+            self._buffer.sort(key=self.key, reverse=self.reverse)
+            return iter(self._buffer)
+        if self._buffer:
+            self._spill()
+        # Merge the oldest runs first so equal items keep insertion order
+        while len(self._runs) > self.max_fan_in:
+            merged = self._write_run(self._merge(self._runs[:self.max_fan_in]))
+            for run in self._runs[:self.max_fan_in]:
+                run.remove()
+            self._runs[:self.max_fan_in] = [merged]
+        return self._merge(self._runs)
+
+    def close(self):
+        self._buffer = []
+        self._runs = []
+        if self._run_dir is not None:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+
+    def _spill(self):
+        self._buffer.sort(key=self.key, reverse=self.reverse)
+        self._runs.append(self._write_run(self._buffer))
+        self._buffer = []
+        self._buffered_bytes = 0
+
+    def _write_run(self, items):
+        if self._run_dir is None:
+            self._run_dir = spill_directory(self.temp_dir, 'sort_')
+        run = SpillFile(os.path.join(self._run_dir, f"run_{self.runs_written}"))
+        self.runs_written += 1
+        run.extend(items)
+        run.finish()
+        count('sort_runs')
+        return run
+
+    def _merge(self, runs):
+        return heapq.merge(*runs, key=self.key, reverse=self.reverse)
@@ -0,0 +1,146 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class PooledFile:
+    """File-like view of a pooled descriptor with its own offset.
+
+    Reads and writes are positional (pread/pwrite), so any number of
+    PooledFiles - in any number of threads - can share one descriptor.
+    close() only hands the descriptor back to the pool.
+    """
+
+    def __init__(self, pool, handle):
+        self._pool = pool
+        self._handle = handle
+        self.fd = handle.fd
+        self.offset = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def fileno(self):
+        return self.fd
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            self.offset = offset
+        elif whence == os.SEEK_CUR:
+            self.offset += offset
+        else:
+            self.offset = os.fstat(self.fd).st_size + offset
+        return self.offset
+
+    def tell(self):
+        return self.offset
+
+    def read(self, size):
+        data = os.pread(self.fd, size, self.offset)
+        self.offset += len(data)
+        return data
+
+    def readinto(self, buffer):
+        n = os.preadv(self.fd, [buffer], self.offset)
+        self.offset += n
+        return n
+
+    def write(self, data):
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            written += os.pwrite(self.fd, view[written:], self.offset + written)
+        self.offset += written
+        return written
+
+    def flush(self):
+        # Unbuffered: every write already reached the OS
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._pool._release(self._handle)
+
+
+class _Handle:
+    def __init__(self, fd):
+        self.fd = fd
+        self.pins = 0
+        # Set once the pool has let go of it; closed when the last user does
+        self.retired = False
+
+
+class FileHandlePool:
+    """Bounded LRU of open table file descriptors, reused across calls.
+
+    open(path) pins the descriptor until the returned PooledFile is closed;
+    only unpinned descriptors are evicted, so the pool may briefly exceed
+    capacity while many files are in use. invalidate(path) must be called
+    when a file is dropped, renamed or replaced, so later opens see the new
+    file rather than the old inode.
+    """
+
+    def __init__(self, capacity=32):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._handles = OrderedDict()
+
+    def open(self, path):
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is None:
+                try:
+                    fd = os.open(path, os.O_RDWR)
+                except PermissionError:
+                    fd = os.open(path, os.O_RDONLY)
+                handle = self._handles[path] = _Handle(fd)
+                handle.pins += 1
+                self._evict()
+            else:
+                self._handles.move_to_end(path)
+                handle.pins += 1
+            return PooledFile(self, handle)
+
+    def _evict(self):
+        for path in list(self._handles):
+            if len(self._handles) <= self.capacity:
+                return
+            if self._handles[path].pins == 0:
+                self._retire(path)
+
+    def _retire(self, path):
+        handle = self._handles.pop(path, None)
+        if handle is None:
+            return
+        handle.retired = True
+        if handle.pins == 0:
+            os.close(handle.fd)
+
+    def _release(self, handle):
+        with self._lock:
+            handle.pins -= 1
+            if handle.retired:
+                if handle.pins == 0:
+                    os.close(handle.fd)
+            elif len(self._handles) > self.capacity:
+                self._evict()
+
+    def invalidate(self, path):
+        with self._lock:
+            self._retire(path)
+
+    def close(self):
+        with self._lock:
+            for path in list(self._handles):
+                self._retire(path)
+
+    def __len__(self):
+        return len(self._handles)
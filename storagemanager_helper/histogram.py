@@ -0,0 +1,223 @@
+import random
+from bisect import bisect_left, bisect_right
+from storagemanager_helper.predicate import compare
+
+NUM_BUCKETS = 20
+NUM_MCV = 10
+# Rows sampled for histograms when a scan does not keep exact value counts
+SAMPLE_ROWS = 30000
+
+# Fallbacks when a column has no histogram, in the spirit of System R
+DEFAULT_EQ_SELECTIVITY = 0.005
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+
+
+class Reservoir:
+    """Uniform sample of at most `size` items from a stream (Algorithm R)."""
+
+    def __init__(self, size=SAMPLE_ROWS):
+        self.size = size
+        self.items = []
+        self.seen = 0
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = random.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+    @classmethod
+    def merge(cls, reservoirs, size=SAMPLE_ROWS):
+        # Draw from each part in proportion to the rows it saw, so the
+        # union is still (approximately) uniform over the whole stream
+        merged = cls(size)
+        total = sum(reservoir.seen for reservoir in reservoirs)
+        for reservoir in reservoirs:
+            if total == 0 or not reservoir.items:
+                continue
+            take = min(len(reservoir.items), round(size * reservoir.seen / total))
+            merged.items.extend(random.sample(reservoir.items, take))
+        merged.seen = total
+        return merged
+
+
+def widen(extremes, column, value):
+    """Stretch extremes[column], a [min, max] pair, to cover value."""
+    bounds = extremes.get(column)
+    if bounds is None:
+        extremes[column] = [value, value]
+    elif value < bounds[0]:
+        bounds[0] = value
+    elif value > bounds[1]:
+        bounds[1] = value
+
+
+def extremes_selectivity(low, high, operation, value):
+    """Selectivity of `column <operation> value` when every row's value is
+    known to lie in [low, high] and value is outside it, else None."""
+    try:
+        if value < low:
+            above_all = False
+        elif value > high:
+            above_all = True
+        else:
+            return None
+    except TypeError:
+        return None
+    if operation == '=':
+        return 0.0
+    if operation in ('<>', '!='):
+        return 1.0
+    if operation in ('<', '<='):
+        return 1.0 if above_all else 0.0
+    if operation in ('>', '>='):
+        return 0.0 if above_all else 1.0
+    return None
+
+
+class ColumnHistogram:
+    """Most-common values plus an equi-depth histogram over the rest.
+
+    mcv: [(value, fraction of all rows)], most frequent first.
+    bounds: sorted bucket boundaries; each of the len(bounds) - 1 buckets
+    holds the same share of the non-MCV rows.
+    distinct: distinct values in the column (including the MCVs).
+    sampled: built from a sample, so values the sample missed (inside or
+    outside bounds) may still be in the column.
+    """
+
+    def __init__(self, mcv=None, bounds=None, distinct=0, sampled=False):
+        self.mcv = mcv if mcv is not None else []
+        self.bounds = bounds if bounds is not None else []
+        self.distinct = distinct
+        self.sampled = sampled
+
+    @classmethod
+    def build(cls, value_counts, num_buckets=NUM_BUCKETS, num_mcv=NUM_MCV, sampled=False):
+        """Build from a Counter of value -> occurrences (the whole column or,
+        with sampled=True, a uniform sample of it)."""
+        total = sum(value_counts.values())
+        if total == 0:
+            return cls(sampled=sampled)
+
+        distinct = len(value_counts)
+        # A value only earns an MCV slot if it is clearly more common than
+        # average; on a near-unique column the histogram alone is better
+        average = total / distinct
+        mcv = [
+            (value, count / total)
+            for value, count in value_counts.most_common(num_mcv)
+            if count > 1 and count > 1.25 * average
+        ]
+
+        mcv_values = {value for value, _ in mcv}
+        rest = sorted(
+            ((value, count) for value, count in value_counts.items() if value not in mcv_values),
+            key=lambda item: item[0],
+        )
+        rest_total = sum(count for _, count in rest)
+
+        bounds = []
+        if rest:
+            buckets = min(num_buckets, len(rest))
+            bounds.append(rest[0][0])
+            seen = 0
+            next_boundary = 1
+            for value, count in rest:
+                seen += count
+                while next_boundary < buckets and seen >= next_boundary * rest_total / buckets:
+                    if value != bounds[-1]:
+                        bounds.append(value)
+                    next_boundary += 1
+            if rest[-1][0] != bounds[-1]:
+                bounds.append(rest[-1][0])
+
+        return cls(mcv, bounds, distinct, sampled)
+
+    def cover(self, value):
+        """Stretch the outer buckets to take in a value added after the
+        build, so it is not estimated as absent."""
+        bounds = self.bounds
+        if not bounds:
+            return
+        if value < bounds[0]:
+            if len(bounds) == 1:
+                bounds.insert(0, value)
+            else:
+                bounds[0] = value
+        elif value > bounds[-1]:
+            if len(bounds) == 1:
+                bounds.append(value)
+            else:
+                bounds[-1] = value
+
+    def _histogram_fraction(self):
+        return max(0.0, 1.0 - sum(frequency for _, frequency in self.mcv))
+
+    def _fraction_below(self, value, inclusive):
+        # Share of the histogram rows below value, interpolating linearly
+        # inside the bucket for numbers and taking its midpoint otherwise
+        bounds = self.bounds
+        if not bounds:
+            return 0.0
+        if len(bounds) == 1:
+            if value > bounds[0] or (inclusive and value == bounds[0]):
+                return 1.0
+            return 0.0
+        if value < bounds[0] or (not inclusive and value == bounds[0]):
+            return 0.0
+        if value > bounds[-1] or (inclusive and value == bounds[-1]):
+            return 1.0
+
+        bucket = (bisect_right if inclusive else bisect_left)(bounds, value) - 1
+        bucket = max(0, min(bucket, len(bounds) - 2))
+        low, high = bounds[bucket], bounds[bucket + 1]
+        if isinstance(value, (int, float)) and isinstance(low, (int, float)) and high != low:
+            within = (value - low) / (high - low)
+        else:
+            within = 0.5
+        return (bucket + min(max(within, 0.0), 1.0)) / (len(bounds) - 1)
+
+    def selectivity(self, operation, value, distinct=None, rows=None):
+        """Fraction of rows satisfying `column <operation> value`. distinct
+        overrides the (possibly sample-based) distinct count used for
+        equality on values outside the MCV list; rows is the table's row
+        count.
+
+        A sampled histogram rules nothing out: equality is at least
+        1/distinct, and ranges stay within [1/rows, 1 - 1/rows]."""
+        if distinct is None:
+            distinct = self.distinct
+        mcv_match = sum(frequency for mcv_value, frequency in self.mcv if compare(mcv_value, operation, value))
+        histogram_fraction = self._histogram_fraction()
+
+        if operation in ('=', '<>', '!='):
+            if any(mcv_value == value for mcv_value, _ in self.mcv):
+                equal = next(frequency for mcv_value, frequency in self.mcv if mcv_value == value)
+            elif self.bounds and self.bounds[0] <= value <= self.bounds[-1]:
+                equal = histogram_fraction / max(1, distinct - len(self.mcv))
+            else:
+                equal = 0.0
+            if self.sampled:
+                equal = max(equal, 1 / max(1, distinct))
+            return equal if operation == '=' else max(0.0, 1.0 - equal)
+
+        if operation in ('<', '<='):
+            below = self._fraction_below(value, inclusive=operation == '<=')
+            return self._clamp(min(1.0, mcv_match + histogram_fraction * below), rows)
+        if operation in ('>', '>='):
+            below = self._fraction_below(value, inclusive=operation == '>')
+            return self._clamp(min(1.0, mcv_match + histogram_fraction * (1.0 - below)), rows)
+        return DEFAULT_RANGE_SELECTIVITY
+
+    def _clamp(self, fraction, rows):
+        # Past the sample's extremes there may still be rows, and before
+        # them there may be none left
+        if not self.sampled:
+            return fraction
+        floor = 1 / max(1, rows if rows is not None else self.distinct)
+        return min(max(fraction, floor), 1.0 - floor)
+
@@ -0,0 +1,83 @@
+import math
+import hashlib
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+def precision_for_error(error_bound):
+    """Smallest precision whose standard error (1.04 / sqrt(2^p)) is within error_bound."""
+    if error_bound <= 0:
+        return MAX_PRECISION
+    precision = math.ceil(math.log2((1.04 / error_bound) ** 2))
+    return max(MIN_PRECISION, min(MAX_PRECISION, precision))
+
+
+def _hash64(value):
+    # Stable across processes (unlike hash()), so sketches built by worker
+    # processes or loaded from disk can be merged
+    if value is None:
+        data = b'n'
+    elif isinstance(value, int):
+        data = b'i' + str(value).encode('utf-8')
+    elif isinstance(value, float):
+        data = b'f' + repr(value).encode('utf-8')
+    else:
+        data = b's' + str(value).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """Distinct-count sketch using 2^precision one-byte registers."""
+
+    def __init__(self, precision=14, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        x = _hash64(value)
+        index = x & (self.m - 1)
+        w = x >> self.precision
+        rank = (64 - self.precision) - w.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        registers = self.registers
+        for i, rank in enumerate(other.registers):
+            if rank > registers[i]:
+                registers[i] = rank
+
+    def count(self):
+        m = self.m
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        estimate = alpha * m * m / sum(2.0 ** -rank for rank in self.registers)
+        if estimate <= 2.5 * m:
+            # Small-range correction: linear counting over empty registers
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return estimate
+
+    def serialize(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def deserialize(cls, data, offset=0):
+        precision = data[offset]
+        m = 1 << precision
+        registers = data[offset + 1:offset + 1 + m]
+        return cls(precision, registers), offset + 1 + m
@@ -1,7 +1,110 @@
 import os
 import struct
+import threading
+from contextlib import closing
 from storagemanager_model.index import HashIndexEntry ,BPlusTreeNode, BPlusTreeIndexEntry
-from storagemanager_helper.slotted_page import PAGE_SIZE, SlottedPage
+from storagemanager_helper.locking import ReadWriteLock
+from storagemanager_helper.metrics import count
+from storagemanager_helper.clustering import sort_key
+
+# Indexes with options (included columns, unique) are saved with this
+# magic in front and the options after the header; plain indexes keep the
+# original layout, which starts directly with the table name length
+INDEX_MAGIC = b'IDX3'
+# Older covering indexes: included column names only, no flags
+INDEX_MAGIC_V2 = b'IDX2'
+UNIQUE_FLAG = 1
+
+# A composite B+ tree index is named by its key columns joined with this
+# ("StudentID+CourseID") and keyed by tuples of their values
+COMPOSITE_SEPARATOR = '+'
+
+
+def key_columns(column_name):
+    return tuple(column_name.split(COMPOSITE_SEPARATOR))
+
+
+def index_key(row, column_name):
+    """Key of row in an index on column_name: the value, or a tuple of
+    values for a composite index."""
+    if COMPOSITE_SEPARATOR not in column_name:
+        return row.get(column_name)
+    return tuple(row.get(c) for c in key_columns(column_name))
+
+
+def _serialize_value(value):
+    if value is None:
+        return struct.pack('<BI', 0, 0)
+    if isinstance(value, int):
+        return struct.pack('<BIi', 1, 4, value)
+    if isinstance(value, float):
+        return struct.pack('<BIf', 2, 4, value)
+    value_bytes = str(value).encode('utf-8')
+    return struct.pack('<BI', 3, len(value_bytes)) + value_bytes
+
+
+def _deserialize_value(data, offset):
+    value_type, value_len = struct.unpack_from('<BI', data, offset)
+    offset += 5
+    if value_type == 0:
+        value = None
+    elif value_type == 1:
+        value = struct.unpack_from('<i', data, offset)[0]
+    elif value_type == 2:
+        value = round(struct.unpack_from('<f', data, offset)[0], 2)
+    else:
+        value = data[offset:offset + value_len].decode('utf-8')
+    return value, offset + value_len
+
+
+def _serialize_names(names):
+    result = struct.pack('I', len(names))
+    for name in names:
+        name_bytes = name.encode('utf-8')
+        result += struct.pack('I', len(name_bytes)) + name_bytes
+    return result
+
+
+def _deserialize_names(data, offset):
+    names = []
+    num_names = struct.unpack('I', data[offset:offset+4])[0]
+    offset += 4
+    for _ in range(num_names):
+        name_len = struct.unpack('I', data[offset:offset+4])[0]
+        offset += 4
+        names.append(data[offset:offset+name_len].decode('utf-8'))
+        offset += name_len
+    return tuple(names), offset
+
+
+def _has_options(metadata):
+    return bool(metadata.get('include')) or metadata.get('unique', False)
+
+
+def _serialize_options(metadata):
+    flags = UNIQUE_FLAG if metadata.get('unique') else 0
+    return _serialize_names(metadata.get('include', ())) + struct.pack('B', flags)
+
+
+def _options_offset(data):
+    """(format version, offset of the table name): 0 for plain indexes."""
+    magic = data[:len(INDEX_MAGIC)]
+    if magic == INDEX_MAGIC:
+        return 3, len(INDEX_MAGIC)
+    if magic == INDEX_MAGIC_V2:
+        return 2, len(INDEX_MAGIC_V2)
+    return 0, 0
+
+
+def _deserialize_options(data, offset, version):
+    include, unique = (), False
+    if version >= 2:
+        include, offset = _deserialize_names(data, offset)
+    if version >= 3:
+        flags = struct.unpack('B', data[offset:offset+1])[0]
+        offset += 1
+        unique = bool(flags & UNIQUE_FLAG)
+    return include, unique, offset
 
 class HashIndexManager:
     def __init__(self, base_path='data'):
@@ -9,9 +112,11 @@ class HashIndexManager:
         self.index_path = os.path.join(base_path, 'indexes')
         
         if not os.path.exists(self.index_path):
-            os.makedirs(self.index_path)
+            os.makedirs(self.index_path, exist_ok=True)
         
         self.loaded_indexes = {}
+        # Guards loaded_indexes; each loaded index carries its own latches
+        self._mutex = threading.Lock()
     
     def _get_index_filename(self, table_name, column_name):
         return os.path.join(self.index_path, f"{table_name}_{column_name}_hash.idx")
@@ -53,10 +158,12 @@ class HashIndexManager:
         result += key_bytes
         result += struct.pack('I', entry.page_id) 
         result += struct.pack('I', entry.slot_id)
+        for value in entry.included:
+            result += _serialize_value(value)
         
         return result
     
-    def _deserialize_entry(self, data, offset=0):
+    def _deserialize_entry(self, data, offset=0, include_count=0):
         key_type = struct.unpack('B', data[offset:offset+1])[0]
         offset += 1
         
@@ -68,7 +175,7 @@ class HashIndexManager:
         elif key_type == 1:  # int
             key_value = struct.unpack('i', data[offset:offset+4])[0]
         elif key_type == 2:  # float
-            key_value = struct.unpack('f', data[offset:offset+4])[0]
+            key_value = round(struct.unpack('f', data[offset:offset+4])[0], 2)
         else:  # string
             key_value = data[offset:offset+key_len].decode('utf-8')
         
@@ -80,23 +187,30 @@ class HashIndexManager:
         slot_id = struct.unpack('I', data[offset:offset+4])[0]
         offset += 4
         
-        entry = HashIndexEntry(key_value, page_id, slot_id)
+        included = []
+        for _ in range(include_count):
+            value, offset = _deserialize_value(data, offset)
+            included.append(value)
+        
+        entry = HashIndexEntry(key_value, page_id, slot_id, tuple(included))
         return entry, offset
     
     def _serialize_index(self, index_data):
         metadata = index_data['metadata']
         buckets = index_data['buckets']
-        
         table_bytes = metadata['table'].encode('utf-8')
         column_bytes = metadata['column'].encode('utf-8')
         
-        result = struct.pack('I', len(table_bytes))
+        result = INDEX_MAGIC if _has_options(metadata) else b''
+        result += struct.pack('I', len(table_bytes))
         result += table_bytes
         result += struct.pack('I', len(column_bytes))
         result += column_bytes
         result += struct.pack('I', metadata['num_buckets'])
         result += struct.pack('I', metadata['num_entries'])
-        
+        if _has_options(metadata):
+            result += _serialize_options(metadata)
+                
         for bucket_id, entries in buckets.items():
             if len(entries) > 0:
                 result += struct.pack('I', bucket_id)
@@ -108,7 +222,7 @@ class HashIndexManager:
         return result
     
     def _deserialize_index(self, data):
-        offset = 0
+        version, offset = _options_offset(data)
         
         table_len = struct.unpack('I', data[offset:offset+4])[0]
         offset += 4
@@ -126,14 +240,18 @@ class HashIndexManager:
         num_entries = struct.unpack('I', data[offset:offset+4])[0]
         offset += 4
         
+        include, unique, offset = _deserialize_options(data, offset, version)
+        
         metadata = {
             'table': table_name,
             'column': column_name,
             'num_buckets': num_buckets,
             'index_type': 'hash',
-            'num_entries': num_entries
+            'num_entries': num_entries,
+            'include': include,
+            'unique': unique
         }
-        
+                
         buckets = {}
         while offset < len(data):
             bucket_id = struct.unpack('I', data[offset:offset+4])[0]
@@ -144,7 +262,7 @@ class HashIndexManager:
             
             buckets[bucket_id] = []
             for _ in range(entry_count):
-                entry, offset = self._deserialize_entry(data, offset)
+                entry, offset = self._deserialize_entry(data, offset, len(include))
                 buckets[bucket_id].append(entry)
         
         return {
@@ -152,46 +270,59 @@ class HashIndexManager:
             'buckets': buckets
         }
     
-    def create_index(self, table_name, column_name, num_buckets=200):
+    def create_index(self, table_name, column_name, num_buckets=200, include=(), unique=False):
         index_metadata = {
             'table': table_name,
             'column': column_name,
             'num_buckets': num_buckets,
             'index_type': 'hash',
-            'num_entries': 0
+            'num_entries': 0,
+            'include': tuple(include),
+            'unique': unique
         }
         
         index_data = {
             'metadata': index_metadata,
-            'buckets': {}
+            'buckets': {},
+            'latch': ReadWriteLock()
         }
         
         index_file = self._get_index_filename(table_name, column_name)
         with open(index_file, 'wb') as f:
             f.write(self._serialize_index(index_data))
         
-        self.loaded_indexes[(table_name, column_name)] = index_data
+        with self._mutex:
+            self.loaded_indexes[(table_name, column_name)] = index_data
         
         return True
     
     def load_index(self, table_name, column_name):
         cache_key = (table_name, column_name)
-        if cache_key in self.loaded_indexes:
-            return self.loaded_indexes[cache_key]
-        
-        index_file = self._get_index_filename(table_name, column_name)
-        if not os.path.exists(index_file):
-            return None
-        
-        with open(index_file, 'rb') as f:
-            data = f.read()
-        
-        index_data = self._deserialize_index(data)
-  
-        self.loaded_indexes[cache_key] = index_data
-        return index_data
+        index_data = self.loaded_indexes.get(cache_key)
+        if index_data is not None:
+            count('buffer_hits')
+            return index_data
+        
+        with self._mutex:
+            if cache_key in self.loaded_indexes:
+                return self.loaded_indexes[cache_key]
+            
+            index_file = self._get_index_filename(table_name, column_name)
+            if not os.path.exists(index_file):
+                return None
+            
+            with open(index_file, 'rb') as f:
+                data = f.read()
+            count('buffer_misses')
+            count('bytes_read', len(data))
+            
+            index_data = self._deserialize_index(data)
+            index_data['latch'] = ReadWriteLock()
+      
+            self.loaded_indexes[cache_key] = index_data
+            return index_data
     
-    def insert_entry(self, table_name, column_name, key_value, page_id, slot_id):
+    def insert_entry(self, table_name, column_name, key_value, page_id, slot_id, included=()):
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
             raise ValueError(f"Index on {table_name}.{column_name} does not exist")
@@ -199,19 +330,20 @@ class HashIndexManager:
         num_buckets = index_data['metadata']['num_buckets']
         bucket_id = self._hash_function(key_value, num_buckets)
         
-        entry = HashIndexEntry(key_value, page_id, slot_id)
-        
-        if bucket_id not in index_data['buckets']:
-            index_data['buckets'][bucket_id] = []
-        
-        index_data['buckets'][bucket_id].append(entry)
-        index_data['metadata']['num_entries'] += 1
+        entry = HashIndexEntry(key_value, page_id, slot_id, tuple(included))
         
-        self.loaded_indexes[(table_name, column_name)] = index_data
+        with index_data['latch'].write():
+            if bucket_id not in index_data['buckets']:
+                index_data['buckets'][bucket_id] = []
+            
+            index_data['buckets'][bucket_id].append(entry)
+            index_data['metadata']['num_entries'] += 1
         
         return True
     
-    def search(self, table_name, column_name, key_value):
+    def search(self, table_name, column_name, key_value, with_included=False):
+        """RIDs of the entries equal to key_value, or (key, included values)
+        pairs with with_included."""
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
             return []
@@ -219,12 +351,18 @@ class HashIndexManager:
         num_buckets = index_data['metadata']['num_buckets']
         bucket_id = self._hash_function(key_value, num_buckets)
         
+        count('index_probes')
         results = []
-        bucket = index_data['buckets'].get(bucket_id, [])
-        
-        for entry in bucket:
-            if entry.key_value == key_value:
-                results.append((entry.page_id, entry.slot_id))
+        with index_data['latch'].read():
+            bucket = index_data['buckets'].get(bucket_id, [])
+            count('index_entries_scanned', len(bucket))
+            
+            for entry in bucket:
+                if entry.key_value == key_value:
+                    if with_included:
+                        results.append((entry.key_value, entry.included))
+                    else:
+                        results.append((entry.page_id, entry.slot_id))
         
         return results
     
@@ -237,23 +375,24 @@ class HashIndexManager:
         num_buckets = index_data['metadata']['num_buckets']
         bucket_id = self._hash_function(key_value, num_buckets)
         
-        bucket = index_data['buckets'].get(bucket_id, [])
-        
-        for i in range(len(bucket)):
-            entry = bucket[i]
-            if (entry.key_value == key_value and 
-                entry.page_id == page_id and 
-                entry.slot_id == slot_id):
-                bucket.pop(i)
-                index_data['metadata']['num_entries'] -= 1
-                return True
+        with index_data['latch'].write():
+            bucket = index_data['buckets'].get(bucket_id, [])
+            
+            for i in range(len(bucket)):
+                entry = bucket[i]
+                if (entry.key_value == key_value and 
+                    entry.page_id == page_id and 
+                    entry.slot_id == slot_id):
+                    bucket.pop(i)
+                    index_data['metadata']['num_entries'] -= 1
+                    return True
         
         return False
     
-    def update_entry(self, table_name, column_name, old_key, new_key, page_id, slot_id):
+    def update_entry(self, table_name, column_name, old_key, new_key, page_id, slot_id, included=()):
  
         self.delete_entry(table_name, column_name, old_key, page_id, slot_id)
-        self.insert_entry(table_name, column_name, new_key, page_id, slot_id)
+        self.insert_entry(table_name, column_name, new_key, page_id, slot_id, included)
         return True
     
     def save_index(self, table_name, column_name):
@@ -262,9 +401,14 @@ class HashIndexManager:
         if index_data is None:
             return False
         
+        with index_data['latch'].read():
+            data = self._serialize_index(index_data)
+        
         index_file = self._get_index_filename(table_name, column_name)
         with open(index_file, 'wb') as f:
-            f.write(self._serialize_index(index_data))
+            f.write(data)
+        count('index_saves')
+        count('bytes_written', len(data))
         
         return True
     
@@ -275,17 +419,32 @@ class HashIndexManager:
         if os.path.exists(index_file):
             os.remove(index_file)
         
-        cache_key = (table_name, column_name)
-        if cache_key in self.loaded_indexes:
-            del self.loaded_indexes[cache_key]
+        with self._mutex:
+            self.loaded_indexes.pop((table_name, column_name), None)
         
         return True
     
-    def rebuild_index(self, table_name, column_name, storage_manager):
+    def index_include(self, table_name, column_name):
+        """Columns carried in the index entries besides the key."""
+        index_data = self.load_index(table_name, column_name)
+        if index_data is None:
+            return ()
+        return index_data['metadata'].get('include', ())
+    
+    def is_unique(self, table_name, column_name):
+        index_data = self.load_index(table_name, column_name)
+        return index_data is not None and index_data['metadata'].get('unique', False)
+    
+    def rebuild_index(self, table_name, column_name, storage_manager, include=None, unique=None):
+        # None keeps what the index already has
+        if include is None:
+            include = self.index_include(table_name, column_name)
+        if unique is None:
+            unique = self.is_unique(table_name, column_name)
         
         self.drop_index(table_name, column_name)
         
-        self.create_index(table_name, column_name)
+        self.create_index(table_name, column_name, include=include, unique=unique)
         
         schema = storage_manager.schema_manager.get_table_schema(table_name)
         if schema is None:
@@ -295,34 +454,8 @@ class HashIndexManager:
         if column_name not in schema_attrs:
             raise ValueError(f"Column {column_name} not found in {table_name}")
         
-        table_path = os.path.join(storage_manager.base_path, f"{table_name}.dat")
-        if not os.path.exists(table_path):
-            return True  
-        
-        page_id = 0
-        with open(table_path, "rb") as f:
-            while True:
-                page_bytes = f.read(PAGE_SIZE)
-                if not page_bytes:
-                    break
-                
-                if len(page_bytes) < PAGE_SIZE:
-                    page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
-                
-                page = SlottedPage()
-                page.load(page_bytes)
-                
-                for slot_id in range(page.record_count):
-                    try:
-                        record_bytes = page.get_record(slot_id)
-                        row = storage_manager.row_serializer.deserialize(schema, record_bytes)
-                        
-                        key_value = row.get(column_name)
-                        self.insert_entry(table_name, column_name, key_value, page_id, slot_id)
-                    except Exception as e:
-                        print(f"Warning: Failed to index record at page {page_id}, slot {slot_id}: {e}")
-                
-                page_id += 1
+        for key_value, page_id, slot_id, included in storage_manager._scan_column(table_name, column_name, include):
+            self.insert_entry(table_name, column_name, key_value, page_id, slot_id, included)
         
         self.save_index(table_name, column_name)
         
@@ -387,14 +520,25 @@ class BPlusTreeIndexManager:
         self.index_path = os.path.join(base_path, 'indexes')
         
         if not os.path.exists(self.index_path):
-            os.makedirs(self.index_path)
+            os.makedirs(self.index_path, exist_ok=True)
         
         self.loaded_indexes = {}
+        # Guards loaded_indexes; each loaded index carries its own latches
+        self._mutex = threading.Lock()
     
     def _get_index_filename(self, table_name, column_name):
         return os.path.join(self.index_path, f"{table_name}_{column_name}_btree.idx")
 
     def _compare_keys(self, key1, key2):
+        if isinstance(key1, tuple) and isinstance(key2, tuple):
+            # Composite keys compare column by column; when one runs out
+            # first it is a prefix bound and matches every key it starts
+            for part1, part2 in zip(key1, key2):
+                cmp = self._compare_keys(part1, part2)
+                if cmp:
+                    return cmp
+            return 0
+        
         if key1 is None and key2 is None:
             return 0
         if key1 is None:
@@ -419,6 +563,9 @@ class BPlusTreeIndexManager:
         elif isinstance(key, float):
             key_type = 2
             key_bytes = struct.pack('f', key)
+        elif isinstance(key, tuple):
+            # Length field holds the number of parts, each a nested key
+            return struct.pack('B', 4) + struct.pack('I', len(key)) + b''.join(self._serialize_key(part) for part in key)
         else:
             key_type = 3
             key_bytes = str(key).encode('utf-8')
@@ -442,8 +589,14 @@ class BPlusTreeIndexManager:
             key_value = struct.unpack('i', data[offset:offset+4])[0]
             offset += 4
         elif key_type == 2:
-            key_value = struct.unpack('f', data[offset:offset+4])[0]
+            key_value = round(struct.unpack('f', data[offset:offset+4])[0], 2)
             offset += 4
+        elif key_type == 4:
+            parts = []
+            for _ in range(key_len):
+                part, offset = self._deserialize_key(data, offset)
+                parts.append(part)
+            key_value = tuple(parts)
         else:
             key_value = data[offset:offset+key_len].decode('utf-8')
             offset += key_len
@@ -460,15 +613,19 @@ class BPlusTreeIndexManager:
         
         if node.is_leaf:
             result += struct.pack('I', len(node.values))
-            for page_id, slot_id in node.values:
-                result += struct.pack('I', page_id)
-                result += struct.pack('I', slot_id)
+            for value in node.values:
+                result += struct.pack('I', value[0])
+                result += struct.pack('I', value[1])
+                # Covering indexes keep (page_id, slot_id, included values)
+                for included in value[2:3]:
+                    for included_value in included:
+                        result += _serialize_value(included_value)
         else:
             result += struct.pack('I', len(node.children))
         
         return result
     
-    def _deserialize_node(self, data, offset=0):
+    def _deserialize_node(self, data, offset=0, include_count=0):
         is_leaf = struct.unpack('B', data[offset:offset+1])[0] == 1
         offset += 1
         
@@ -493,7 +650,14 @@ class BPlusTreeIndexManager:
                 offset += 4
                 slot_id = struct.unpack('I', data[offset:offset+4])[0]
                 offset += 4
-                node.values.append((page_id, slot_id))
+                if include_count:
+                    included = []
+                    for _ in range(include_count):
+                        included_value, offset = _deserialize_value(data, offset)
+                        included.append(included_value)
+                    node.values.append((page_id, slot_id, tuple(included)))
+                else:
+                    node.values.append((page_id, slot_id))
             
             num_children = 0
         else:
@@ -515,41 +679,56 @@ class BPlusTreeIndexManager:
         
         return result
     
-    def _deserialize_tree(self, data, offset, parent=None):
+    def _deserialize_tree(self, data, offset, parent=None, include_count=0):
         null_marker = struct.unpack('B', data[offset:offset+1])[0]
         offset += 1
         
         if null_marker == 0:
             return None, offset
         
-        node, num_children, offset = self._deserialize_node(data, offset)
+        node, num_children, offset = self._deserialize_node(data, offset, include_count)
         node.parent = parent
         
         if not node.is_leaf:
             for i in range(num_children):
-                child, offset = self._deserialize_tree(data, offset, parent=node)
+                child, offset = self._deserialize_tree(data, offset, parent=node, include_count=include_count)
                 node.children.append(child)
-            
-            if node.children and node.children[0].is_leaf:
-                for i in range(len(node.children) - 1):
-                    node.children[i].next_leaf = node.children[i + 1]
         
         return node, offset
     
+    def _link_leaves(self, root):
+        # Leaf links are not serialized; rebuild the chain across the whole
+        # tree, not just between siblings of the same parent
+        previous = None
+        stack = [root] if root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                if previous is not None:
+                    previous.next_leaf = node
+                node.prev_leaf = previous
+                previous = node
+            else:
+                stack.extend(reversed(node.children))
+        if previous is not None:
+            previous.next_leaf = None
+    
     def _serialize_index(self, index_data):
         metadata = index_data['metadata']
         root = index_data['root']
-        
         table_bytes = metadata['table'].encode('utf-8')
         column_bytes = metadata['column'].encode('utf-8')
         
-        result = struct.pack('I', len(table_bytes))
+        result = INDEX_MAGIC if _has_options(metadata) else b''
+        result += struct.pack('I', len(table_bytes))
         result += table_bytes
         result += struct.pack('I', len(column_bytes))
         result += column_bytes
         result += struct.pack('I', metadata['order'])
         result += struct.pack('I', metadata['num_entries'])
-        
+        if _has_options(metadata):
+            result += _serialize_options(metadata)
+                
         tree_bytes = self._serialize_tree(root)
         result += struct.pack('I', len(tree_bytes))
         result += tree_bytes
@@ -557,7 +736,7 @@ class BPlusTreeIndexManager:
         return result
     
     def _deserialize_index(self, data):
-        offset = 0
+        version, offset = _options_offset(data)
         
         table_len = struct.unpack('I', data[offset:offset+4])[0]
         offset += 4
@@ -575,82 +754,97 @@ class BPlusTreeIndexManager:
         num_entries = struct.unpack('I', data[offset:offset+4])[0]
         offset += 4
         
+        include, unique, offset = _deserialize_options(data, offset, version)
+        
         metadata = {
             'table': table_name,
             'column': column_name,
             'index_type': 'btree',
             'order': order,
-            'num_entries': num_entries
+            'num_entries': num_entries,
+            'include': include,
+            'unique': unique
         }
         
         tree_len = struct.unpack('I', data[offset:offset+4])[0]
         offset += 4
         
-        root, _ = self._deserialize_tree(data, offset,parent=None)
+        root, _ = self._deserialize_tree(data, offset, parent=None, include_count=len(include))
+        self._link_leaves(root)
         
         return {
             'metadata': metadata,
             'root': root
         }
     
-    def create_index(self, table_name, column_name, order=4):
+    def create_index(self, table_name, column_name, order=4, include=(), unique=False):
         metadata = {
             'table': table_name,
             'column': column_name,
             'index_type': 'btree',
             'order': order,
-            'num_entries': 0
+            'num_entries': 0,
+            'include': tuple(include),
+            'unique': unique
         }
         
         root = BPlusTreeNode(is_leaf=True, order=order)
         
-        index_data = {
+        index_data = self._attach_latches({
             'metadata': metadata,
             'root': root
-        }
+        })
         
         index_file = self._get_index_filename(table_name, column_name)
         with open(index_file, 'wb') as f:
             f.write(self._serialize_index(index_data))
         
-        self.loaded_indexes[(table_name, column_name)] = index_data
+        with self._mutex:
+            self.loaded_indexes[(table_name, column_name)] = index_data
         
         return True
     
-    def load_index(self, table_name, column_name):
-        cache_key = (table_name, column_name)
-        if cache_key in self.loaded_indexes:
-            return self.loaded_indexes[cache_key]
-        
-        index_file = self._get_index_filename(table_name, column_name)
-        if not os.path.exists(index_file):
-            return None
-        
-        with open(index_file, 'rb') as f:
-            data = f.read()
-        
-        index_data = self._deserialize_index(data)
-        self.loaded_indexes[cache_key] = index_data
-        
+    def _attach_latches(self, index_data):
+        # tree_latch: shared by every entry operation, exclusive for whole-tree
+        # work (save, stats). root_latch: protects the root pointer during
+        # descents. counter_lock: num_entries updates from concurrent writers.
+        index_data['tree_latch'] = ReadWriteLock()
+        index_data['root_latch'] = ReadWriteLock()
+        index_data['counter_lock'] = threading.Lock()
         return index_data
     
-    def _find_leaf(self, node, key):
-        if node.is_leaf:
-            return node
-        
-        i = 0
-        while i < len(node.keys) and self._compare_keys(key, node.keys[i]) >= 0:
-            i += 1
-        
-        return self._find_leaf(node.children[i], key)
+    def load_index(self, table_name, column_name):
+        cache_key = (table_name, column_name)
+        index_data = self.loaded_indexes.get(cache_key)
+        if index_data is not None:
+            count('buffer_hits')
+            return index_data
+        
+        with self._mutex:
+            if cache_key in self.loaded_indexes:
+                return self.loaded_indexes[cache_key]
+            
+            index_file = self._get_index_filename(table_name, column_name)
+            if not os.path.exists(index_file):
+                return None
+            
+            with open(index_file, 'rb') as f:
+                data = f.read()
+            count('buffer_misses')
+            count('bytes_read', len(data))
+            
+            index_data = self._attach_latches(self._deserialize_index(data))
+            self.loaded_indexes[cache_key] = index_data
+            
+            return index_data
     
-    def _insert_in_leaf(self, leaf, key, page_id, slot_id):
+    def _insert_in_leaf(self, leaf, key, page_id, slot_id, included=()):
         i = 0
         while i < len(leaf.keys) and self._compare_keys(key, leaf.keys[i]) > 0:
             i += 1
         
         leaf.keys.insert(i, key)
-        leaf.values.insert(i, (page_id, slot_id))
+        leaf.values.insert(i, (page_id, slot_id, tuple(included)) if included else (page_id, slot_id))
     
     def _split_leaf(self, leaf):
         mid = len(leaf.keys) // 2
@@ -659,6 +853,11 @@ class BPlusTreeIndexManager:
         new_leaf.keys = leaf.keys[mid:]
         new_leaf.values = leaf.values[mid:]
         new_leaf.next_leaf = leaf.next_leaf
+        new_leaf.prev_leaf = leaf
+        # Link back only once new_leaf is complete: reverse scans follow
+        # prev_leaf without latching the leaf it comes from
+        if leaf.next_leaf is not None:
+            leaf.next_leaf.prev_leaf = new_leaf
         
         leaf.keys = leaf.keys[:mid]
         leaf.values = leaf.values[:mid]
@@ -694,9 +893,9 @@ class BPlusTreeIndexManager:
         
         parent = left.parent
         
-        i = 0
-        while i < len(parent.keys) and self._compare_keys(key, parent.keys[i]) > 0:
-            i += 1
+        # Position by the split child rather than by key: with duplicate keys
+        # a key search can land left of the child that actually split
+        i = next(i for i, child in enumerate(parent.children) if child is left)
         
         parent.keys.insert(i, key)
         parent.children.insert(i + 1, right)
@@ -713,81 +912,284 @@ class BPlusTreeIndexManager:
             node = node.parent
         return node
     
-    def insert_entry(self, table_name, column_name, key_value, page_id, slot_id):
+    def _is_insert_safe(self, node):
+        # A node is safe when one more key (leaf) or child (internal) cannot
+        # split it, so nothing above it can change
+        if node.is_leaf:
+            return len(node.keys) + 1 < node.order
+        return len(node.children) + 1 <= node.order
+    
+    def _descend_shared(self, index_data, key, exclusive_leaf=False, rightmost=False):
+        # Latch crabbing: hold a node's latch only until its child is latched.
+        # Returns the leftmost leaf that may hold key (None: first leaf), or
+        # the rightmost one (None: last leaf) with rightmost, latched shared,
+        # or exclusive when exclusive_leaf is set.
+        root_latch = index_data['root_latch']
+        root_latch.acquire_read()
+        node = index_data['root']
+        if node.is_leaf and exclusive_leaf:
+            node.latch.acquire_write()
+        else:
+            node.latch.acquire_read()
+        root_latch.release_read()
+        
+        while not node.is_leaf:
+            i = 0
+            if rightmost:
+                while i < len(node.keys) and (key is None or self._compare_keys(key, node.keys[i]) >= 0):
+                    i += 1
+            else:
+                while i < len(node.keys) and self._compare_keys(key, node.keys[i]) > 0:
+                    i += 1
+            child = node.children[i]
+            if child.is_leaf and exclusive_leaf:
+                child.latch.acquire_write()
+            else:
+                child.latch.acquire_read()
+            node.latch.release_read()
+            node = child
+        
+        return node
+    
+    def _iter_entries(self, index_data, start_key=None):
+        """Yield (key, (page_id, slot_id)) in key order from the leftmost leaf
+        that may hold start_key, latching leaves hand over hand. Always
+        consume it with contextlib.closing so the last latch is released."""
+        leaf = self._descend_shared(index_data, start_key)
+        try:
+            while leaf is not None:
+                for key, value in zip(leaf.keys, leaf.values):
+                    yield key, value
+                next_leaf = leaf.next_leaf
+                if next_leaf is not None:
+                    next_leaf.latch.acquire_read()
+                leaf.latch.release_read()
+                leaf = next_leaf
+        finally:
+            if leaf is not None:
+                leaf.latch.release_read()
+    
+    def _iter_entries_reverse(self, index_data, start_key=None):
+        """Yield (key, (page_id, slot_id)) in descending key order from the
+        rightmost leaf that may hold start_key. Latching leftwards while
+        holding a leaf could deadlock against forward scans, so each leaf is
+        copied under its own latch and released before moving on."""
+        leaf = self._descend_shared(index_data, start_key, rightmost=True)
+        while leaf is not None:
+            entries = list(zip(leaf.keys, leaf.values))
+            previous = leaf.prev_leaf
+            leaf.latch.release_read()
+            yield from reversed(entries)
+            
+            if previous is not None:
+                previous.latch.acquire_read()
+                # A split since prev_leaf was read put new leaves in between
+                while previous.next_leaf is not leaf and previous.next_leaf is not None:
+                    next_leaf = previous.next_leaf
+                    next_leaf.latch.acquire_read()
+                    previous.latch.release_read()
+                    previous = next_leaf
+            leaf = previous
+    
+    def insert_entry(self, table_name, column_name, key_value, page_id, slot_id, included=()):
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
             raise ValueError(f"Index on {table_name}.{column_name} does not exist")
         
-        root = index_data['root']
-        
-        leaf = self._find_leaf(root, key_value)
-        self._insert_in_leaf(leaf, key_value, page_id, slot_id)
-        
-        if leaf.is_full():
-            promote_key, new_leaf = self._split_leaf(leaf)
-            new_root = self._insert_in_parent(leaf, promote_key, new_leaf)
-            index_data['root'] = new_root
-        
-        index_data['metadata']['num_entries'] += 1
+        with index_data['tree_latch'].read():
+            root_latch = index_data['root_latch']
+            root_latch.acquire_write()
+            held = [root_latch]
+            try:
+                node = index_data['root']
+                node.latch.acquire_write()
+                held.append(node.latch)
+                
+                while True:
+                    if self._is_insert_safe(node):
+                        for latch in held[:-1]:
+                            latch.release_write()
+                        held = held[-1:]
+                    if node.is_leaf:
+                        break
+                    
+                    i = 0
+                    while i < len(node.keys) and self._compare_keys(key_value, node.keys[i]) >= 0:
+                        i += 1
+                    node = node.children[i]
+                    node.latch.acquire_write()
+                    held.append(node.latch)
+                
+                self._insert_in_leaf(node, key_value, page_id, slot_id, included)
+                
+                if node.is_full():
+                    promote_key, new_leaf = self._split_leaf(node)
+                    new_root = self._insert_in_parent(node, promote_key, new_leaf)
+                    # Only a split that reached the root can replace it, and
+                    # then root_latch is still held
+                    if held[0] is root_latch:
+                        index_data['root'] = new_root
+            finally:
+                for latch in held:
+                    latch.release_write()
+        
+        with index_data['counter_lock']:
+            index_data['metadata']['num_entries'] += 1
         
         return True
     
-    def search(self, table_name, column_name, key_value):
+    def search(self, table_name, column_name, key_value, with_included=False):
+        """RIDs of the entries equal to key_value, or (key, included values)
+        pairs with with_included."""
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
             return []
         
-        root = index_data['root']
-        leaf = self._find_leaf(root, key_value)
-        
+        count('index_probes')
         results = []
-        for i, key in enumerate(leaf.keys):
-            if key == key_value:
-                results.append(leaf.values[i])
+        scanned = 0
+        with index_data['tree_latch'].read():
+            with closing(self._iter_entries(index_data, key_value)) as entries:
+                for key, value in entries:
+                    scanned += 1
+                    if key == key_value:
+                        if with_included:
+                            results.append((key, value[2] if len(value) > 2 else ()))
+                        else:
+                            results.append(value[:2])
+                    elif self._compare_keys(key, key_value) > 0:
+                        break
+        count('index_entries_scanned', scanned)
         
         return results
     
     def range_search(self, table_name, column_name, start_key, end_key):
+        return self.scan_range(table_name, column_name, start_key, end_key, with_keys=True)
+    
+    def scan_range(self, table_name, column_name, lower=None, upper=None,
+                   lower_inclusive=True, upper_inclusive=True, with_keys=False, with_included=False):
+        """Entries with lower <(=) key <(=) upper in key order; None leaves
+        that side unbounded. Returns RIDs, (key, rid) pairs with with_keys,
+        or (key, included values) pairs with with_included."""
+        entries = self.iter_range(table_name, column_name, lower, upper, lower_inclusive, upper_inclusive,
+                                  with_included=with_included)
+        with closing(entries):
+            if with_included or with_keys:
+                return list(entries)
+            return [rid for _, rid in entries]
+    
+    def iter_range(self, table_name, column_name, lower=None, upper=None,
+                   lower_inclusive=True, upper_inclusive=True, descending=False, with_included=False):
+        """Generator form of scan_range yielding (key, rid) pairs, or (key,
+        included values) with with_included, so callers can stop early;
+        descending walks the leaves backwards from upper. The tree stays
+        latched until it is exhausted, so consume it with closing()."""
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
-            return []
-        
-        root = index_data['root']
-        leaf = self._find_leaf(root, start_key)
-        
-        results = []
-        
-        while leaf is not None:
-            for i, key in enumerate(leaf.keys):
-                if self._compare_keys(key, start_key) >= 0 and self._compare_keys(key, end_key) <= 0:
-                    results.append((key, leaf.values[i]))
-                elif self._compare_keys(key, end_key) > 0:
-                    return results
-            
-            leaf = leaf.next_leaf
+            return
+        
+        count('index_probes')
+        scanned = 0
+        try:
+            with index_data['tree_latch'].read():
+                if descending:
+                    entries = self._iter_entries_reverse(index_data, upper)
+                else:
+                    entries = self._iter_entries(index_data, lower)
+                with closing(entries):
+                    for key, value in entries:
+                        scanned += 1
+                        # Entries before the start side are skipped; past the
+                        # far side the scan is over
+                        if lower is not None:
+                            cmp = self._compare_keys(key, lower)
+                            if cmp < 0 or (cmp == 0 and not lower_inclusive):
+                                if descending:
+                                    break
+                                continue
+                        if upper is not None:
+                            cmp = self._compare_keys(key, upper)
+                            if cmp > 0 or (cmp == 0 and not upper_inclusive):
+                                if descending:
+                                    continue
+                                break
+                        if with_included:
+                            yield key, value[2] if len(value) > 2 else ()
+                        else:
+                            yield key, value[:2]
+        finally:
+            count('index_entries_scanned', scanned)
+    
+    def endpoint_key(self, table_name, column_name, last=False):
+        """Smallest key (largest with last) whose leading value is not NULL,
+        or None if there is none. Usually touches a single root-to-leaf
+        path; only leaves emptied by deletes make it look further."""
+        index_data = self.load_index(table_name, column_name)
+        if index_data is None:
+            return None
         
-        return results
+        count('index_probes')
+        key = None
+        scanned = 0
+        with index_data['tree_latch'].read():
+            if last:
+                entries = self._iter_entries_reverse(index_data)
+            else:
+                entries = self._iter_entries(index_data)
+            with closing(entries):
+                for entry_key, _ in entries:
+                    scanned += 1
+                    if (entry_key[0] if isinstance(entry_key, tuple) else entry_key) is not None:
+                        key = entry_key
+                        break
+        count('index_entries_scanned', scanned)
+        
+        if isinstance(key, tuple) and key[0] is None:
+            return None
+        return key
     
     def delete_entry(self, table_name, column_name, key_value, page_id, slot_id):
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
             return False
         
-        root = index_data['root']
-        leaf = self._find_leaf(root, key_value)
-        
-        for i, (key, (p_id, s_id)) in enumerate(zip(leaf.keys, leaf.values)):
-            if key == key_value and p_id == page_id and s_id == slot_id:
-                leaf.keys.pop(i)
-                leaf.values.pop(i)
+        deleted = False
+        with index_data['tree_latch'].read():
+            # Deletes never merge nodes, so only leaves need exclusive latches
+            leaf = self._descend_shared(index_data, key_value, exclusive_leaf=True)
+            try:
+                while leaf is not None and not deleted:
+                    past_key = False
+                    for i, (key, value) in enumerate(zip(leaf.keys, leaf.values)):
+                        if key == key_value and value[0] == page_id and value[1] == slot_id:
+                            leaf.keys.pop(i)
+                            leaf.values.pop(i)
+                            deleted = True
+                            break
+                        if self._compare_keys(key, key_value) > 0:
+                            past_key = True
+                            break
+                    if deleted or past_key:
+                        break
+                    
+                    next_leaf = leaf.next_leaf
+                    if next_leaf is not None:
+                        next_leaf.latch.acquire_write()
+                    leaf.latch.release_write()
+                    leaf = next_leaf
+            finally:
+                if leaf is not None:
+                    leaf.latch.release_write()
+        
+        if deleted:
+            with index_data['counter_lock']:
                 index_data['metadata']['num_entries'] -= 1
-                return True
         
-        return False
+        return deleted
     
-    def update_entry(self, table_name, column_name, old_key, new_key, page_id, slot_id):
+    def update_entry(self, table_name, column_name, old_key, new_key, page_id, slot_id, included=()):
         self.delete_entry(table_name, column_name, old_key, page_id, slot_id)
-        self.insert_entry(table_name, column_name, new_key, page_id, slot_id)
+        self.insert_entry(table_name, column_name, new_key, page_id, slot_id, included)
         return True
     
     def save_index(self, table_name, column_name):
@@ -795,9 +1197,14 @@ class BPlusTreeIndexManager:
         if index_data is None:
             return False
         
+        with index_data['tree_latch'].write():
+            data = self._serialize_index(index_data)
+        
         index_file = self._get_index_filename(table_name, column_name)
         with open(index_file, 'wb') as f:
-            f.write(self._serialize_index(index_data))
+            f.write(data)
+        count('index_saves')
+        count('bytes_written', len(data))
         
         return True
     
@@ -807,68 +1214,114 @@ class BPlusTreeIndexManager:
         if os.path.exists(index_file):
             os.remove(index_file)
         
-        cache_key = (table_name, column_name)
-        if cache_key in self.loaded_indexes:
-            del self.loaded_indexes[cache_key]
+        with self._mutex:
+            self.loaded_indexes.pop((table_name, column_name), None)
         
         return True
     
-    def rebuild_index(self, table_name, column_name, storage_manager, order=4):
+    def index_include(self, table_name, column_name):
+        """Columns carried in the leaf entries besides the key."""
+        index_data = self.load_index(table_name, column_name)
+        if index_data is None:
+            return ()
+        return index_data['metadata'].get('include', ())
+    
+    def is_unique(self, table_name, column_name):
+        index_data = self.load_index(table_name, column_name)
+        return index_data is not None and index_data['metadata'].get('unique', False)
+    
+    def rebuild_index(self, table_name, column_name, storage_manager, order=4, include=None, unique=None):
+        # None keeps what the index already has
+        if include is None:
+            include = self.index_include(table_name, column_name)
+        if unique is None:
+            unique = self.is_unique(table_name, column_name)
+        
         self.drop_index(table_name, column_name)
-        self.create_index(table_name, column_name, order)
+        self.create_index(table_name, column_name, order, include, unique)
         
         schema = storage_manager.schema_manager.get_table_schema(table_name)
         if schema is None:
             raise ValueError(f"Table {table_name} not found")
         
         schema_attrs = [attr["name"] for attr in schema.get_attributes()]
-        if column_name not in schema_attrs:
-            raise ValueError(f"Column {column_name} not found in {table_name}")
+        for key_column in key_columns(column_name):
+            if key_column not in schema_attrs:
+                raise ValueError(f"Column {key_column} not found in {table_name}")
         
-        table_path = os.path.join(storage_manager.base_path, f"{table_name}.dat")
-        if not os.path.exists(table_path):
-            return True
-        
-        page_id = 0
-        with open(table_path, "rb") as f:
-            while True:
-                page_bytes = f.read(PAGE_SIZE)
-                if not page_bytes:
-                    break
-                
-                if len(page_bytes) < PAGE_SIZE:
-                    page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
-                
-                page = SlottedPage()
-                page.load(page_bytes)
-                
-                for slot_id in range(page.record_count):
-                    try:
-                        record_bytes = page.get_record(slot_id)
-                        record = storage_manager.row_serializer.deserialize(schema, record_bytes)
-                        key_value = record.get(column_name)
-                        
-                        self.insert_entry(table_name, column_name, key_value, page_id, slot_id)
-                    except Exception as e:
-                        continue
-                
-                page_id += 1
+        # Sorted (spilling to disk past the sort memory budget) and packed
+        # bottom-up rather than inserted one entry at a time
+        with storage_manager._sorter(key=lambda entry: sort_key(entry[0])) as entries:
+            entries.extend(storage_manager._scan_column(table_name, column_name, include))
+            self.bulk_load(table_name, column_name, entries)
         
         self.save_index(table_name, column_name)
         
         return True
     
+    def bulk_load(self, table_name, column_name, entries):
+        """Replace the contents of an index with entries, (key, page_id,
+        slot_id, included values) tuples already in key order. Leaves are
+        packed left to right and each level above is built over the one
+        below, so loading n entries costs O(n) instead of n descents."""
+        index_data = self.load_index(table_name, column_name)
+        if index_data is None:
+            raise ValueError(f"Index on {table_name}.{column_name} does not exist")
+        order = index_data['metadata']['order']
+        
+        # A leaf splits at order keys and an internal node at order + 1
+        # children, so pack each one just below that
+        leaves = [BPlusTreeNode(is_leaf=True, order=order)]
+        num_entries = 0
+        previous_key = None
+        for key, page_id, slot_id, included in entries:
+            if num_entries and self._compare_keys(key, previous_key) < 0:
+                raise ValueError("bulk_load entries must be sorted by key")
+            leaf = leaves[-1]
+            if len(leaf.keys) == order - 1:
+                leaf = BPlusTreeNode(is_leaf=True, order=order)
+                leaf.prev_leaf = leaves[-1]
+                leaves[-1].next_leaf = leaf
+                leaves.append(leaf)
+            leaf.keys.append(key)
+            leaf.values.append((page_id, slot_id, tuple(included)) if included else (page_id, slot_id))
+            previous_key = key
+            num_entries += 1
+        
+        # Each level as (node, smallest key under it) pairs
+        level = [(leaf, leaf.keys[0] if leaf.keys else None) for leaf in leaves]
+        while len(level) > 1:
+            groups = [level[i:i + order] for i in range(0, len(level), order)]
+            if len(groups[-1]) == 1:
+                # An internal node needs two children; borrow one
+                groups[-1].insert(0, groups[-2].pop())
+            level = []
+            for group in groups:
+                node = BPlusTreeNode(is_leaf=False, order=order)
+                node.children = [child for child, _ in group]
+                node.keys = [first_key for _, first_key in group[1:]]
+                for child in node.children:
+                    child.parent = node
+                level.append((node, group[0][1]))
+        
+        with index_data['tree_latch'].write():
+            index_data['root'] = level[0][0]
+            index_data['metadata']['num_entries'] = num_entries
+        
+        return num_entries
+    
     def get_index_stats(self, table_name, column_name):
         index_data = self.load_index(table_name, column_name)
         if index_data is None:
             return None
         
         metadata = index_data['metadata']
-        root = index_data['root']
         
-        height = self._calculate_height(root)
-        node_count = self._count_nodes(root)
-        leaf_count = self._count_leaves(root)
+        with index_data['tree_latch'].write():
+            root = index_data['root']
+            height = self._calculate_height(root)
+            node_count = self._count_nodes(root)
+            leaf_count = self._count_leaves(root)
         
         stats = {
             'table': metadata['table'],
@@ -9,36 +9,26 @@ from storagemanager_helper.schema_manager import SchemaManager
 from storagemanager_helper.row_serializer import RowSerializer
 from storagemanager_helper.slotted_page import SlottedPage  
 
-os.makedirs("data", exist_ok=True)
 
-schema_path = os.path.join("data", "schema.dat")
-if not os.path.exists(schema_path):
-    with open(schema_path, "wb") as f:
-        pass  # just create an empty file
 
+def default_schemas():
+    """The Student / Attends / Course schemas of the database."""
+    student = Schema()
+    student.add_attribute("StudentID", "int", 4)
+    student.add_attribute("FullName", "varchar", 50)
+    student.add_attribute("GPA", "float", 4)
 
+    attends = Schema()
+    attends.add_attribute("StudentID", "int", 4)
+    attends.add_attribute("CourseID", "int", 4)
 
+    course = Schema()
+    course.add_attribute("CourseID", "int", 4)
+    course.add_attribute("Year", "int", 4)
+    course.add_attribute("CourseName", "varchar", 50)
+    course.add_attribute("CourseDescription", "varchar", 255)
 
-student = Schema()
-student.add_attribute("StudentID", "int", 4)
-student.add_attribute("FullName", "varchar", 50)
-student.add_attribute("GPA", "float", 4)
-
-attends = Schema()
-attends.add_attribute("StudentID", "int", 4)
-attends.add_attribute("CourseID", "int", 4)
-
-course = Schema()
-course.add_attribute("CourseID", "int", 4)
-course.add_attribute("Year", "int", 4)
-course.add_attribute("CourseName", "varchar", 50)
-course.add_attribute("CourseDescription", "varchar", 255)
-
-manager = SchemaManager()
-manager.add_table_schema("Student", student)
-manager.add_table_schema("Attends", attends)
-manager.add_table_schema("Course", course)
-manager.save_schemas()
+    return {"Student": student, "Attends": attends, "Course": course}
 
 
 first_names = ["Alice", "Bob", "Charlie", "David", "Eva", "Frank", "Grace", "Hannah", "Ivan", "Jill"]
@@ -50,29 +40,30 @@ course_names = [
 ]
 
 serializer = RowSerializer()
-os.makedirs("data", exist_ok=True)
 
 
-students = [
-    {"StudentID": i, "FullName": f"{random.choice(first_names)} {random.choice(last_names)}", "GPA": round(random.uniform(2.0, 4.0), 2)}
-    for i in range(1, 51)
-]
+# Row generators take the random source to draw from (the random module
+# itself by default), so a seeded random.Random reproduces a database
+def student_rows(count, rng=random):
+    for i in range(1, count + 1):
+        yield {"StudentID": i, "FullName": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+               "GPA": round(rng.uniform(2.0, 4.0), 2)}
 
-courses = [
-    {"CourseID": i, "Year": random.choice([2023, 2024, 2025]),
-     "CourseName": random.choice(course_names),
-     "CourseDescription": f"This course covers advanced topics in {random.choice(course_names).lower()}."}
-    for i in range(1, 51)
-]
 
-attends_records = [
-    {"StudentID": random.randint(1, 50), "CourseID": random.randint(1, 50)}
-    for _ in range(50)
-]
+def course_rows(count, rng=random):
+    for i in range(1, count + 1):
+        yield {"CourseID": i, "Year": rng.choice([2023, 2024, 2025]),
+               "CourseName": rng.choice(course_names),
+               "CourseDescription": f"This course covers advanced topics in {rng.choice(course_names).lower()}."}
 
 
-def write_with_pages(table_name, schema, records):
-    file_path = f"data/{table_name}.dat"
+def attends_rows(count, student_count, course_count, rng=random):
+    for _ in range(count):
+        yield {"StudentID": rng.randint(1, max(1, student_count)), "CourseID": rng.randint(1, max(1, course_count))}
+
+
+def write_with_pages(table_name, schema, records, base_path="data"):
+    file_path = os.path.join(base_path, f"{table_name}.dat")
     page = SlottedPage()
     pages = []
     
@@ -108,16 +99,34 @@ def write_with_pages(table_name, schema, records):
     print(f"Wrote {len(records)} records into {len(pages)} page(s): {file_path}")
 
 
-write_with_pages("student", student, students)
-write_with_pages("course", course, courses)
-write_with_pages("attends", attends, attends_records)
+if __name__ == "__main__":
+    os.makedirs("data", exist_ok=True)
+
+    schema_path = os.path.join("data", "schema.dat")
+    if not os.path.exists(schema_path):
+        with open(schema_path, "wb") as f:
+            pass  # just create an empty file
+
+    schemas = default_schemas()
+    manager = SchemaManager()
+    for table_name, schema in schemas.items():
+        manager.add_table_schema(table_name, schema)
+    manager.save_schemas()
+
+    students = list(student_rows(50))
+    courses = list(course_rows(50))
+    attends_records = list(attends_rows(50, 50, 50))
+
+    write_with_pages("student", schemas["Student"], students)
+    write_with_pages("course", schemas["Course"], courses)
+    write_with_pages("attends", schemas["Attends"], attends_records)
 
 
-loader = SchemaManager()
-loader.load_schemas()
+    loader = SchemaManager()
+    loader.load_schemas()
 
-for table_name in loader.list_tables():
-    schema = loader.get_table_schema(table_name)
-    print(f"\nTable: {table_name}")
-    for attr in schema.get_attributes():
-        print(f"  - {attr['name']:15} {attr['type']:10} {attr['size']}")
+    for table_name in loader.list_tables():
+        schema = loader.get_table_schema(table_name)
+        print(f"\nTable: {table_name}")
+        for attr in schema.get_attributes():
+            print(f"  - {attr['name']:15} {attr['type']:10} {attr['size']}")
@@ -0,0 +1,143 @@
+import os
+import shutil
+from storagemanager_helper.clustering import sort_key
+from storagemanager_helper.external_sort import SpillFile, approximate_size, spill_directory
+
+JOIN_METHODS = ('index_nested_loop', 'hash', 'sort_merge')
+
+# Outer rows probed per index nested-loop batch, and the most rows read
+# per batch (each batch under its own table lock)
+JOIN_BATCH_ROWS = 1024
+JOIN_BATCH_PAGES = 16
+
+# Partitions a hash join splits into once its build side outgrows memory;
+# a partition that is still too big is split again, up to this depth
+HASH_PARTITIONS = 16
+MAX_PARTITION_DEPTH = 3
+
+
+def qualify(table, row):
+    return {f"{table}.{name}": value for name, value in row.items()}
+
+
+class HashJoin:
+    """Equi-join that builds a hash table on one input and probes it with
+    the other, yielding each probe row merged with every build row sharing
+    its key. NULL keys match nothing.
+
+    While the build rows fit in memory_bytes the probe side streams
+    through in its own order. Past that, both inputs are split by key hash
+    into partition files under temp_dir (a Grace hash join) and joined one
+    partition at a time, re-splitting any partition that is still too big.
+    """
+
+    def __init__(self, build_column, probe_column, temp_dir, memory_bytes):
+        self.build_column = build_column
+        self.probe_column = probe_column
+        self.temp_dir = temp_dir
+        self.memory_bytes = memory_bytes
+        self.partitions_written = 0
+        self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def join(self, build_rows, probe_rows):
+        table, build_partitions = self._build(build_rows, depth=0)
+        if build_partitions is None:
+            yield from self._probe(table, probe_rows)
+            return
+
+        probe_partitions = self._partition(probe_rows, self.probe_column, depth=0)
+        yield from self._join_partitions(build_partitions, probe_partitions, depth=0)
+
+    def _build(self, rows, depth):
+        """(hash table, None), or (None, partition files) once the rows
+        outgrow memory_bytes (never past MAX_PARTITION_DEPTH)."""
+        table = {}
+        size = 0
+        rows = iter(rows)
+        for row in rows:
+            key = row[self.build_column]
+            if key is None:
+                continue
+            table.setdefault(key, []).append(row)
+            size += approximate_size(row)
+            if size > self.memory_bytes and depth < MAX_PARTITION_DEPTH:
+                buffered = (row for matches in table.values() for row in matches)
+                partitions = self._partition(buffered, self.build_column, depth)
+                del table
+                for row in rows:
+                    self._add_to_partition(partitions, row, self.build_column, depth)
+                return None, partitions
+        return table, None
+
+    def _probe(self, table, rows):
+        for row in rows:
+            key = row[self.probe_column]
+            if key is None:
+                continue
+            for match in table.get(key, ()):
+                yield {**row, **match}
+
+    def _partition(self, rows, column, depth):
+        if self._spill_dir is None:
+            self._spill_dir = spill_directory(self.temp_dir, 'join_')
+        partitions = []
+        for _ in range(HASH_PARTITIONS):
+            partitions.append(SpillFile(os.path.join(self._spill_dir, f"part_{self.partitions_written}")))
+            self.partitions_written += 1
+        for row in rows:
+            self._add_to_partition(partitions, row, column, depth)
+        return partitions
+
+    def _add_to_partition(self, partitions, row, column, depth):
+        key = row[column]
+        if key is not None:
+            # Salted by depth so a re-split spreads keys a parent split grouped
+            partitions[hash((depth, key)) % HASH_PARTITIONS].append(row)
+
+    def _join_partitions(self, build_partitions, probe_partitions, depth):
+        for build, probe in zip(build_partitions, probe_partitions):
+            table, sub_partitions = self._build(build, depth + 1)
+            build.remove()
+            if sub_partitions is None:
+                yield from self._probe(table, probe)
+            else:
+                sub_probe = self._partition(probe, self.probe_column, depth + 1)
+                yield from self._join_partitions(sub_partitions, sub_probe, depth + 1)
+            probe.remove()
+
+
+def merge_join(left_rows, right_rows, left_column, right_column):
+    """Equi-join two inputs already sorted ascending on their join columns
+    (NULL first, as in a B+ tree), yielding merged rows in key order.
+    Right rows sharing a key are buffered while left rows with that key
+    pass; NULL keys match nothing."""
+    right_rows = iter(right_rows)
+    right = next(right_rows, None)
+    group_key = None
+    group = []
+    for left in left_rows:
+        key = left[left_column]
+        if key is None:
+            continue
+        if key != group_key:
+            group_key = key
+            group = []
+            rank = sort_key(key)
+            while right is not None and sort_key(right[right_column]) < rank:
+                right = next(right_rows, None)
+            while right is not None and right[right_column] == key:
+                group.append(right)
+                right = next(right_rows, None)
+        for match in group:
+            yield {**left, **match}
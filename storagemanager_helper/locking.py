@@ -0,0 +1,97 @@
+import threading
+from contextlib import contextmanager
+
+# Page latches are striped: every page hashes to one of a fixed set, so
+# their number does not grow with the pages ever touched. A latch is only
+# held around a single page read or write and never nested, so two pages
+# sharing one cannot deadlock; they only briefly wait on each other.
+PAGE_LATCH_STRIPES = 256
+
+
+class ReadWriteLock:
+    """Many readers or one writer. Waiting writers block new readers so a
+    steady stream of scans cannot starve a write."""
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class LockManager:
+    """Hands out the locks StorageManager coordinates on.
+
+    table(): shared for scans, lookups and appends, exclusive for updates,
+    deletes and index builds (anything that moves rows or RIDs).
+    append(): serializes inserts into the tail page of one table.
+    page(): latch held while one page is read from or written to disk.
+    """
+
+    def __init__(self, page_latch_stripes=PAGE_LATCH_STRIPES):
+        self._mutex = threading.Lock()
+        self._tables = {}
+        self._appends = {}
+        self._page_latches = [ReadWriteLock() for _ in range(page_latch_stripes)]
+
+    def table(self, table_name):
+        with self._mutex:
+            lock = self._tables.get(table_name)
+            if lock is None:
+                lock = self._tables[table_name] = ReadWriteLock()
+            return lock
+
+    def append(self, table_name):
+        with self._mutex:
+            lock = self._appends.get(table_name)
+            if lock is None:
+                lock = self._appends[table_name] = threading.Lock()
+            return lock
+
+    def page(self, table_name, page_id):
+        return self._page_latches[hash((table_name, page_id)) % len(self._page_latches)]
+
+    def page_reader(self, table_name):
+        """Callable for iter_page_views/read_page_view: latch(page_id) -> context."""
+        return lambda page_id: self.page(table_name, page_id).read()
@@ -0,0 +1,212 @@
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import nullcontext
+
+COUNTERS = (
+    'pages_read', 'pages_written', 'bytes_read', 'bytes_written',
+    'rows_deserialized', 'rows_matched',
+    'index_probes', 'index_entries_scanned',
+    'buffer_hits', 'buffer_misses', 'index_saves', 'sort_runs', 'pages_skipped',
+    'result_cache_hits', 'result_cache_misses',
+)
+
+# Upper bounds (seconds) of the latency buckets; one more bucket takes the rest
+LATENCY_BOUNDS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+LATENCY_LABELS = [f"<={bound * 1000:g}ms" for bound in LATENCY_BOUNDS] + [f">{LATENCY_BOUNDS[-1] * 1000:g}ms"]
+
+_local = threading.local()
+
+
+def count(counter, amount=1):
+    """Add to a counter of the operation running on this thread, if any.
+
+    Helpers (slotted pages, index managers) call this without holding a
+    Metrics reference; outside an operation it does nothing."""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        counters = trace.counters
+        counters[counter] = counters.get(counter, 0) + amount
+
+
+def _zero_counters():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def _add_counters(totals, counters):
+    for name, amount in counters.items():
+        totals[name] = totals.get(name, 0) + amount
+
+
+# Stands in for a scope when collection is off; nothing becomes current,
+# so count() stays a no-op too
+_DISABLED = nullcontext()
+
+
+class OperationTrace:
+    """Counters and timing of one public StorageManager call, as passed to
+    the trace hook."""
+
+    def __init__(self, operation, table):
+        self.operation = operation
+        self.table = table
+        # Only the counters this call touched; to_dict() fills in the rest
+        self.counters = {}
+        self.duration = 0.0
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'operation': self.operation,
+            'table': self.table,
+            'duration_ms': self.duration * 1000,
+            'error': repr(self.error) if self.error is not None else None,
+            'counters': {name: self.counters.get(name, 0) for name in COUNTERS},
+        }
+
+
+class _OperationScope:
+    # A plain context manager rather than @contextmanager: it wraps every
+    # point lookup, so its own cost has to stay well below one
+
+    def __init__(self, metrics, name, table):
+        self.metrics = metrics
+        self.trace = OperationTrace(name, table)
+        self.parent = None
+        self.start = 0.0
+
+    def __enter__(self):
+        self.parent = getattr(_local, 'trace', None)
+        _local.trace = self.trace
+        self.start = time.perf_counter()
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self.trace
+        trace.duration = time.perf_counter() - self.start
+        trace.error = exc
+        parent = self.parent
+        _local.trace = parent
+        if parent is not None:
+            _add_counters(parent.counters, trace.counters)
+        self.metrics._record(trace, nested=parent is not None)
+        hook = self.metrics.trace_hook
+        if hook is not None:
+            hook(trace)
+        return False
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.buckets[bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the percentile, capped at the
+        # slowest call seen
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if i < len(LATENCY_BOUNDS):
+                    return min(LATENCY_BOUNDS[i], self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p90_ms': self.percentile(0.9) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+            'buckets': dict(zip(LATENCY_LABELS, self.buckets)),
+        }
+
+
+class Metrics:
+    """Per-operation and per-table counters plus per-operation latency.
+
+    Each public call runs inside operation(), which makes an OperationTrace
+    current for the calling thread; count() adds to it, and when the call
+    ends its counters are folded into the totals and handed to trace_hook.
+    A nested operation (e.g. a checkpoint triggered by write_block) adds its
+    counters to the enclosing one, and only the outermost call is charged
+    to its table.
+    """
+
+    def __init__(self, trace_hook=None, enabled=True):
+        self.trace_hook = trace_hook
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._tables = {}
+
+    def operation(self, name, table=None):
+        if not self.enabled:
+            return _DISABLED
+        return _OperationScope(self, name, table)
+
+    def _record(self, trace, nested=False):
+        with self._lock:
+            op = self._operations.get(trace.operation)
+            if op is None:
+                op = self._operations[trace.operation] = {
+                    'calls': 0, 'errors': 0, 'counters': _zero_counters(), 'latency': LatencyHistogram()
+                }
+            op['calls'] += 1
+            if trace.error is not None:
+                op['errors'] += 1
+            _add_counters(op['counters'], trace.counters)
+            op['latency'].record(trace.duration)
+
+            if trace.table is not None and not nested:
+                table = self._tables.get(trace.table)
+                if table is None:
+                    table = self._tables[trace.table] = {'calls': Counter(), 'counters': _zero_counters()}
+                table['calls'][trace.operation] += 1
+                _add_counters(table['counters'], trace.counters)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'operations': {
+                    name: {
+                        'calls': op['calls'],
+                        'errors': op['errors'],
+                        'counters': dict(op['counters']),
+                        'latency': op['latency'].snapshot(),
+                    }
+                    for name, op in self._operations.items()
+                },
+                'tables': {
+                    name: {
+                        'calls': dict(table['calls']),
+                        'counters': dict(table['counters']),
+                    }
+                    for name, table in self._tables.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+            self._tables = {}
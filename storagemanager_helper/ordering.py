@@ -0,0 +1,68 @@
+import heapq
+from storagemanager_helper.clustering import sort_key
+
+
+class _Descending:
+    """Sort key wrapper that inverts the order of the key it holds."""
+
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+class RowCollector:
+    """Collects the rows of a scan in ORDER BY ... LIMIT order.
+
+    Quacks like the result list (append/extend); with a limit only the best
+    `limit` rows so far are kept, in a heap whose root is the worst of
+    them, so a top-K over a full scan needs O(K) memory. Rows with equal
+    sort keys keep scan order, and NULL sorts first (last when descending),
+    matching a B+ tree walk."""
+
+    def __init__(self, order_by=None, descending=False, limit=None):
+        self.order_by = order_by
+        self.descending = descending
+        self.limit = limit
+        self._rows = []
+        self._seen = 0
+
+    @property
+    def full(self):
+        # Without an order a later row can never displace a kept one
+        return self.order_by is None and self.limit is not None and len(self._rows) >= self.limit
+
+    def _rank(self, row):
+        if self.order_by is None:
+            return (self._seen,)
+        key = sort_key(row[self.order_by])
+        return (_Descending(key) if self.descending else key, self._seen)
+
+    def append(self, row):
+        rank = self._rank(row)
+        self._seen += 1
+        if self.limit is None:
+            self._rows.append((rank, row))
+        elif len(self._rows) < self.limit:
+            heapq.heappush(self._rows, (_Descending(rank), row))
+        elif self._rows and rank < self._rows[0][0].key:
+            heapq.heapreplace(self._rows, (_Descending(rank), row))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def rows(self):
+        if self.limit is None:
+            ranked = self._rows
+        else:
+            ranked = [(worst.key, row) for worst, row in self._rows]
+        if self.order_by is not None or self.limit is not None:
+            ranked = sorted(ranked, key=lambda entry: entry[0])
+        return [row for _, row in ranked]
@@ -0,0 +1,123 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from storagemanager_helper.row_serializer import RowSerializer
+from storagemanager_helper.slotted_page import PAGE_SIZE, SlottedPageView
+from storagemanager_helper.predicate import match_all, project
+from storagemanager_helper.hyperloglog import HyperLogLog
+from storagemanager_helper.histogram import Reservoir, widen
+from storagemanager_helper.index import index_key
+from storagemanager_helper.aggregation import AggregateSet, aggregate_records
+
+# Worker functions run in child processes, so they only take picklable
+# arguments (paths, Schema, Condition) and open the table file themselves.
+
+def _iter_records(table_path, start_page, end_page):
+    fd = os.open(table_path, os.O_RDONLY)
+    try:
+        for page_id in range(start_page, end_page):
+            page_bytes = os.pread(fd, PAGE_SIZE, page_id * PAGE_SIZE)
+            if not page_bytes:
+                break
+            if len(page_bytes) < PAGE_SIZE:
+                page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
+
+            page = SlottedPageView(page_bytes)
+            for slot_id, record_bytes in page.iter_records():
+                yield page_id, slot_id, record_bytes
+    finally:
+        os.close(fd)
+
+
+def _iter_rows(table_path, schema, start_page, end_page):
+    serializer = RowSerializer()
+    for page_id, slot_id, record_bytes in _iter_records(table_path, start_page, end_page):
+        yield page_id, slot_id, serializer.deserialize(schema, record_bytes)
+
+
+def scan_pages(table_path, schema, start_page, end_page, conditions, columns):
+    """Returns (rows scanned, matching rows projected to columns)."""
+    scanned = 0
+    rows = []
+    for _, _, row in _iter_rows(table_path, schema, start_page, end_page):
+        scanned += 1
+        if match_all(row, conditions):
+            rows.append(project(row, columns))
+    return scanned, rows
+
+
+def aggregate_pages(table_path, schema, start_page, end_page, conditions, group_by, aggregates):
+    """Returns (rows scanned, partial groups) for aggregate_block."""
+    records = (record_bytes for _, _, record_bytes in _iter_records(table_path, start_page, end_page))
+    groups, scanned = aggregate_records(schema, records, conditions, group_by, AggregateSet(aggregates))
+    return scanned, groups
+
+
+def collect_column(table_path, schema, start_page, end_page, column_name, include=()):
+    return [
+        (index_key(row, column_name), page_id, slot_id, tuple(row.get(c) for c in include))
+        for page_id, slot_id, row in _iter_rows(table_path, schema, start_page, end_page)
+    ]
+
+
+def collect_stats(table_path, schema, start_page, end_page):
+    serializer = RowSerializer()
+    n_r = 0
+    total_bytes = 0
+    value_counts = {attr['name']: Counter() for attr in schema.get_attributes()}
+    for _, _, record_bytes in _iter_records(table_path, start_page, end_page):
+        n_r += 1
+        total_bytes += len(record_bytes)
+        for attr_name, value in serializer.deserialize(schema, record_bytes).items():
+            value_counts[attr_name][value] += 1
+    return n_r, total_bytes, value_counts
+
+
+def collect_sketches(table_path, schema, start_page, end_page, precision):
+    serializer = RowSerializer()
+    n_r = 0
+    total_bytes = 0
+    sketches = {attr['name']: HyperLogLog(precision) for attr in schema.get_attributes()}
+    extremes = {}
+    sample = Reservoir()
+    for _, _, record_bytes in _iter_records(table_path, start_page, end_page):
+        n_r += 1
+        total_bytes += len(record_bytes)
+        record = serializer.deserialize(schema, record_bytes)
+        for attr_name, value in record.items():
+            sketches[attr_name].add(value)
+            widen(extremes, attr_name, value)
+        sample.add(record)
+    return n_r, total_bytes, sketches, extremes, sample
+
+
+class ParallelScanner:
+    def __init__(self, workers, min_pages_per_chunk=8):
+        self.workers = workers
+        self.min_pages_per_chunk = min_pages_per_chunk
+        self._executor = None
+
+    def should_parallelize(self, page_count):
+        return page_count >= self.min_pages_per_chunk * 2
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _chunks(self, page_count):
+        # A few chunks per worker keeps the pool busy when chunks finish unevenly
+        chunk_size = max(self.min_pages_per_chunk, -(-page_count // (self.workers * 4)))
+        return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+    def map(self, fn, table_path, schema, page_count, *args):
+        """Run fn over page-range chunks of a table; results come back in page order."""
+        chunks = self._chunks(page_count)
+        executor = self._get_executor()
+        futures = [executor.submit(fn, table_path, schema, start, end, *args) for start, end in chunks]
+        return [future.result() for future in futures]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
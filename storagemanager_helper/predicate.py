@@ -0,0 +1,52 @@
+from storagemanager_model.condition import Condition
+
+
+def coerce_operand(a, b):
+    # Numeric columns compared against numeric strings ('3.5') compare as numbers
+    if isinstance(a, (int, float)) and isinstance(b, str):
+        s = b.strip()
+        if s.replace('.', '', 1).lstrip('+-').isdigit():
+            b = float(s) if '.' in s else int(s)
+    return b
+
+
+def coerce_conditions(schema, conditions):
+    """conditions with operands on int/float columns coerced once, the way
+    match_condition would per row, so index probes, page pruning and row
+    matching all see the same value. Unchanged conditions are reused."""
+    numeric = {attr['name'] for attr in schema.get_attributes() if attr['type'] in ('int', 'float')}
+    coerced = []
+    for cond in conditions:
+        operand = coerce_operand(0, cond.operand) if cond.column in numeric else cond.operand
+        coerced.append(cond if operand is cond.operand else Condition(cond.column, cond.operation, operand))
+    return coerced
+
+
+def match_condition(row, cond: Condition):
+    a = row.get(cond.column)
+    return compare(a, cond.operation, coerce_operand(a, cond.operand))
+
+
+def compare(a, op, b):
+    if op == "=": return a == b
+    if op in ("<>", "!="): return a != b
+    if op == ">": return a > b
+    if op == ">=": return a >= b
+    if op == "<": return a < b
+    if op == "<=": return a <= b
+    return False
+
+
+def match_all(row, conditions):
+    for cond in conditions:
+        if not match_condition(row, cond):
+            return False
+    return True
+
+
+def project(row, columns):
+    if columns == "*" or columns is None:
+        return row
+    if isinstance(columns, str):
+        columns = [columns]
+    return {c: row[c] for c in columns}
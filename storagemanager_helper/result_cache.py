@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from storagemanager_helper.metrics import count
+from storagemanager_helper.external_sort import approximate_size
+
+
+def retrieval_key(data_retrieval):
+    """Hashable key of a DataRetrieval; retrievals that differ only in how
+    they were written down (condition order, None for '*', a bare column
+    name) share one."""
+    columns = data_retrieval.column
+    if columns is None:
+        columns = "*"
+    elif isinstance(columns, str) and columns != "*":
+        columns = (columns,)
+    elif isinstance(columns, (list, tuple)):
+        columns = tuple(columns)
+    # Conditions are ANDed, so their order does not matter
+    conditions = tuple(sorted(
+        (cond.column, cond.operation, repr(cond.operand)) for cond in data_retrieval.conditions or []
+    ))
+    return (data_retrieval.table, columns, conditions,
+            data_retrieval.order_by, data_retrieval.descending, data_retrieval.limit)
+
+
+class ResultCache:
+    """read_block results kept within memory_bytes, least recently used
+    evicted first.
+
+    Every table has a version counter, and an entry is only served while
+    its table is still at the version read before the rows were. A write
+    calls invalidate(table), which bumps the counter and drops the table's
+    entries, so a result computed alongside the write can never be served
+    after it. Rows are copied in and out, so callers may modify them.
+    """
+
+    def __init__(self, memory_bytes):
+        if memory_bytes <= 0:
+            raise ValueError("memory_bytes must be positive")
+        self.memory_bytes = memory_bytes
+        self.used_bytes = 0
+        # key -> (table version, rows, size)
+        self._entries = OrderedDict()
+        self._table_keys = {}
+        self._versions = {}
+        self._mutex = threading.Lock()
+
+    def version(self, table):
+        return self._versions.get(table, 0)
+
+    def get(self, key):
+        table = key[0]
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._versions.get(table, 0):
+                count('result_cache_misses')
+                return None
+            self._entries.move_to_end(key)
+            rows = entry[1]
+        count('result_cache_hits')
+        return [dict(row) for row in rows]
+
+    def put(self, key, version, rows):
+        """Cache rows read at version of their table; a result bigger than
+        the whole budget is not cached."""
+        rows = [dict(row) for row in rows]
+        size = approximate_size(key) + approximate_size(rows)
+        if size > self.memory_bytes:
+            return False
+
+        table = key[0]
+        with self._mutex:
+            if version != self._versions.get(table, 0):
+                # A write finished while these rows were read
+                return False
+            self._remove(key)
+            self._entries[key] = (version, rows, size)
+            self._table_keys.setdefault(table, set()).add(key)
+            self.used_bytes += size
+            while self.used_bytes > self.memory_bytes:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, table):
+        with self._mutex:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            for key in self._table_keys.pop(table, ()):
+                self._remove(key)
+
+    def clear(self):
+        with self._mutex:
+            self._entries.clear()
+            self._table_keys.clear()
+            self.used_bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.used_bytes -= entry[2]
+        keys = self._table_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
@@ -46,4 +46,33 @@ class RowSerializer:
 
             record[field_name] = value
 
-        return record
\ No newline at end of file
+        return record
+
+    def column_reader(self, schema, columns):
+        """Function decoding only columns (a tuple of values, in that order)
+        from record bytes. Every field has a fixed width, so each column
+        sits at the same offset in every record of a table."""
+        offsets = {}
+        offset = 0
+        for field in schema.get_attributes():
+            offsets[field["name"]] = (offset, field.get("type"), field.get("size"))
+            if field.get("type") == "varchar":
+                offset += 4 + field.get("size")
+            elif field.get("type") == "char":
+                offset += field.get("size")
+            else:
+                offset += 4
+
+        decoders = []
+        for column in columns:
+            field_offset, field_type, field_size = offsets[column]
+            if field_type == "int":
+                decoders.append(lambda data, o=field_offset: self.encoder.decode_int(data, o)[0])
+            elif field_type == "float":
+                decoders.append(lambda data, o=field_offset: self.encoder.decode_float(data, o)[0])
+            elif field_type == "char":
+                decoders.append(lambda data, o=field_offset, n=field_size: self.encoder.decode_char(data, o, n)[0])
+            else:
+                decoders.append(lambda data, o=field_offset, n=field_size: self.encoder.decode_varchar(data, o, n)[0])
+
+        return lambda data: tuple(decode(data) for decode in decoders)
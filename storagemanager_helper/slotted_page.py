@@ -1,4 +1,7 @@
 import struct
+import itertools
+from contextlib import nullcontext
+from storagemanager_helper.metrics import count
 
 PAGE_SIZE = 4096 
 HEADER_SIZE = 4
@@ -27,6 +30,7 @@ class SlottedPage:
         self.free_space_offset += SLOT_SIZE
         self.free_record_offset = record_start
         self.record_count += 1
+        return self.record_count - 1
 
     
     def serialize(self):
@@ -36,18 +40,22 @@ class SlottedPage:
     
     def load(self, byte_data):
         self.data = bytearray(byte_data)
-        self.record_count, self.free_space_offset = struct.unpack("<HH", self.data[:HEADER_SIZE])
-        self.slots = []
-        for i in range(self.record_count):
-            offset = HEADER_SIZE + i * SLOT_SIZE
-            record_start, record_length = struct.unpack("<II", self.data[offset:offset + SLOT_SIZE])
-            self.slots.append((record_start, record_length))
+        self.record_count, self.free_space_offset = struct.unpack_from("<HH", self.data, 0)
+        self.slots = [
+            struct.unpack_from("<II", self.data, HEADER_SIZE + i * SLOT_SIZE)
+            for i in range(self.record_count)
+        ]
         
         if self.slots:
             self.free_record_offset = min(start for start, _ in self.slots)
         else:
             self.free_record_offset = PAGE_SIZE
 
+    def copy(self):
+        page = SlottedPage()
+        page.load(self.serialize())
+        return page
+
     def get_record(self, slot_index):  
         record_start, record_length = self.slots[slot_index]
         return bytes(self.data[record_start:record_start + record_length])
@@ -104,31 +112,108 @@ class SlottedPage:
         return True
     
     def delete_record(self, slot_index):
-        old_start, old_length = self.slots[slot_index]
-
-        upper_data_length = old_start - self.free_record_offset
-        
-        if upper_data_length > 0:
-            self.data[self.free_record_offset + old_length : old_start + old_length] = self.data[self.free_record_offset : old_start]
-
-        # Update free_record_offset
-        self.free_record_offset += old_length
-
-        del self.slots[slot_index]
-        self.record_count -= 1
-        self.free_space_offset -= SLOT_SIZE
-
-        for i, (start, length) in enumerate(self.slots):
-            if start < old_start:  # Records physically above (lower offset)
-                self.slots[i] = (start + old_length, length)
-
-        for i, (start, length) in enumerate(self.slots):
-            offset = HEADER_SIZE + i * SLOT_SIZE
-            self.data[offset:offset + SLOT_SIZE] = struct.pack('<II', start, length)
-        
-        old_last_slot_offset = HEADER_SIZE + self.record_count * SLOT_SIZE
-        self.data[old_last_slot_offset:old_last_slot_offset + SLOT_SIZE] = b'\x00' * SLOT_SIZE
-
-
-
+        self.delete_records([slot_index])
+
+    def delete_records(self, slot_indices):
+        """Remove every slot in slot_indices with a single compaction pass.
+
+        Surviving records are repacked from the end of the page in slot order
+        and the slot directory is rewritten once. Returns a list mapping each
+        old slot index to its new index, or None for deleted slots.
+        """
+        doomed = set(slot_indices)
+        for slot_index in doomed:
+            if slot_index < 0 or slot_index >= self.record_count:
+                raise IndexError(f"Slot {slot_index} out of range")
+
+        new_data = bytearray(PAGE_SIZE)
+        new_slots = []
+        slot_map = []
+        free_record_offset = PAGE_SIZE
+
+        for slot_index, (start, length) in enumerate(self.slots):
+            if slot_index in doomed:
+                slot_map.append(None)
+                continue
 
+            free_record_offset -= length
+            new_data[free_record_offset:free_record_offset + length] = self.data[start:start + length]
+            struct.pack_into('<II', new_data, HEADER_SIZE + len(new_slots) * SLOT_SIZE, free_record_offset, length)
+            slot_map.append(len(new_slots))
+            new_slots.append((free_record_offset, length))
+
+        self.data = new_data
+        self.slots = new_slots
+        self.record_count = len(new_slots)
+        self.free_space_offset = HEADER_SIZE + self.record_count * SLOT_SIZE
+        self.free_record_offset = free_record_offset
+
+        return slot_map
+
+
+class SlottedPageView:
+    """Read-only view over a serialized page.
+
+    Wraps the page buffer in a memoryview and decodes slot entries on demand,
+    so read paths never copy the page or its records. The view is only valid
+    while the underlying buffer is unchanged; call to_page() when a mutable
+    SlottedPage is needed.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        self.record_count, self.free_space_offset = struct.unpack_from("<HH", self.buffer, 0)
+
+    def get_slot(self, slot_index):
+        if slot_index < 0 or slot_index >= self.record_count:
+            raise IndexError(f"Slot {slot_index} out of range")
+        return struct.unpack_from("<II", self.buffer, HEADER_SIZE + slot_index * SLOT_SIZE)
+
+    def get_record(self, slot_index):
+        record_start, record_length = self.get_slot(slot_index)
+        return self.buffer[record_start:record_start + record_length]
+
+    def iter_records(self):
+        for slot_index in range(self.record_count):
+            yield slot_index, self.get_record(slot_index)
+
+    def to_page(self):
+        page = SlottedPage()
+        page.load(self.buffer)
+        return page
+
+
+def _no_latch(page_id):
+    return nullcontext()
+
+
+def read_page_view(f, page_id, latch=_no_latch):
+    with latch(page_id):
+        f.seek(page_id * PAGE_SIZE)
+        page_bytes = f.read(PAGE_SIZE)
+    count('pages_read')
+    count('bytes_read', len(page_bytes))
+    if len(page_bytes) < PAGE_SIZE:
+        page_bytes = page_bytes.ljust(PAGE_SIZE, b"\x00")
+    return SlottedPageView(page_bytes)
+
+
+def iter_page_views(f, latch=_no_latch, page_ids=None):
+    # Every yielded view shares one buffer, so a view (and any record
+    # memoryview taken from it) is only valid until the next iteration.
+    # When latching, f should be unbuffered so each page is read from disk
+    # under its own latch rather than served from read-ahead. page_ids,
+    # if given, limits the scan to those pages (ascending).
+    buffer = bytearray(PAGE_SIZE)
+    for page_id in (itertools.count() if page_ids is None else page_ids):
+        with latch(page_id):
+            if page_ids is not None:
+                f.seek(page_id * PAGE_SIZE)
+            bytes_read = f.readinto(buffer)
+        if not bytes_read:
+            break
+        count('pages_read')
+        count('bytes_read', bytes_read)
+        if bytes_read < PAGE_SIZE:
+            buffer[bytes_read:] = bytes(PAGE_SIZE - bytes_read)
+        yield page_id, SlottedPageView(buffer)
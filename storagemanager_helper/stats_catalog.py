@@ -0,0 +1,419 @@
+import os
+import struct
+import threading
+from collections import Counter
+from storagemanager_helper.hyperloglog import HyperLogLog
+from storagemanager_helper.histogram import ColumnHistogram, widen
+
+STATS_FILENAME = 'stats.dat'
+STATS_VERSION = 4
+# Distinct values an exact-mode column counts one by one before its counts
+# are folded into a HyperLogLog, bounding the catalog's memory and file size
+MAX_EXACT_DISTINCT = 10000
+DEFAULT_PRECISION = 14
+
+EXACT_MODE = 0
+SKETCH_MODE = 1
+
+
+def estimate_distinct(sample_counts, sample_rows, total_rows):
+    """Haas-Stokes (Duj1) estimate of the distinct values in the whole table
+    from the value frequencies of a uniform sample of sample_rows rows."""
+    if sample_rows == 0:
+        return 0
+    distinct = len(sample_counts)
+    seen_once = sum(1 for count in sample_counts.values() if count == 1)
+    if seen_once == sample_rows:
+        # Every sampled value was unique: assume the column is too
+        return total_rows
+    denominator = sample_rows - seen_once + seen_once * sample_rows / max(total_rows, sample_rows)
+    return sample_rows * distinct / denominator
+
+
+class TableStats:
+    def __init__(self, n_r=0, total_bytes=0, value_counts=None, fingerprint=(0, 0),
+                 sketches=None, distinct_offsets=None, histograms=None, capped=None, extremes=None):
+        self.n_r = n_r
+        self.total_bytes = total_bytes
+        # Exact mode: column -> Counter(value -> occurrences), so deletes and
+        # updates can be applied without rescanning
+        self.value_counts = value_counts if value_counts is not None else {}
+        # Exact mode, columns past the distinct cap: column -> HyperLogLog.
+        # Like sketch mode, these cannot forget deleted values
+        self.capped = capped if capped is not None else {}
+        # Sketch mode: column -> HyperLogLog. Sketches cannot forget values,
+        # so deletes leave V(A,r) high until the next analyze (it is still
+        # capped at n_r). A sampled analyze stores the gap between its
+        # estimate and the sample's sketch as the column's offset.
+        self.sketches = sketches
+        self.distinct_offsets = distinct_offsets if distinct_offsets is not None else {}
+        # column -> ColumnHistogram, rebuilt by analyze (and, in exact mode,
+        # from value_counts once enough rows changed)
+        self.histograms = histograms if histograms is not None else {}
+        # column -> [min, max], for columns whose every value analyze saw
+        # (not after a sampled analyze). Inserts widen them; deletes leave
+        # them wide, so no row is ever outside
+        self.extremes = extremes if extremes is not None else {}
+        self.changes_since_histograms = 0
+        # Bumped on every change to this entry, so a save can tell whether
+        # what it encoded is still current
+        self.version = 0
+        # (size, mtime_ns) of the table file when these stats were saved
+        self.fingerprint = fingerprint
+
+    def distinct(self, column_name):
+        if self.sketches is not None:
+            sketch = self.sketches.get(column_name)
+            if sketch is None:
+                return 0
+            return max(0, round(sketch.count() + self.distinct_offsets.get(column_name, 0.0)))
+        if column_name in self.capped:
+            return round(self.capped[column_name].count())
+        return len(self.value_counts.get(column_name, ()))
+
+
+class StatsCatalog:
+    """Per-table statistics kept current by the write paths.
+
+    Entries exist only for analyzed tables; writes to a table without an
+    entry are ignored until the next analyze. The catalog is persisted to
+    stats.dat on save(). The first change after a save removes the file, so
+    a crash never leaves stale numbers behind, and an entry whose table file
+    was changed by someone else is dropped on load.
+
+    An exact-mode column that reaches max_exact_distinct distinct values
+    switches to a HyperLogLog of the given precision.
+    """
+
+    def __init__(self, base_path='data', max_exact_distinct=MAX_EXACT_DISTINCT, precision=DEFAULT_PRECISION):
+        self.path = os.path.join(base_path, STATS_FILENAME)
+        self.max_exact_distinct = max_exact_distinct
+        self.precision = precision
+        self.tables = {}
+        self.unsaved_changes = 0
+        self._on_disk = False
+        self._mutex = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def _changed(self, stats=None):
+        self.unsaved_changes += 1
+        if stats is not None:
+            stats.changes_since_histograms += 1
+            stats.version += 1
+        if self._on_disk:
+            self._on_disk = False
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def get(self, table_name):
+        with self._mutex:
+            return self.tables.get(table_name)
+
+    def put(self, table_name, table_stats):
+        if table_stats.sketches is None:
+            for column_name in list(table_stats.value_counts):
+                self._cap(table_stats, column_name)
+        with self._mutex:
+            self.tables[table_name] = table_stats
+            self._changed()
+
+    def invalidate(self, table_name):
+        with self._mutex:
+            if self.tables.pop(table_name, None) is not None:
+                self._changed()
+
+    def record_insert(self, table_name, record, nbytes):
+        with self._mutex:
+            stats = self.tables.get(table_name)
+            if stats is None:
+                return
+            stats.n_r += 1
+            stats.total_bytes += nbytes
+            for column_name, value in record.items():
+                self._add(stats, column_name, value)
+            self._changed(stats)
+
+    def record_delete(self, table_name, record, nbytes):
+        with self._mutex:
+            stats = self.tables.get(table_name)
+            if stats is None:
+                return
+            stats.n_r -= 1
+            stats.total_bytes -= nbytes
+            if stats.sketches is None:
+                for column_name, value in record.items():
+                    self._decrement(stats, column_name, value)
+            self._changed(stats)
+
+    def record_update(self, table_name, old_record, new_record):
+        with self._mutex:
+            stats = self.tables.get(table_name)
+            if stats is None:
+                return
+            for column_name, new_value in new_record.items():
+                old_value = old_record.get(column_name)
+                if old_value != new_value:
+                    if stats.sketches is None:
+                        self._decrement(stats, column_name, old_value)
+                    self._add(stats, column_name, new_value)
+            self._changed(stats)
+
+    def _add(self, stats, column_name, value):
+        if column_name in stats.extremes:
+            widen(stats.extremes, column_name, value)
+        histogram = stats.histograms.get(column_name)
+        if histogram is not None:
+            histogram.cover(value)
+        if stats.sketches is None:
+            sketch = stats.capped.get(column_name)
+            if sketch is not None:
+                sketch.add(value)
+                return
+            counts = stats.value_counts.setdefault(column_name, Counter())
+            counts[value] += 1
+            if len(counts) > self.max_exact_distinct:
+                self._cap(stats, column_name)
+        else:
+            sketch = stats.sketches.get(column_name)
+            if sketch is not None:
+                sketch.add(value)
+
+    def _cap(self, stats, column_name):
+        # Fold a column's counts into a sketch once there are too many of them
+        counts = stats.value_counts.get(column_name)
+        if counts is None or len(counts) <= self.max_exact_distinct:
+            return
+        sketch = HyperLogLog(self.precision)
+        for value in counts:
+            sketch.add(value)
+        stats.capped[column_name] = sketch
+        del stats.value_counts[column_name]
+
+    def rebuild_histograms(self, table_name, num_buckets, num_mcv):
+        """Recompute an exact-mode entry's histograms from its value counts
+        (capped columns keep theirs until the next analyze)."""
+        with self._mutex:
+            stats = self.tables.get(table_name)
+            if stats is None or stats.sketches is not None:
+                return
+            stats.histograms.update({
+                column_name: ColumnHistogram.build(counts, num_buckets, num_mcv)
+                for column_name, counts in stats.value_counts.items()
+            })
+            stats.changes_since_histograms = 0
+            stats.version += 1
+            self._changed()
+
+    def _decrement(self, stats, column_name, value):
+        counts = stats.value_counts.get(column_name)
+        if counts is None or value not in counts:
+            return
+        counts[value] -= 1
+        if counts[value] <= 0:
+            del counts[value]
+
+    def _encode_value(self, value):
+        if value is None:
+            return struct.pack('<B', 0)
+        if isinstance(value, int):
+            return struct.pack('<Bi', 1, value)
+        if isinstance(value, float):
+            return struct.pack('<Bf', 2, value)
+        value_bytes = str(value).encode('utf-8')
+        return struct.pack('<BI', 3, len(value_bytes)) + value_bytes
+
+    def _decode_value(self, data, offset):
+        value_type = data[offset]
+        offset += 1
+        if value_type == 0:
+            return None, offset
+        if value_type == 1:
+            return struct.unpack_from('<i', data, offset)[0], offset + 4
+        if value_type == 2:
+            return round(struct.unpack_from('<f', data, offset)[0], 2), offset + 4
+        length = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        return data[offset:offset + length].decode('utf-8'), offset + length
+
+    def _encode_name(self, name):
+        name_bytes = name.encode('utf-8')
+        return struct.pack('<H', len(name_bytes)) + name_bytes
+
+    def _decode_name(self, data, offset):
+        length = struct.unpack_from('<H', data, offset)[0]
+        offset += 2
+        return data[offset:offset + length].decode('utf-8'), offset + length
+
+    def _encode_histograms(self, histograms):
+        result = struct.pack('<H', len(histograms))
+        for column_name, histogram in histograms.items():
+            result += self._encode_name(column_name)
+            result += struct.pack('<IBH', histogram.distinct, histogram.sampled, len(histogram.mcv))
+            for value, frequency in histogram.mcv:
+                result += self._encode_value(value) + struct.pack('<d', frequency)
+            result += struct.pack('<H', len(histogram.bounds))
+            for value in histogram.bounds:
+                result += self._encode_value(value)
+        return result
+
+    def _decode_histograms(self, data, offset):
+        histograms = {}
+        column_count = struct.unpack_from('<H', data, offset)[0]
+        offset += 2
+        for _ in range(column_count):
+            column_name, offset = self._decode_name(data, offset)
+            distinct, sampled, mcv_count = struct.unpack_from('<IBH', data, offset)
+            offset += 7
+            mcv = []
+            for _ in range(mcv_count):
+                value, offset = self._decode_value(data, offset)
+                mcv.append((value, struct.unpack_from('<d', data, offset)[0]))
+                offset += 8
+            bound_count = struct.unpack_from('<H', data, offset)[0]
+            offset += 2
+            bounds = []
+            for _ in range(bound_count):
+                value, offset = self._decode_value(data, offset)
+                bounds.append(value)
+            histograms[column_name] = ColumnHistogram(mcv, bounds, distinct, bool(sampled))
+        return histograms, offset
+
+    def encode_table(self, table_name, fingerprint=None):
+        """Snapshot of table_name's entry for write() (None if it has none),
+        recording fingerprint as its table file's current one. The caller
+        keeps writers of the table out while this runs."""
+        stats = self.get(table_name)
+        if stats is None:
+            return None
+        if fingerprint is not None:
+            stats.fingerprint = fingerprint
+        return table_name, stats, stats.version, self._encode_stats(table_name, stats)
+
+    def _encode_stats(self, table_name, stats):
+        result = bytearray(self._encode_name(table_name))
+        result += struct.pack('<QQQq', stats.n_r, stats.total_bytes, *stats.fingerprint)
+        result += self._encode_histograms(stats.histograms)
+        result += struct.pack('<H', len(stats.extremes))
+        for column_name, (low, high) in stats.extremes.items():
+            result += self._encode_name(column_name) + self._encode_value(low) + self._encode_value(high)
+        if stats.sketches is not None:
+            result += struct.pack('<BH', SKETCH_MODE, len(stats.sketches))
+            for column_name, sketch in stats.sketches.items():
+                result += self._encode_name(column_name)
+                result += struct.pack('<d', stats.distinct_offsets.get(column_name, 0.0))
+                result += sketch.serialize()
+            return bytes(result)
+
+        result += struct.pack('<BH', EXACT_MODE, len(stats.value_counts))
+        for column_name, counts in stats.value_counts.items():
+            result += self._encode_name(column_name)
+            result += struct.pack('<I', len(counts))
+            for value, count in counts.items():
+                result += self._encode_value(value) + struct.pack('<Q', count)
+        result += struct.pack('<H', len(stats.capped))
+        for column_name, sketch in stats.capped.items():
+            result += self._encode_name(column_name) + sketch.serialize()
+        return bytes(result)
+
+    def _write_entries(self, path, entries):
+        with open(path, 'wb') as f:
+            f.write(struct.pack('<BI', STATS_VERSION, len(entries)))
+            for entry in entries:
+                f.write(entry[3])
+
+    def write(self, entries, saved_changes):
+        """Save the snapshots taken by encode_table as the catalog, where
+        saved_changes is unsaved_changes as read before the first one. The
+        file is written without holding the catalog; an entry that changed
+        since its snapshot is left out (its table is re-analyzed after a
+        restart) and changes made meanwhile stay unsaved."""
+        tmp_path = self.path + '.tmp'
+        with self._save_lock:
+            self._write_entries(tmp_path, entries)
+            with self._mutex:
+                current = [entry for entry in entries
+                           if self.tables.get(entry[0]) is entry[1] and entry[1].version == entry[2]]
+                if len(current) < len(entries):
+                    self._write_entries(tmp_path, current)
+                os.replace(tmp_path, self.path)
+                self._on_disk = True
+                self.unsaved_changes = max(0, self.unsaved_changes - saved_changes)
+
+    def save(self, fingerprints):
+        """Write the catalog; fingerprints maps table -> current (size,
+        mtime_ns). The caller keeps writers of every table out."""
+        saved_changes = self.unsaved_changes
+        entries = [self.encode_table(table_name, fingerprints.get(table_name)) for table_name in list(self.tables)]
+        self.write([entry for entry in entries if entry is not None], saved_changes)
+
+    def load(self, fingerprints):
+        """Read the catalog, keeping only tables whose file still matches."""
+        self.tables = {}
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self._on_disk = True
+
+        try:
+            version, table_count = struct.unpack_from('<BI', data, 0)
+            if version != STATS_VERSION:
+                return
+            offset = 5
+            for _ in range(table_count):
+                table_name, offset = self._decode_name(data, offset)
+                n_r, total_bytes, size, mtime_ns = struct.unpack_from('<QQQq', data, offset)
+                offset += 32
+                histograms, offset = self._decode_histograms(data, offset)
+                extremes = {}
+                extreme_count = struct.unpack_from('<H', data, offset)[0]
+                offset += 2
+                for _ in range(extreme_count):
+                    column_name, offset = self._decode_name(data, offset)
+                    low, offset = self._decode_value(data, offset)
+                    high, offset = self._decode_value(data, offset)
+                    extremes[column_name] = [low, high]
+                mode, column_count = struct.unpack_from('<BH', data, offset)
+                offset += 3
+
+                if mode == SKETCH_MODE:
+                    sketches = {}
+                    offsets = {}
+                    for _ in range(column_count):
+                        column_name, offset = self._decode_name(data, offset)
+                        offsets[column_name] = struct.unpack_from('<d', data, offset)[0]
+                        sketches[column_name], offset = HyperLogLog.deserialize(data, offset + 8)
+                    if fingerprints.get(table_name) == (size, mtime_ns):
+                        self.tables[table_name] = TableStats(
+                            n_r, total_bytes, None, (size, mtime_ns), sketches, offsets, histograms,
+                            extremes=extremes
+                        )
+                    continue
+
+                value_counts = {}
+                capped = {}
+                for _ in range(column_count):
+                    column_name, offset = self._decode_name(data, offset)
+                    value_count = struct.unpack_from('<I', data, offset)[0]
+                    offset += 4
+                    counts = Counter()
+                    for _ in range(value_count):
+                        value, offset = self._decode_value(data, offset)
+                        counts[value] = struct.unpack_from('<Q', data, offset)[0]
+                        offset += 8
+                    value_counts[column_name] = counts
+                capped_count = struct.unpack_from('<H', data, offset)[0]
+                offset += 2
+                for _ in range(capped_count):
+                    column_name, offset = self._decode_name(data, offset)
+                    capped[column_name], offset = HyperLogLog.deserialize(data, offset)
+
+                if fingerprints.get(table_name) == (size, mtime_ns):
+                    self.tables[table_name] = TableStats(
+                        n_r, total_bytes, value_counts, (size, mtime_ns), histograms=histograms, capped=capped,
+                        extremes=extremes
+                    )
+        except (struct.error, UnicodeDecodeError, IndexError, ValueError):
+            # A damaged catalog only costs a re-analyze
+            self.tables = {}
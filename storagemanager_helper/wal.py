@@ -0,0 +1,130 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+WAL_FILENAME = 'wal.log'
+
+RECORD_HEADER = struct.Struct('<II')   # body length, crc32 of body
+PAGE_RECORD = 1
+COMMIT_RECORD = 2
+
+
+class WriteAheadLog:
+    """Redo log of physical page after-images.
+
+    A write operation logs the new image of every page it changes under one
+    transaction id and then commits. commit() returns once the commit record
+    is on disk; concurrent committers share a single fsync (group commit).
+    Only after that are the pages written in place, so replay() only ever
+    needs to redo committed transactions.
+    """
+
+    def __init__(self, base_path='data', group_commit_delay=0.0):
+        self.path = os.path.join(base_path, WAL_FILENAME)
+        self.group_commit_delay = group_commit_delay
+        self._file = open(self.path, 'ab')
+        self._mutex = threading.Lock()
+        self._flushed = threading.Condition(self._mutex)
+        self._next_txn = 1
+        self._appended = self._file.tell()
+        self._durable = self._appended
+        self._flushing = False
+
+    def _append(self, body):
+        self._file.write(RECORD_HEADER.pack(len(body), zlib.crc32(body)))
+        self._file.write(body)
+        self._appended = self._file.tell()
+
+    def begin(self):
+        with self._mutex:
+            txn_id = self._next_txn
+            self._next_txn += 1
+            return txn_id
+
+    def log_page(self, txn_id, table_name, page_id, page_bytes):
+        table_bytes = table_name.encode('utf-8')
+        body = struct.pack('<BQH', PAGE_RECORD, txn_id, len(table_bytes)) + table_bytes
+        body += struct.pack('<I', page_id) + page_bytes
+        with self._mutex:
+            self._append(body)
+
+    def commit(self, txn_id):
+        with self._flushed:
+            self._append(struct.pack('<BQ', COMMIT_RECORD, txn_id))
+            commit_lsn = self._appended
+
+            while self._durable < commit_lsn:
+                if self._flushing:
+                    # Someone else is fsyncing; our record rides the next group
+                    self._flushed.wait()
+                    continue
+
+                self._flushing = True
+                try:
+                    if self.group_commit_delay:
+                        # Give concurrent writers a moment to join this group
+                        self._mutex.release()
+                        try:
+                            time.sleep(self.group_commit_delay)
+                        finally:
+                            self._mutex.acquire()
+                    self._file.flush()
+                    target = self._appended
+                    self._mutex.release()
+                    try:
+                        os.fsync(self._file.fileno())
+                    finally:
+                        self._mutex.acquire()
+                    self._durable = max(self._durable, target)
+                finally:
+                    self._flushing = False
+                    self._flushed.notify_all()
+
+    def size(self):
+        with self._mutex:
+            return self._appended
+
+    def replay(self):
+        """Return [(table_name, page_id, page_bytes)] of committed
+        transactions in log order. A torn or corrupt tail ends the log."""
+        with self._mutex:
+            self._file.flush()
+            with open(self.path, 'rb') as f:
+                data = f.read()
+
+        pending = {}
+        committed = []
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, crc = RECORD_HEADER.unpack_from(data, offset)
+            body = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            offset += RECORD_HEADER.size + length
+
+            kind, txn_id = struct.unpack_from('<BQ', body, 0)
+            if kind == PAGE_RECORD:
+                table_len = struct.unpack_from('<H', body, 9)[0]
+                table_name = body[11:11 + table_len].decode('utf-8')
+                page_id = struct.unpack_from('<I', body, 11 + table_len)[0]
+                page_bytes = body[15 + table_len:]
+                pending.setdefault(txn_id, []).append((table_name, page_id, page_bytes))
+            elif kind == COMMIT_RECORD:
+                committed.extend(pending.pop(txn_id, []))
+
+        return committed
+
+    def reset(self):
+        """Drop every record; only call once all logged pages are on disk."""
+        with self._mutex:
+            self._file.flush()
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+            self._appended = self._durable = 0
+
+    def close(self):
+        with self._mutex:
+            self._file.close()
@@ -0,0 +1,213 @@
+import os
+import struct
+import threading
+from storagemanager_helper.metrics import count
+
+ZONE_MAP_DIRNAME = 'zonemaps'
+ZONE_MAP_MAGIC = b'ZMP1'
+
+# Operations a page's [min, max] can rule out
+PRUNABLE_OPERATIONS = ('=', '<', '<=', '>', '>=')
+
+
+def _may_match(low, high, operation, operand):
+    try:
+        if operation == '=':
+            return low <= operand <= high
+        if operation == '<':
+            return low < operand
+        if operation == '<=':
+            return low <= operand
+        if operation == '>':
+            return high > operand
+        if operation == '>=':
+            return high >= operand
+    except TypeError:
+        # Not comparable here; the row check decides (and raises)
+        pass
+    return True
+
+
+class ZoneMap:
+    """Per-page [min, max] of some columns of a table. zones[page_id] is
+    None for a page no row was added to, else one [min, max] pair per
+    column. Bounds only widen: values deleted or updated away keep them
+    wide until the zone map is rebuilt."""
+
+    def __init__(self, table, columns, types, zones=None):
+        self.table = table
+        self.columns = tuple(columns)
+        self.types = tuple(types)
+        self.zones = zones if zones is not None else []
+        self._mutex = threading.Lock()
+
+    def add(self, page_id, record):
+        values = [record[column] for column in self.columns]
+        with self._mutex:
+            if len(self.zones) <= page_id:
+                self.zones.extend([None] * (page_id + 1 - len(self.zones)))
+            zone = self.zones[page_id]
+            if zone is None:
+                self.zones[page_id] = [[value, value] for value in values]
+                return
+            for bounds, value in zip(zone, values):
+                if value < bounds[0]:
+                    bounds[0] = value
+                elif value > bounds[1]:
+                    bounds[1] = value
+
+    def candidate_pages(self, conditions, page_count):
+        """Page ids below page_count whose zones every condition on a
+        mapped column can match, or None when no condition is prunable.
+        conditions are (column, operation, operand) with the operand
+        already coerced to the column's type."""
+        prunable = [(self.columns.index(column), operation, operand)
+                    for column, operation, operand in conditions
+                    if column in self.columns and operation in PRUNABLE_OPERATIONS]
+        if not prunable:
+            return None
+
+        pages = []
+        zones = self.zones
+        for page_id in range(min(page_count, len(zones))):
+            zone = zones[page_id]
+            if zone is None:
+                continue
+            if all(_may_match(zone[i][0], zone[i][1], operation, operand) for i, operation, operand in prunable):
+                pages.append(page_id)
+        return pages
+
+    def cleared(self):
+        """Empty zone map over the same columns, to rebuild into."""
+        return ZoneMap(self.table, self.columns, self.types)
+
+    def _pack_value(self, value_type, value):
+        if value_type == 'int':
+            return struct.pack('<i', value)
+        if value_type == 'float':
+            return struct.pack('<d', value)
+        value_bytes = value.encode('utf-8')
+        return struct.pack('<H', len(value_bytes)) + value_bytes
+
+    def _unpack_value(self, value_type, data, offset):
+        if value_type == 'int':
+            return struct.unpack_from('<i', data, offset)[0], offset + 4
+        if value_type == 'float':
+            return struct.unpack_from('<d', data, offset)[0], offset + 8
+        length = struct.unpack_from('<H', data, offset)[0]
+        offset += 2
+        return data[offset:offset + length].decode('utf-8'), offset + length
+
+    def serialize(self):
+        with self._mutex:
+            zones = [None if zone is None else [tuple(bounds) for bounds in zone] for zone in self.zones]
+        result = bytearray(ZONE_MAP_MAGIC)
+        result += _encode_name(self.table)
+        result += struct.pack('<H', len(self.columns))
+        for column, value_type in zip(self.columns, self.types):
+            result += _encode_name(column) + _encode_name(value_type)
+        result += struct.pack('<I', len(zones))
+        for zone in zones:
+            if zone is None:
+                result += struct.pack('<B', 0)
+                continue
+            result += struct.pack('<B', 1)
+            for value_type, (low, high) in zip(self.types, zone):
+                result += self._pack_value(value_type, low) + self._pack_value(value_type, high)
+        return bytes(result)
+
+    @classmethod
+    def deserialize(cls, data):
+        if data[:4] != ZONE_MAP_MAGIC:
+            raise ValueError("not a zone map file")
+        table, offset = _decode_name(data, 4)
+        column_count = struct.unpack_from('<H', data, offset)[0]
+        offset += 2
+        columns, types = [], []
+        for _ in range(column_count):
+            column, offset = _decode_name(data, offset)
+            value_type, offset = _decode_name(data, offset)
+            columns.append(column)
+            types.append(value_type)
+
+        zone_map = cls(table, columns, types)
+        page_count = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        for _ in range(page_count):
+            present = data[offset]
+            offset += 1
+            if not present:
+                zone_map.zones.append(None)
+                continue
+            zone = []
+            for value_type in types:
+                low, offset = zone_map._unpack_value(value_type, data, offset)
+                high, offset = zone_map._unpack_value(value_type, data, offset)
+                zone.append([low, high])
+            zone_map.zones.append(zone)
+        return zone_map
+
+
+def _encode_name(name):
+    name_bytes = name.encode('utf-8')
+    return struct.pack('<H', len(name_bytes)) + name_bytes
+
+
+def _decode_name(data, offset):
+    length = struct.unpack_from('<H', data, offset)[0]
+    offset += 2
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+
+class ZoneMapManager:
+    """Zone map of every table that has one, one sidecar file each under
+    zonemaps/, all loaded at startup."""
+
+    def __init__(self, base_path='data'):
+        self.zone_map_path = os.path.join(base_path, ZONE_MAP_DIRNAME)
+        os.makedirs(self.zone_map_path, exist_ok=True)
+        self.zone_maps = {}
+        self._mutex = threading.Lock()
+
+        for filename in os.listdir(self.zone_map_path):
+            if filename.endswith('.zmap'):
+                with open(os.path.join(self.zone_map_path, filename), 'rb') as f:
+                    zone_map = ZoneMap.deserialize(f.read())
+                self.zone_maps[zone_map.table] = zone_map
+
+    def _get_filename(self, table_name):
+        return os.path.join(self.zone_map_path, f"{table_name}.zmap")
+
+    def get_zone_map(self, table_name):
+        return self.zone_maps.get(table_name)
+
+    def put_zone_map(self, zone_map):
+        """Start using zone_map for its table, replacing any there;
+        save_zone_map() persists it."""
+        with self._mutex:
+            self.zone_maps[zone_map.table] = zone_map
+
+    def add(self, table_name, page_id, record):
+        zone_map = self.zone_maps.get(table_name)
+        if zone_map is not None:
+            zone_map.add(page_id, record)
+
+    def save_zone_map(self, table_name):
+        zone_map = self.zone_maps.get(table_name)
+        if zone_map is None:
+            return False
+        data = zone_map.serialize()
+        path = self._get_filename(table_name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        count('bytes_written', len(data))
+        return True
+
+    def drop_zone_map(self, table_name):
+        with self._mutex:
+            self.zone_maps.pop(table_name, None)
+        path = self._get_filename(table_name)
+        if os.path.exists(path):
+            os.remove(path)
+        return True
@@ -0,0 +1,13 @@
+class DataAggregation:
+    def __init__(self, table, aggregates, conditions=None, group_by=None):
+        """
+        aggregates: list of (function, column) pairs, function one of COUNT,
+            SUM, MIN, MAX, AVG; column '*' only with COUNT.
+        conditions: Condition list the rows must match.
+        group_by: a column or list of columns, None for a single group.
+        """
+
+        self.table = table
+        self.aggregates = aggregates
+        self.conditions = conditions or []
+        self.group_by = group_by
@@ -0,0 +1,26 @@
+class DataJoin:
+    def __init__(self, left, right, left_column, right_column, columns=None,
+                 left_conditions=None, right_conditions=None, method=None):
+        """
+        left: a table name, or another DataJoin whose rows are joined on
+            (so Student, Attends and Course join as two nested DataJoins).
+        right: a table name.
+        left_column, right_column: the columns whose values must be equal;
+            left_column is 'Table.Column' when left is a DataJoin.
+        columns: 'Table.Column' names each row is projected to, None or
+            '*' for every column of every table.
+        left_conditions, right_conditions: Condition lists on the plain
+            column names of the left (when a table) and right tables.
+        method: 'index_nested_loop', 'hash' or 'sort_merge'; None lets the
+            storage manager choose.
+        """
+
+        self.left = left
+        self.right = right
+        self.left_column = left_column
+        self.right_column = right_column
+        self.columns = columns
+        self.left_conditions = left_conditions or []
+        self.right_conditions = right_conditions or []
+        self.method = method
+
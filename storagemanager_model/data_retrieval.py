@@ -1,7 +1,15 @@
 class DataRetrieval:
-    def __init__(self, table, column, conditions=None):
+    def __init__(self, table, column, conditions=None, order_by=None, descending=False, limit=None):
+        """
+        order_by: column the rows are returned sorted by (NULL first, or
+            last with descending); None keeps heap or index order.
+        limit: at most this many rows, None for all.
+        """
+
         self.table = table
         self.column = column
         self.conditions = conditions or []
+        self.order_by = order_by
+        self.descending = descending
+        self.limit = limit
 
-        
\ No newline at end of file
@@ -1,8 +1,12 @@
+from storagemanager_helper.locking import ReadWriteLock
+
 class HashIndexEntry:
-    def __init__(self, key_value, page_id, slot_id):
+    def __init__(self, key_value, page_id, slot_id, included=()):
         self.key_value = key_value  
         self.page_id = page_id      
         self.slot_id = slot_id      
+        # Values of a covering index's included columns, in index order
+        self.included = included      
     
 
 class BPlusTreeNode:
@@ -13,7 +17,9 @@ class BPlusTreeNode:
         self.children = []  
         self.values = []  
         self.next_leaf = None 
+        self.prev_leaf = None
         self.parent = None
+        self.latch = ReadWriteLock()
     
     def is_full(self):
         if self.is_leaf:
@@ -0,0 +1,46 @@
+class QueryPlan:
+    def __init__(self, table, access_path, index_column, candidates, estimated_rows, estimated_pages, actual=None):
+        """
+        access_path: 'hash_index', 'btree_index', 'hash_index_only',
+            'btree_index_only', 'full_scan' or 'parallel_full_scan'.
+        index_column: column of the index used, None for a scan.
+        candidates: every index on the table, as dicts with type, column,
+            usable, reason, include, covering and (when usable)
+            estimated_rows / estimated_pages.
+        estimated_rows, estimated_pages: from get_stats and estimate_selectivity.
+        actual: with analyze, a dict with access_path, pages_read,
+            rows_examined, rows_returned, index_entries_scanned, elapsed_ms.
+        """
+
+        self.table = table
+        self.access_path = access_path
+        self.index_column = index_column
+        self.candidates = candidates
+        self.estimated_rows = estimated_rows
+        self.estimated_pages = estimated_pages
+        self.actual = actual
+
+    def __str__(self):
+        target = f" on {self.index_column}" if self.index_column else ""
+        lines = [
+            f"{self.access_path}{target} of {self.table}"
+            f"  (estimated rows={self.estimated_rows:.0f} pages={self.estimated_pages})"
+        ]
+        if self.actual is not None:
+            actual = self.actual
+            lines.append(
+                f"  actual: {actual['access_path']} rows={actual['rows_returned']}"
+                f" examined={actual['rows_examined']} pages={actual['pages_read']}"
+                f" time={actual['elapsed_ms']:.3f}ms"
+            )
+        for candidate in self.candidates:
+            status = "usable" if candidate['usable'] else candidate['reason']
+            if candidate['usable'] and candidate['reason']:
+                status += f" ({candidate['reason']})"
+            target = candidate['column']
+            if candidate.get('include'):
+                target += f" include ({', '.join(candidate['include'])})"
+            if candidate.get('covering'):
+                status += ", covering"
+            lines.append(f"  candidate {candidate['type']} index on {target}: {status}")
+        return "\n".join(lines)
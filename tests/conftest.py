@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from StorageManager import StorageManager
+from storagemanager_helper import init
+from storagemanager_helper.schema_manager import SchemaManager
+from storagemanager_model.data_write import DataWrite
+
+
+def student(student_id, gpa=3.0):
+    """DataWrite inserting one Student row."""
+    return DataWrite("Student", None, [], {"StudentID": student_id, "FullName": f"S{student_id}", "GPA": gpa})
+
+
+def course(course_id, year=2024):
+    """DataWrite inserting one Course row."""
+    return DataWrite("Course", None, [], {"CourseID": course_id, "Year": year,
+                                          "CourseName": "C", "CourseDescription": "D"})
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """make_db(students=..., courses=..., attends=...) -> base path of a
+    fresh database filled with init.py's generators (StudentID and
+    CourseID run from 1 up)."""
+    def make(students=200, courses=20, attends=0, seed=0):
+        base_path = str(tmp_path / "data")
+        os.makedirs(base_path, exist_ok=True)
+        rng = random.Random(seed)
+        schemas = init.default_schemas()
+
+        manager = SchemaManager(base_path)
+        for table_name, schema in schemas.items():
+            manager.add_table_schema(table_name, schema)
+        manager.save_schemas()
+
+        rows = {
+            "Student": init.student_rows(students, rng),
+            "Course": init.course_rows(courses, rng),
+            "Attends": init.attends_rows(attends, students, courses, rng),
+        }
+        for table_name, records in rows.items():
+            init.write_with_pages(table_name, schemas[table_name], list(records), base_path)
+        return base_path
+    return make
+
+
+@pytest.fixture
+def open_sm():
+    """open_sm(base_path, **options) -> StorageManager, closed after the test."""
+    opened = []
+
+    def open_(base_path, **options):
+        sm = StorageManager(base_path, **options)
+        opened.append(sm)
+        return sm
+    yield open_
+    for sm in opened:
+        try:
+            sm.close()
+        except Exception:
+            pass
+
+
+@pytest.fixture
+def make_sm(make_db, open_sm):
+    """make_sm(students=..., courses=..., attends=..., **options) ->
+    StorageManager over a fresh make_db database."""
+    def make(students=200, courses=20, attends=0, seed=0, **options):
+        return open_sm(make_db(students, courses, attends, seed), **options)
+    return make
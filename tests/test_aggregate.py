@@ -0,0 +1,84 @@
+import pytest
+
+from storagemanager_helper.predicate import match_all
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_aggregation import DataAggregation
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def reference(rows, aggregates, conditions=(), group_by=()):
+    """aggregate_block computed over read_block rows."""
+    groups = {}
+    for row in rows:
+        if match_all(row, conditions):
+            groups.setdefault(tuple(row[column] for column in group_by), []).append(row)
+    if not group_by and not groups:
+        groups[()] = []
+
+    results = []
+    for key in sorted(groups):
+        result = dict(zip(group_by, key))
+        for function, column in aggregates:
+            values = [row[column] for row in groups[key]] if column != '*' else groups[key]
+            if function == 'COUNT':
+                value = len(values)
+            elif not values:
+                value = None
+            elif function == 'AVG':
+                value = sum(values) / len(values)
+            else:
+                value = {'SUM': sum, 'MIN': min, 'MAX': max}[function](values)
+            result[f"{function}({column})"] = value
+        results.append(result)
+    return results
+
+
+def check(sm, table, aggregates, conditions=(), group_by=None):
+    rows = sm.read_block(DataRetrieval(table, "*", []))
+    columns = [group_by] if isinstance(group_by, str) else group_by or []
+    expected = reference(rows, aggregates, conditions, columns)
+    results = sm.aggregate_block(DataAggregation(table, aggregates, list(conditions), group_by))
+    assert len(results) == len(expected)
+    for result, row in zip(results, expected):
+        assert result == pytest.approx(row)
+
+
+ALL = [('COUNT', '*'), ('COUNT', 'GPA'), ('SUM', 'GPA'), ('MIN', 'GPA'), ('MAX', 'GPA'), ('AVG', 'GPA')]
+
+
+@pytest.mark.parametrize("parallel_workers", [0, 2])
+@pytest.mark.parametrize("conditions", [
+    [],
+    [Condition("GPA", ">=", 3.0)],
+    [Condition("StudentID", ">", 500), Condition("StudentID", "<=", 2500)],
+    [Condition("StudentID", "<", 0)],
+])
+def test_scans_match_a_full_scan(make_sm, parallel_workers, conditions):
+    sm = make_sm(students=3000, parallel_workers=parallel_workers)
+    check(sm, "Student", ALL, conditions)
+
+
+@pytest.mark.parametrize("group_by", ["Year", ["Year", "CourseName"]])
+def test_groups_match_a_full_scan(make_sm, group_by):
+    sm = make_sm(courses=1000)
+    aggregates = [('COUNT', '*'), ('MIN', 'CourseID'), ('MAX', 'CourseID'), ('SUM', 'CourseID')]
+    check(sm, "Course", aggregates, [Condition("CourseID", ">", 100)], group_by)
+
+
+def test_index_answers_match_a_full_scan(make_sm):
+    sm = make_sm(students=3000)
+    sm._set_index("Student", "StudentID", "hash")
+    sm._set_index("Student", "GPA", "btree")
+    sm.delete_block(DataDeletion("Student", [Condition("GPA", "<", 2.1)]))
+    sm.delete_block(DataDeletion("Student", [Condition("GPA", ">", 3.9)]))
+
+    for aggregates, conditions, access_path in [
+        ([('COUNT', '*'), ('MIN', 'GPA'), ('MAX', 'GPA')], [], 'metadata'),
+        ([('COUNT', '*')], [Condition("StudentID", "=", 1500)], 'hash_index'),
+        ([('COUNT', '*')], [Condition("GPA", ">=", 3.5)], 'btree_index'),
+    ]:
+        access = {}
+        sm._aggregate_block(DataAggregation("Student", aggregates, conditions), access)
+        assert access['access_path'] == access_path
+        check(sm, "Student", aggregates, conditions)
@@ -0,0 +1,83 @@
+import asyncio
+
+from AsyncStorageManager import AsyncStorageManager
+from conftest import student
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def run(coro, timeout=20):
+    async def bounded():
+        return await asyncio.wait_for(coro, timeout)
+    return asyncio.run(bounded())
+
+
+def test_scan_matches_read_block(make_sm):
+    sm = make_sm(students=1000)
+    asm = AsyncStorageManager(sm, readahead=3)
+    dr = DataRetrieval("Student", ["StudentID", "GPA"], [Condition("GPA", ">", 3.0)])
+
+    async def scan():
+        return [row async for row in asm.scan(dr)]
+    assert run(scan()) == sm.read_block(dr)
+
+
+def test_write_inside_scan_loop_completes(make_sm):
+    sm = make_sm(students=1000)
+    asm = AsyncStorageManager(sm, readahead=2)
+
+    async def scan_and_write():
+        seen = 0
+        async for _ in asm.scan(DataRetrieval("Student", "*", [])):
+            seen += 1
+            if seen == 1:
+                await asm.write_block(student(5001))
+        return seen
+    run(scan_and_write())
+    assert len(sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", 5001)]))) == 1
+
+
+def test_slow_consumer_does_not_block_writers(make_sm):
+    sm = make_sm(students=1000)
+    asm = AsyncStorageManager(sm)
+
+    async def main():
+        rows = asm.scan(DataRetrieval("Student", "*", []))
+        await rows.__anext__()
+        # The scan is parked mid-page; a write must not wait for it
+        await asyncio.wait_for(asm.write_block(student(5002)), 5)
+        await rows.aclose()
+    run(main())
+
+
+def test_reads_do_not_starve_writes(make_sm):
+    sm = make_sm(students=300)
+    asm = AsyncStorageManager(sm)
+    dr = DataRetrieval("Student", "*", [])
+
+    async def main():
+        done = asyncio.Event()
+
+        async def reader():
+            while not done.is_set():
+                await asm.read_block(dr)
+
+        readers = [asyncio.ensure_future(reader()) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(asm.write_block(student(5003)), 5)
+        done.set()
+        await asyncio.gather(*readers)
+    run(main())
+    assert len(sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", 5003)]))) == 1
+
+
+def test_concurrent_identical_reads_get_private_rows(make_sm):
+    sm = make_sm()
+    asm = AsyncStorageManager(sm)
+    dr = DataRetrieval("Student", "*", [Condition("StudentID", "<", 5)])
+
+    async def main():
+        first, second = await asyncio.gather(asm.read_block(dr), asm.read_block(dr))
+        first[0]["FullName"] = "changed"
+        return second
+    assert run(main()) == sm.read_block(dr)
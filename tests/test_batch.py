@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from conftest import course, student
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def run_threads(targets, timeout=20):
+    errors = []
+
+    def guard(fn):
+        try:
+            fn()
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=guard, args=(fn,), daemon=True) for fn in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout)
+    assert not any(thread.is_alive() for thread in threads), "batches deadlocked"
+    assert not errors, errors
+
+
+def test_declared_batches_in_opposite_order_finish(make_sm):
+    sm = make_sm()
+    barrier = threading.Barrier(2)
+
+    def batch_a():
+        with sm.batch(tables=["Student", "Course"]) as b:
+            barrier.wait(5)
+            b.write_block(student(5001))
+            b.write_block(course(501))
+
+    def batch_b():
+        barrier.wait(5)
+        with sm.batch(tables=["Course", "Student"]) as b:
+            b.write_block(course(502))
+            b.write_block(student(5002))
+
+    run_threads([batch_a, batch_b])
+    ids = {r["StudentID"] for r in sm.read_block(DataRetrieval("Student", ["StudentID"], [Condition("StudentID", ">", 5000)]))}
+    assert ids == {5001, 5002}
+
+
+def test_batches_and_checkpoint_finish(make_sm):
+    sm = make_sm(wal=True)
+
+    def writer(offset):
+        def run():
+            for i in range(20):
+                with sm.batch(tables=["Student", "Course"]) as b:
+                    b.write_block(course(1000 + offset + i))
+                    b.write_block(student(10000 + offset + i))
+        return run
+
+    def checkpointer():
+        for _ in range(20):
+            sm.checkpoint()
+
+    run_threads([writer(0), writer(100), checkpointer])
+    assert len(sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", ">=", 10000)]))) == 40
+
+
+def test_out_of_order_touch_is_rejected(make_sm):
+    sm = make_sm()
+    with sm.batch() as b:
+        b.write_block(student(5001))
+        with pytest.raises(ValueError):
+            b.write_block(course(501))
+        b.rollback()
+    with sm.batch(tables=["Student"]) as b:
+        with pytest.raises(ValueError):
+            b.write_block(course(501))
+        b.rollback()
+    # Ascending touches still lock lazily
+    with sm.batch() as b:
+        b.write_block(course(501))
+        b.write_block(student(5001))
+    assert len(sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", 5001)]))) == 1
+
+
+def test_rollback_discards_everything(make_sm):
+    sm = make_sm()
+    before = sm.read_block(DataRetrieval("Student", "*", []))
+    with pytest.raises(RuntimeError):
+        with sm.batch(tables=["Student"]) as b:
+            b.write_block(student(9001))
+            b.write_block(DataWrite("Student", ["GPA"], [Condition("StudentID", "=", 1)], {"GPA": 1.0}))
+            raise RuntimeError("abort")
+    assert sm.read_block(DataRetrieval("Student", "*", [])) == before
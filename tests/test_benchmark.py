@@ -0,0 +1,56 @@
+import json
+import os
+import random
+
+import Benchmark
+from storagemanager_helper import init
+from storagemanager_helper.data_generator import DataGenerator
+from storagemanager_helper.schema import Schema
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def test_generated_database_holds_init_rows(tmp_path, open_sm):
+    base_path = str(tmp_path / "data")
+    DataGenerator(7).create_database(base_path, {"Student": 600, "Course": 30, "Attends": 900})
+    assert sorted(os.listdir(base_path)) == ["Attends.dat", "Course.dat", "Student.dat", "schema.dat"]
+
+    sm = open_sm(base_path)
+    # Student is generated first, so it draws the seed's first values
+    assert sm.read_block(DataRetrieval("Student", "*", [])) == list(init.student_rows(600, random.Random(7)))
+    assert len(sm.read_block(DataRetrieval("Course", "*", []))) == 30
+    attends = sm.read_block(DataRetrieval("Attends", "*", []))
+    assert len(attends) == 900
+    assert all(1 <= row["StudentID"] <= 600 and 1 <= row["CourseID"] <= 30 for row in attends)
+
+
+def test_other_schemas_get_a_sequential_key(tmp_path, open_sm):
+    schema = Schema()
+    schema.add_attribute("Code", "char", 6)
+    schema.add_attribute("ItemID", "int", 4)
+    schema.add_attribute("Price", "float", 4)
+    base_path = str(tmp_path / "data")
+    DataGenerator(1).create_database(base_path, {"Item": 500}, schemas={"Item": schema})
+
+    rows = open_sm(base_path).read_block(DataRetrieval("Item", "*", []))
+    assert [row["ItemID"] for row in rows] == list(range(1, 501))
+    assert all(len(row["Code"]) == 6 for row in rows)
+
+
+def test_benchmark_writes_a_report_and_flags_regressions(tmp_path):
+    output = str(tmp_path / "run.json")
+    argv = ["--rows", "300", "--ops", "5", "--write-ops", "2", "--base-path", str(tmp_path / "bench"), "--output", output]
+    assert Benchmark.main(argv) == 0
+    with open(output) as f:
+        report = json.load(f)
+    assert set(report["results"]) == {"load", *Benchmark.OPERATIONS}
+    assert report["results"]["point_lookup"]["count"] == 5
+    assert not os.path.exists(tmp_path / "bench")
+
+    # A baseline ten times faster than this run makes every operation a regression
+    for result in report["results"].values():
+        if "p50_ms" in result:
+            result["p50_ms"] /= 10
+    baseline = str(tmp_path / "baseline.json")
+    with open(baseline, "w") as f:
+        json.dump(report, f)
+    assert Benchmark.main(argv[:-2] + ["--operations", "point_lookup,insert", "--compare", baseline]) == 1
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from conftest import student
+from storagemanager_helper.predicate import match_all
+from storagemanager_helper.slotted_page import PAGE_SIZE
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def full_scan(sm, table="Student"):
+    return sm.read_block(DataRetrieval(table, "*", []))
+
+
+def page_count(sm, table="Student"):
+    return os.path.getsize(sm._get_table_file_path(table)) // PAGE_SIZE
+
+
+def canon(rows):
+    return sorted(map(repr, rows))
+
+
+def test_cluster_sorts_rows_and_repoints_indexes(make_sm):
+    sm = make_sm(students=2000)
+    sm._set_index("Student", "StudentID", "hash", unique=True)
+    sm._set_index("Student", "GPA", "btree", include=["FullName"])
+    sm._set_index("Student", ["GPA", "StudentID"], "btree")
+    before = full_scan(sm)
+
+    assert sm.cluster("Student", "GPA") == page_count(sm)
+    after = full_scan(sm)
+    assert canon(after) == canon(before)
+    assert [row["GPA"] for row in after] == sorted(row["GPA"] for row in before)
+
+    for conditions in ([Condition("StudentID", "=", 1234)],
+                       [Condition("GPA", ">=", 3.9)],
+                       [Condition("GPA", "=", 3.0), Condition("StudentID", "<", 1000)]):
+        rows = sm.read_block(DataRetrieval("Student", "*", conditions))
+        assert canon(rows) == canon(row for row in after if match_all(row, conditions))
+    covered = sm.read_block(DataRetrieval("Student", ["GPA", "FullName"], [Condition("GPA", "<", 2.1)]))
+    assert canon(covered) == canon({"GPA": row["GPA"], "FullName": row["FullName"]} for row in after if row["GPA"] < 2.1)
+    with pytest.raises(ValueError):
+        sm.write_block(student(1234))
+
+
+def test_composite_cluster_key_survives_reopen(make_sm, open_sm):
+    sm = make_sm(courses=500)
+    sm.set_cluster_key("Course", ["Year", "CourseID"])
+    sm.cluster("Course")
+    rows = full_scan(sm, "Course")
+    assert [(row["Year"], row["CourseID"]) for row in rows] == sorted((row["Year"], row["CourseID"]) for row in rows)
+    sm.close()
+
+    reopened = open_sm(sm.base_path)
+    assert reopened.cluster_catalog.get("Course").column == "Year+CourseID"
+    assert full_scan(reopened, "Course") == rows
+
+
+@pytest.mark.parametrize("threshold", [None, 0.25])
+def test_writes_recluster_past_the_threshold(make_sm, threshold):
+    sm = make_sm(students=1000)
+    sm.set_cluster_key("Student", "GPA", recluster_threshold=threshold)
+    clustered_pages = sm.cluster("Student")
+
+    reclustered = False
+    for i in range(1500):
+        pages = page_count(sm)
+        appended = (pages - clustered_pages) / pages
+        sm.write_block(student(5000 + i, gpa=2.0 + i % 200 / 100))
+        if sm.cluster_catalog.get("Student").clustered_pages != clustered_pages:
+            reclustered = True
+            break
+        # Below the threshold, inserts only append
+        assert threshold is None or appended <= threshold
+
+    rows = full_scan(sm)
+    gpas = [row["GPA"] for row in rows]
+    if threshold is None:
+        assert not reclustered
+        assert gpas != sorted(gpas)
+    else:
+        assert reclustered
+        assert gpas == sorted(gpas)
+        assert sm.cluster_catalog.get("Student").clustered_pages == page_count(sm)
+        assert len(rows) == 1000 + i + 1
@@ -0,0 +1,72 @@
+import pytest
+
+from conftest import course
+from storagemanager_helper.predicate import match_all
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def test_btree_bounds_seek_on_the_key_prefix(make_sm):
+    sm = make_sm(students=0, courses=0)
+    columns = ("Year", "CourseID")
+
+    bounds, used = sm._btree_bounds(columns, [Condition("CourseID", ">", 5), Condition("Year", "=", 2024)])
+    assert bounds == {'lower': (2024, 5), 'upper': (2024,), 'lower_inclusive': False, 'upper_inclusive': True}
+    assert used == [1, 0]
+
+    bounds, used = sm._btree_bounds(columns, [Condition("Year", ">=", 2024), Condition("Year", "<", 2025)])
+    assert bounds == {'lower': (2024,), 'upper': (2025,), 'lower_inclusive': True, 'upper_inclusive': False}
+    assert used == [0, 1]
+
+    # Only a range on the leading column narrows the seek; CourseID is checked per row
+    bounds, used = sm._btree_bounds(columns, [Condition("Year", "<=", 2024), Condition("CourseID", "=", 3)])
+    assert bounds == {'lower': None, 'upper': (2024,), 'lower_inclusive': True, 'upper_inclusive': True}
+    assert used == [0]
+
+    assert sm._btree_bounds(columns, [Condition("CourseID", "=", 3)]) == (None, [])
+    bounds, _ = sm._btree_bounds(("Year",), [Condition("Year", ">", 2023), Condition("Year", "<=", 2025)])
+    assert (bounds['lower'], bounds['upper']) == (2023, 2025)
+
+
+@pytest.fixture
+def sm(make_sm):
+    sm = make_sm(courses=2000)
+    sm._set_index("Course", ["Year", "CourseID"], "btree")
+    return sm
+
+
+QUERIES = [
+    [Condition("Year", "=", 2024)],
+    [Condition("Year", "=", 2024), Condition("CourseID", "<", 500)],
+    [Condition("Year", "=", 2023), Condition("CourseID", ">=", 1000), Condition("CourseID", "<=", 1200)],
+    [Condition("Year", ">", 2023), Condition("CourseName", "=", "Data Mining")],
+    [Condition("CourseID", "=", 77), Condition("Year", "=", 2025)],
+]
+
+
+def check_queries(sm):
+    full_scan = sm.read_block(DataRetrieval("Course", "*", []))
+    for conditions in QUERIES:
+        plan = sm.explain(DataRetrieval("Course", "*", conditions), analyze=True)
+        assert plan.actual["access_path"] == "btree_index"
+        assert plan.index_column == "Year+CourseID"
+        expected = [row for row in full_scan if match_all(row, conditions)]
+        rows = sm.read_block(DataRetrieval("Course", "*", conditions))
+        assert sorted(map(repr, rows)) == sorted(map(repr, expected))
+
+
+def test_composite_lookups_match_a_full_scan(sm):
+    check_queries(sm)
+
+
+def test_composite_index_follows_writes(sm, open_sm):
+    for course_id in range(3000, 3050):
+        sm.write_block(course(course_id, year=2023 + course_id % 3))
+    sm.write_block(DataWrite("Course", "Year", [Condition("CourseID", "<", 100)], 2025))
+    sm.delete_block(DataDeletion("Course", [Condition("Year", "=", 2024), Condition("CourseID", ">", 1500)]))
+    check_queries(sm)
+
+    sm.close()
+    check_queries(open_sm(sm.base_path))
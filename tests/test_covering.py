@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import student
+from storagemanager_helper.predicate import match_all, project
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def check_against_full_scan(sm, columns, conditions, access_path):
+    retrieval = DataRetrieval("Student", columns, conditions)
+    assert sm.explain(retrieval, analyze=True).actual["access_path"] == access_path
+    full_scan = sm.read_block(DataRetrieval("Student", "*", []))
+    expected = [project(row, columns) for row in full_scan if match_all(row, conditions)]
+    rows = sm.read_block(retrieval)
+    assert sorted(map(repr, rows)) == sorted(map(repr, expected))
+
+
+@pytest.mark.parametrize("index_type, condition", [
+    ("hash", Condition("StudentID", "=", 42)),
+    ("btree", Condition("StudentID", "<=", 60)),
+])
+def test_index_only_scans_follow_included_columns(make_sm, index_type, condition):
+    sm = make_sm()
+    sm._set_index("Student", "StudentID", index_type, include=["GPA"])
+    access_path = f"{index_type}_index_only"
+    columns = ["StudentID", "GPA"]
+    check_against_full_scan(sm, columns, [condition], access_path)
+    # FullName is not in the index, so the table pages are read
+    check_against_full_scan(sm, ["FullName"], [condition], f"{index_type}_index")
+
+    sm.write_block(DataWrite("Student", "GPA", [Condition("StudentID", "<=", 50)], 1.25))
+    check_against_full_scan(sm, columns, [condition], access_path)
+    sm.write_block(student(9000, gpa=2.5))
+    sm.write_block(DataWrite("Student", ["GPA"], [Condition("GPA", "=", 2.5)], {"GPA": 3.75}))
+    check_against_full_scan(sm, columns, [condition], access_path)
+    sm.delete_block(DataDeletion("Student", [Condition("StudentID", ">", 30), Condition("StudentID", "<", 40)]))
+    check_against_full_scan(sm, columns, [condition], access_path)
+    check_against_full_scan(sm, columns, [Condition("StudentID", "=", 9000)], access_path)
+
+
+def test_included_columns_survive_a_reopen_and_rebuild(make_sm, open_sm):
+    sm = make_sm()
+    sm._set_index("Student", "GPA", "btree", include=["FullName"])
+    sm.write_block(DataWrite("Student", "FullName", [Condition("StudentID", "<", 20)], "Renamed"))
+    sm.close()
+
+    reopened = open_sm(sm.base_path)
+    check_against_full_scan(reopened, ["GPA", "FullName"], [Condition("GPA", ">", 3.5)], "btree_index_only")
+    reopened._set_index("Student", "GPA", "btree")
+    check_against_full_scan(reopened, ["GPA", "FullName"], [Condition("GPA", ">", 3.5)], "btree_index_only")
+    plan = reopened.explain(DataRetrieval("Student", ["GPA", "FullName"], [Condition("GPA", ">", 3.5)]))
+    assert plan.estimated_pages == 0
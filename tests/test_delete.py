@@ -0,0 +1,43 @@
+import pytest
+
+from storagemanager_helper.slotted_page import SlottedPage
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def test_delete_records_compacts_in_one_pass():
+    page = SlottedPage()
+    records = [bytes([i]) * (i + 1) for i in range(10)]
+    for record in records:
+        page.add_record(record)
+
+    slot_map = page.delete_records([0, 3, 4, 9])
+    assert slot_map == [None, 0, 1, None, None, 2, 3, 4, 5, None]
+    kept = [records[i] for i in (1, 2, 5, 6, 7, 8)]
+    assert [page.get_record(i) for i in range(page.record_count)] == kept
+
+    reloaded = SlottedPage()
+    reloaded.load(page.serialize())
+    assert [reloaded.get_record(i) for i in range(reloaded.record_count)] == kept
+    with pytest.raises(IndexError):
+        page.delete_records([page.record_count])
+
+
+@pytest.mark.parametrize("index_type", [None, "hash", "btree"])
+def test_delete_matches_a_full_scan(make_sm, index_type):
+    sm = make_sm(students=1000)
+    if index_type is not None:
+        sm._set_index("Student", "StudentID", index_type)
+    before = sm.read_block(DataRetrieval("Student", "*", []))
+
+    conditions = [Condition("StudentID", ">", 100), Condition("StudentID", "<=", 900)]
+    deleted = sm.delete_block(DataDeletion("Student", conditions))
+    expected = [row for row in before if not 100 < row["StudentID"] <= 900]
+    assert deleted == len(before) - len(expected)
+    assert sm.read_block(DataRetrieval("Student", "*", [])) == expected
+
+    # Index entries follow the renumbered slots
+    for student_id in (1, 100, 101, 500, 900, 901, 1000):
+        rows = sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", student_id)]))
+        assert rows == [row for row in expected if row["StudentID"] == student_id]
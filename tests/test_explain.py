@@ -0,0 +1,59 @@
+import pytest
+
+from storagemanager_helper.predicate import match_all
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+@pytest.fixture
+def sm(make_sm):
+    sm = make_sm(students=1000)
+    sm._set_index("Student", "StudentID", "hash")
+    sm._set_index("Student", "GPA", "btree")
+    return sm
+
+
+@pytest.mark.parametrize("conditions, access_path", [
+    ([], "full_scan"),
+    ([Condition("StudentID", "=", 500)], "hash_index"),
+    ([Condition("StudentID", "=", 99999)], "full_scan"),
+    ([Condition("GPA", ">=", 3.8)], "btree_index"),
+    ([Condition("FullName", "=", "Alice Anderson")], "full_scan"),
+    # The remaining condition is checked on each row the GPA range fetches
+    ([Condition("StudentID", "<", 10), Condition("GPA", ">", 3.0)], "btree_index"),
+])
+def test_analyze_reports_the_access_path_read_block_takes(sm, conditions, access_path):
+    assert sm._choose_access_path("Student", conditions)[0] == access_path
+    full_scan = sm.read_block(DataRetrieval("Student", "*", []))
+    expected = [row for row in full_scan if match_all(row, conditions)]
+
+    plan = sm.explain(DataRetrieval("Student", "*", conditions), analyze=True)
+    assert plan.access_path == access_path
+    assert plan.actual["access_path"] == access_path
+    assert plan.actual["rows_returned"] == len(expected)
+    assert len(sm.read_block(DataRetrieval("Student", "*", conditions))) == len(expected)
+    if access_path == "full_scan":
+        assert plan.actual["rows_examined"] == 1000
+    else:
+        # Rows the index fetched; any condition it does not enforce filters them further
+        assert len(expected) <= plan.actual["rows_examined"] < 1000
+
+
+def test_plan_lists_every_index_with_a_reason(sm):
+    plan = sm.explain(DataRetrieval("Student", "*", [Condition("GPA", "<", 2.2)]))
+    assert plan.actual is None
+    candidates = {candidate["column"]: candidate for candidate in plan.candidates}
+    assert candidates["GPA"]["usable"]
+    assert candidates["StudentID"]["reason"] == "no condition on this column"
+    assert "btree_index on GPA of Student" in str(plan)
+
+    plan = sm.explain(DataRetrieval("Student", "*", [Condition("StudentID", ">", 10)]))
+    assert plan.access_path == "full_scan"
+    assert next(c for c in plan.candidates if c["column"] == "StudentID")["reason"] == "operation '>' not supported"
+
+
+def test_parallel_scan_is_reported(make_sm):
+    sm = make_sm(students=3000, parallel_workers=2)
+    plan = sm.explain(DataRetrieval("Student", "*", [Condition("GPA", ">", 3.9)]), analyze=True)
+    assert plan.access_path == "parallel_full_scan"
+    assert plan.actual["rows_returned"] == len(sm.read_block(DataRetrieval("Student", "*", [Condition("GPA", ">", 3.9)])))
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from conftest import student
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def test_writes_do_not_list_the_index_directory(make_sm, monkeypatch):
+    sm = make_sm()
+    sm._set_index("Student", "StudentID", "btree", unique=True)
+    sm._set_index("Student", "FullName", "hash")
+    sm.write_block(student(9000))
+
+    listings = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listings.append(path) or real_listdir(path))
+    for student_id in range(9001, 9011):
+        sm.write_block(student(student_id))
+    assert listings == []
+
+
+def test_index_cache_follows_set_and_drop(make_sm):
+    sm = make_sm()
+    lookup = DataRetrieval("Student", "*", [Condition("StudentID", "=", 7)])
+    sm.read_block(lookup)
+    assert sm.explain(lookup).access_path == "full_scan"
+
+    sm._set_index("Student", "StudentID", "btree", unique=True)
+    assert sm.explain(lookup).access_path != "full_scan"
+    with pytest.raises(ValueError):
+        sm.write_block(student(7))
+
+    sm._drop_index("Student", "StudentID", "btree")
+    assert sm.explain(lookup).access_path == "full_scan"
+    sm.write_block(student(7))
+    assert len(sm.read_block(lookup)) == 2
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from conftest import student
+from storagemanager_helper.external_sort import SORT_DIRNAME
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_join import DataJoin
+from storagemanager_model.data_retrieval import DataRetrieval
+
+METHODS = ["index_nested_loop", "hash", "sort_merge"]
+
+
+def table_rows(sm, table, conditions=()):
+    return [{f"{table}.{column}": value for column, value in row.items()}
+            for row in sm.read_block(DataRetrieval(table, "*", list(conditions)))]
+
+
+def nested_loop(left, right, left_column, right_column):
+    return [{**l, **r} for l in left for r in right if l[left_column] == r[right_column]]
+
+
+def canon(rows):
+    return sorted(tuple(sorted(row.items())) for row in rows)
+
+
+@pytest.fixture
+def sm(make_sm):
+    sm = make_sm(students=300, courses=20, attends=800)
+    sm._set_index("Attends", ["StudentID", "CourseID"], "btree")
+    sm._set_index("Course", "CourseID", "hash")
+    return sm
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_methods_match_a_nested_loop(sm, method):
+    expected = nested_loop(table_rows(sm, "Student"), table_rows(sm, "Attends"), "Student.StudentID", "Attends.StudentID")
+    got = list(sm.join_block(DataJoin("Student", "Attends", "StudentID", "StudentID", method=method)))
+    assert canon(got) == canon(expected)
+    if method == "sort_merge":
+        assert [row["Student.StudentID"] for row in got] == sorted(row["Student.StudentID"] for row in got)
+
+    conditions = dict(left_conditions=[Condition("GPA", ">", 3.0)], right_conditions=[Condition("CourseID", "<", 10)])
+    expected = nested_loop(table_rows(sm, "Student", conditions["left_conditions"]),
+                           table_rows(sm, "Attends", conditions["right_conditions"]),
+                           "Student.StudentID", "Attends.StudentID")
+    got = sm.join_block(DataJoin("Student", "Attends", "StudentID", "StudentID", method=method, **conditions))
+    assert canon(got) == canon(expected)
+
+
+@pytest.mark.parametrize("method", [None, "hash", "sort_merge"])
+def test_three_way_join_with_projection(sm, method):
+    inner = DataJoin("Student", "Attends", "StudentID", "StudentID")
+    columns = ["Student.FullName", "Course.CourseName"]
+    expected = [{column: row[column] for column in columns} for row in nested_loop(
+        nested_loop(table_rows(sm, "Student"), table_rows(sm, "Attends"), "Student.StudentID", "Attends.StudentID"),
+        table_rows(sm, "Course"), "Attends.CourseID", "Course.CourseID")]
+    got = sm.join_block(DataJoin(inner, "Course", "Attends.CourseID", "CourseID", columns=columns, method=method))
+    assert canon(got) == canon(expected)
+
+
+def test_hash_join_spills_within_memory_and_cleans_up(sm):
+    expected = nested_loop(table_rows(sm, "Student"), table_rows(sm, "Attends"), "Student.StudentID", "Attends.StudentID")
+    got = sm.join_block(DataJoin("Student", "Attends", "StudentID", "StudentID", method="hash"), memory_bytes=2000)
+    assert canon(got) == canon(expected)
+    assert os.listdir(os.path.join(sm.base_path, SORT_DIRNAME)) == []
+
+
+def test_writes_between_batches_do_not_block(sm):
+    rows = sm.join_block(DataJoin("Student", "Attends", "StudentID", "StudentID", method="hash"))
+    next(rows)
+    sm.write_block(student(9000))
+    rows.close()
+
+
+@pytest.mark.parametrize("data_join", [
+    DataJoin("Nope", "Attends", "StudentID", "StudentID"),
+    DataJoin("Student", "Attends", "Nope", "StudentID"),
+    DataJoin("Student", "Attends", "StudentID", "StudentID", columns=["GPA"]),
+    DataJoin("Student", "Attends", "StudentID", "StudentID", method="nested"),
+    DataJoin("Student", "Attends", "StudentID", "Nope"),
+])
+def test_invalid_joins_are_rejected(sm, data_join):
+    with pytest.raises(ValueError):
+        sm.join_block(data_join)
@@ -0,0 +1,63 @@
+import threading
+
+from conftest import student
+from storagemanager_helper.locking import LockManager, PAGE_LATCH_STRIPES
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def test_page_latches_are_bounded():
+    locks = LockManager()
+    latches = {id(locks.page("Student", page_id)) for page_id in range(100000)}
+    assert len(latches) <= PAGE_LATCH_STRIPES
+    assert locks.page("Student", 7) is locks.page("Student", 7)
+
+
+def test_concurrent_writers_and_readers_keep_indexes_consistent(make_sm):
+    sm = make_sm()
+    sm._set_index("Student", "StudentID", "hash")
+    sm._set_index("Student", "GPA", "btree")
+    errors = []
+
+    def guarded(fn):
+        def run():
+            try:
+                fn()
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+        return run
+
+    def writer(worker):
+        for i in range(60):
+            student_id = 1000 + worker * 100 + i
+            sm.write_block(student(student_id, gpa=2.5))
+            if i % 10 == 0:
+                sm.write_block(DataWrite("Student", ["GPA"], [Condition("StudentID", "=", student_id)], {"GPA": 3.9}))
+            if i % 15 == 0:
+                sm.delete_block(DataDeletion("Student", [Condition("StudentID", "=", student_id - 1)]))
+
+    def reader():
+        for i in range(60):
+            sm.read_block(DataRetrieval("Student", "*", []))
+            sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", 1000 + i)]))
+            sm.read_block(DataRetrieval("Student", "*", [Condition("GPA", ">=", 3.0)]))
+            sm.get_stats("Student")
+
+    threads = [threading.Thread(target=guarded(lambda w=w: writer(w))) for w in range(4)]
+    threads += [threading.Thread(target=guarded(reader)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not errors, errors
+
+    rows = sm.read_block(DataRetrieval("Student", "*", []))
+    # Each writer deletes rows it inserted at i = 15, 30 and 45
+    assert len(rows) == 200 + 4 * 60 - 4 * 3
+    for row in rows:
+        assert sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", row["StudentID"])])) == [row]
+    expected = sorted(map(repr, (row for row in rows if row["GPA"] >= 3.0)))
+    assert sorted(map(repr, sm.read_block(DataRetrieval("Student", "*", [Condition("GPA", ">=", 3.0)])))) == expected
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from conftest import student
+from storagemanager_helper.slotted_page import PAGE_SIZE
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def page_count(sm, table):
+    return os.path.getsize(sm._get_table_file_path(table)) // PAGE_SIZE
+
+
+def counters(sm, operation):
+    return sm.metrics()["operations"][operation]["counters"]
+
+
+def test_read_counts_pages_and_rows_of_a_full_scan(make_sm):
+    sm = make_sm(students=1000)
+    rows = sm.read_block(DataRetrieval("Student", "*", [Condition("GPA", ">", 3.5)]))
+
+    read = counters(sm, "read_block")
+    assert read["pages_read"] == page_count(sm, "Student")
+    assert read["bytes_read"] == read["pages_read"] * PAGE_SIZE
+    assert read["rows_deserialized"] == 1000
+    assert read["rows_matched"] == len(rows)
+    assert read["pages_written"] == 0
+    assert sm.metrics()["tables"]["Student"]["calls"] == {"read_block": 1}
+
+
+def test_writes_count_pages_written(make_sm):
+    sm = make_sm(students=1000)
+    sm.write_block(student(5001))
+    insert = counters(sm, "write_block")
+    assert insert["pages_written"] >= 1
+    assert insert["bytes_written"] == insert["pages_written"] * PAGE_SIZE
+
+    sm.metrics(reset=True)
+    sm.write_block(DataWrite("Student", "GPA", [Condition("StudentID", "<", 10)], 1.0))
+    update = counters(sm, "write_block")
+    assert update["rows_matched"] == 9
+    assert update["pages_read"] == page_count(sm, "Student")
+    assert update["pages_written"] == 1
+
+
+def test_index_lookup_probes_instead_of_scanning(make_sm):
+    sm = make_sm(students=1000)
+    sm._set_index("Student", "StudentID", "hash")
+    sm.metrics(reset=True)
+
+    assert len(sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", 500)]))) == 1
+    read = counters(sm, "read_block")
+    assert read["index_probes"] == 1
+    assert read["pages_read"] == 1
+    assert read["rows_deserialized"] == 1
+
+
+def test_trace_hook_errors_and_disabled_collection(make_sm, open_sm):
+    traces = []
+    sm = make_sm(trace_hook=traces.append)
+    sm.read_block(DataRetrieval("Course", "*", []))
+    with pytest.raises(ValueError):
+        sm.read_block(DataRetrieval("Missing", "*", []))
+
+    assert [(trace.operation, trace.table) for trace in traces] == [("read_block", "Course"), ("read_block", "Missing")]
+    assert traces[0].counters["rows_deserialized"] == 20
+    assert traces[1].error is not None
+    snapshot = sm.metrics(reset=True)["operations"]["read_block"]
+    assert (snapshot["calls"], snapshot["errors"], snapshot["latency"]["count"]) == (2, 1, 2)
+    assert sm.metrics() == {"operations": {}, "tables": {}}
+
+    quiet = open_sm(sm.base_path, collect_metrics=False)
+    quiet.read_block(DataRetrieval("Course", "*", []))
+    assert quiet.metrics() == {"operations": {}, "tables": {}}
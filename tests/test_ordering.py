@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from storagemanager_helper.ordering import RowCollector
+from storagemanager_helper.predicate import match_all
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [None, 1, 25, 500])
+def test_row_collector_matches_a_stable_sort(descending, limit):
+    rng = random.Random(3)
+    rows = [{"id": i, "v": rng.choice([None, *range(20)])} for i in range(300)]
+    collector = RowCollector("v", descending, limit)
+    collector.extend(rows)
+
+    # NULL first ascending, last descending; ties keep scan order either way
+    present = [row for row in rows if row["v"] is not None]
+    nulls = [row for row in rows if row["v"] is None]
+    if descending:
+        expected = sorted(present, key=lambda row: -row["v"]) + nulls
+    else:
+        expected = nulls + sorted(present, key=lambda row: row["v"])
+    assert collector.rows() == expected[:limit]
+
+
+def test_row_collector_without_order_keeps_the_first_rows():
+    collector = RowCollector(limit=3)
+    for i in range(3):
+        assert not collector.full
+        collector.append({"id": i})
+    assert collector.full
+    assert collector.rows() == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+def check(sm, columns, conditions, order_by, descending, limit):
+    matching = [row for row in sm.read_block(DataRetrieval("Student", "*", [])) if match_all(row, conditions)]
+    expected = sorted(matching, key=lambda row: row[order_by], reverse=descending)[:limit]
+    rows = sm.read_block(DataRetrieval("Student", columns, conditions, order_by, descending, limit))
+
+    # Rows tied on order_by may come in either order
+    assert [row[order_by] for row in rows] == [row[order_by] for row in expected]
+    by_id = {row["StudentID"]: row for row in matching}
+    assert len({row["StudentID"] for row in rows}) == len(rows)
+    assert all(by_id[row["StudentID"]] == row for row in rows)
+    if limit is None:
+        assert len(rows) == len(matching)
+
+
+QUERIES = [
+    ([], "GPA", False, None),
+    ([], "GPA", True, 10),
+    ([Condition("StudentID", ">", 1000)], "GPA", False, 50),
+    ([Condition("GPA", ">=", 3.5)], "GPA", True, 20),
+    ([Condition("GPA", "<", 2.5)], "StudentID", True, None),
+]
+
+
+@pytest.mark.parametrize("indexes", [[], ["GPA"], ["GPA", "StudentID"]], ids=["scan", "gpa", "both"])
+@pytest.mark.parametrize("conditions, order_by, descending, limit", QUERIES)
+def test_ordered_reads_match_a_sorted_full_scan(make_sm, indexes, conditions, order_by, descending, limit):
+    sm = make_sm(students=2000)
+    for column in indexes:
+        sm._set_index("Student", column, "btree")
+    check(sm, "*", conditions, order_by, descending, limit)
+
+
+def test_parallel_scans_and_projections(make_sm):
+    sm = make_sm(students=3000, parallel_workers=2)
+    check(sm, "*", [Condition("GPA", ">", 3.0)], "GPA", True, 15)
+
+    # The order column is fetched for sorting and left out of the result
+    gpas = {row["StudentID"]: row["GPA"] for row in sm.read_block(DataRetrieval("Student", "*", []))}
+    rows = sm.read_block(DataRetrieval("Student", ["StudentID"], [], "GPA", False, 5))
+    assert all(set(row) == {"StudentID"} for row in rows)
+    assert [gpas[row["StudentID"]] for row in rows] == sorted(gpas.values())[:5]
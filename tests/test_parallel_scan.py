@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from storagemanager_helper.slotted_page import PAGE_SIZE
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+@pytest.fixture
+def sms(make_db, open_sm):
+    base_path = make_db(students=3000)
+    serial = open_sm(base_path)
+    parallel = open_sm(base_path, parallel_workers=2)
+    table_path = serial._get_table_file_path("Student")
+    assert parallel._parallel_page_count(table_path) == os.path.getsize(table_path) // PAGE_SIZE
+    return serial, parallel
+
+
+@pytest.mark.parametrize("columns, conditions", [
+    ("*", []),
+    (["StudentID", "GPA"], [Condition("GPA", ">=", 3.0)]),
+    (["FullName"], [Condition("StudentID", ">", 1000), Condition("StudentID", "<=", 2500)]),
+])
+def test_parallel_scan_matches_a_serial_scan(sms, columns, conditions):
+    serial, parallel = sms
+    expected = serial.read_block(DataRetrieval("Student", columns, conditions))
+    assert parallel.read_block(DataRetrieval("Student", columns, conditions)) == expected
+
+
+def test_parallel_stats_and_index_builds_match_serial(sms):
+    serial, parallel = sms
+    assert vars(parallel.get_stats("Student")) == vars(serial.get_stats("Student"))
+
+    parallel._set_index("Student", "StudentID", "btree")
+    full_scan = serial.read_block(DataRetrieval("Student", "*", []))
+    in_range = parallel.read_block(DataRetrieval("Student", "*", [Condition("StudentID", ">", 2900)]))
+    assert sorted(in_range, key=lambda row: row["StudentID"]) == [row for row in full_scan if row["StudentID"] > 2900]
@@ -0,0 +1,125 @@
+import pytest
+
+from conftest import student
+from storagemanager_helper.predicate import compare
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_aggregation import DataAggregation
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def matching(sm, *conditions):
+    return sm.read_block(DataRetrieval("Student", "*", list(conditions)))
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "wal"])
+def wal(request):
+    return request.param
+
+
+@pytest.mark.parametrize("pages_per_segment", [1, 4])
+def test_bloom_filter_skips_pages_and_stays_current(make_sm, open_sm, wal, pages_per_segment):
+    sm = make_sm(students=3000, wal=wal)
+    sm.set_bloom_filter("Student", "StudentID", pages_per_segment=pages_per_segment)
+
+    plan = sm.explain(DataRetrieval("Student", "*", [Condition("StudentID", "=", 99999)]), analyze=True)
+    assert plan.access_path == "bloom_scan"
+    assert plan.actual["rows_returned"] == 0
+    assert plan.actual["pages_read"] <= 2 * pages_per_segment
+    plan = sm.explain(DataRetrieval("Student", "*", [Condition("StudentID", "=", 1234)]), analyze=True)
+    assert plan.actual["rows_returned"] == 1
+    assert plan.actual["pages_read"] <= 2 * pages_per_segment + 1
+
+    sm.write_block(student(77777))
+    sm.write_block(DataWrite("Student", ["StudentID"], [Condition("StudentID", "=", 500)], {"StudentID": 88888}))
+    with sm.batch() as batch:
+        batch.write_block(student(66666))
+    for student_id in (77777, 88888, 66666):
+        assert len(matching(sm, Condition("StudentID", "=", student_id))) == 1
+    assert matching(sm, Condition("StudentID", "=", 500)) == []
+
+    sm.metrics(reset=True)
+    assert sm.delete_block(DataDeletion("Student", [Condition("StudentID", "=", 66666)])) == 1
+    assert sm.metrics()["operations"]["delete_block"]["counters"]["pages_skipped"] > 0
+    sm.close()
+
+    reopened = open_sm(sm.base_path)
+    assert reopened.bloom_filter_manager.get_filter("Student", "StudentID") is not None
+    assert len(matching(reopened, Condition("StudentID", "=", 77777))) == 1
+
+
+def test_vacuum_clears_bits_of_removed_values(make_sm):
+    sm = make_sm(students=3000)
+    sm.set_bloom_filter("Student", "StudentID")
+    before = sorted(map(repr, matching(sm, Condition("StudentID", ">", 1500))))
+    sm.delete_block(DataDeletion("Student", [Condition("StudentID", "<=", 1500)]))
+
+    def set_bits():
+        bloom = sm.bloom_filter_manager.get_filter("Student", "StudentID")
+        return sum(bin(byte).count("1") for segment in bloom.segments for byte in segment)
+
+    bits = set_bits()
+    sm.vacuum("Student")
+    assert set_bits() < bits
+    assert sorted(map(repr, matching(sm))) == before
+    assert len(matching(sm, Condition("StudentID", "=", 2000))) == 1
+
+
+@pytest.mark.parametrize("index_type", [None, "hash", "btree"])
+def test_string_operands_match_like_numbers_on_every_path(make_sm, index_type):
+    sm = make_sm(students=3000)
+    sm.set_bloom_filter("Student", "StudentID")
+    sm.set_zone_map("Student", ["StudentID", "GPA"])
+    if index_type is not None:
+        sm._set_index("Student", "StudentID", index_type)
+    full_scan = matching(sm)
+
+    for operation, operand in [("=", "500"), ("=", "99999"), ("<", "40"), (">=", "2950")]:
+        expected = [row for row in full_scan if compare(row["StudentID"], operation, int(operand))]
+        assert matching(sm, Condition("StudentID", operation, operand)) == expected
+    assert matching(sm, Condition("GPA", ">", "3.9")) == [row for row in full_scan if row["GPA"] > 3.9]
+    count = sm.aggregate_block(DataAggregation("Student", [("COUNT", "*")], [Condition("StudentID", "<", "40")]))
+    assert count == [{"COUNT(*)": 39}]
+
+    assert sm.write_block(DataWrite("Student", "GPA", [Condition("StudentID", "=", "500")], 1.0)) == 1
+    assert [row["GPA"] for row in matching(sm, Condition("StudentID", "=", 500))] == [1.0]
+    assert sm.delete_block(DataDeletion("Student", [Condition("StudentID", "=", "500")])) == 1
+    assert matching(sm, Condition("StudentID", "=", "500")) == []
+
+
+@pytest.mark.parametrize("operation, operand", [("=", 2500), ("<", 40), ("<=", 40), (">", 2950), (">=", 2950)])
+def test_zone_map_skips_pages_outside_the_range(make_sm, wal, operation, operand):
+    sm = make_sm(students=3000, wal=wal)
+    expected = sorted(map(repr, matching(sm, Condition("StudentID", operation, operand))))
+    sm.set_zone_map("Student", "StudentID")
+
+    retrieval = DataRetrieval("Student", "*", [Condition("StudentID", operation, operand)])
+    plan = sm.explain(retrieval, analyze=True)
+    assert plan.access_path == "zone_map_scan"
+    assert sorted(map(repr, sm.read_block(retrieval))) == expected
+    assert plan.actual["pages_read"] <= 3
+
+
+def test_zone_map_widens_on_writes_and_tightens_on_vacuum(make_sm, open_sm, wal):
+    sm = make_sm(students=3000, wal=wal)
+    sm.set_zone_map("Student", ["StudentID", "GPA"])
+
+    # Moving a row's key far outside its page's range must still find it
+    sm.write_block(DataWrite("Student", ["StudentID"], [Condition("StudentID", "=", 10)], {"StudentID": 90000}))
+    sm.write_block(student(80000))
+    assert len(matching(sm, Condition("StudentID", "=", 90000))) == 1
+    assert len(matching(sm, Condition("StudentID", ">=", 80000))) == 2
+    assert matching(sm, Condition("StudentID", "=", 10)) == []
+    # Conditions on unmapped operations still see every page
+    assert len(matching(sm, Condition("StudentID", "<>", 90000))) == 3000
+
+    sm.delete_block(DataDeletion("Student", [Condition("StudentID", ">=", 80000)]))
+    sm.vacuum("Student")
+    zones = sm.zone_map_manager.get_zone_map("Student").zones
+    assert max(zone[0][1] for zone in zones if zone is not None) == 3000
+    sm.close()
+
+    reopened = open_sm(sm.base_path)
+    plan = reopened.explain(DataRetrieval("Student", "*", [Condition("StudentID", "=", 2000)]), analyze=True)
+    assert plan.access_path == "zone_map_scan" and plan.actual["rows_returned"] == 1
@@ -0,0 +1,87 @@
+import threading
+
+from conftest import course, student
+from storagemanager_helper.result_cache import ResultCache, retrieval_key
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+QUERY = DataRetrieval("Student", ["StudentID", "FullName"], [Condition("GPA", ">", 2.5), Condition("StudentID", "<", 50)])
+
+
+def counters(sm):
+    return sm.metrics()["operations"]["read_block"]["counters"]
+
+
+def test_equivalent_retrievals_share_an_entry_and_rows_are_private(make_sm):
+    sm = make_sm(result_cache_bytes=1 << 20)
+    first = sm.read_block(QUERY)
+    reordered = DataRetrieval("Student", ["StudentID", "FullName"],
+                              [Condition("StudentID", "<", 50), Condition("GPA", ">", 2.5)])
+    second = sm.read_block(reordered)
+    assert second == first
+    assert counters(sm)["result_cache_hits"] == 1 and counters(sm)["result_cache_misses"] == 1
+
+    second[0]["FullName"] = "changed"
+    assert sm.read_block(QUERY) == first
+
+
+def test_every_kind_of_write_invalidates_only_its_table(make_sm):
+    sm = make_sm(result_cache_bytes=1 << 20)
+    baseline = len(sm.read_block(QUERY))
+
+    sm.write_block(student(0))
+    assert len(sm.read_block(QUERY)) == baseline + 1
+    sm.write_block(DataWrite("Student", ["GPA"], [Condition("StudentID", "=", 0)], {"GPA": 1.0}))
+    assert len(sm.read_block(QUERY)) == baseline
+    with sm.batch() as batch:
+        batch.write_block(DataWrite("Student", ["GPA"], [Condition("StudentID", "=", 0)], {"GPA": 4.0}))
+    assert len(sm.read_block(QUERY)) == baseline + 1
+    sm.delete_block(DataDeletion("Student", [Condition("StudentID", "=", 0)]))
+    assert len(sm.read_block(QUERY)) == baseline
+
+    hits = counters(sm)["result_cache_hits"]
+    sm.write_block(course(9000))
+    sm.read_block(QUERY)
+    assert counters(sm)["result_cache_hits"] == hits + 1
+
+    sm.cluster("Student", "FullName")
+    everything = DataRetrieval("Student", "*", [])
+    assert sm.read_block(everything) == sm._read_block(everything)
+
+
+def test_cache_stays_within_budget():
+    cache = ResultCache(2000)
+    for student_id in range(100):
+        key = retrieval_key(DataRetrieval("Student", "*", [Condition("StudentID", "=", student_id)]))
+        cache.put(key, cache.version("Student"), [{"StudentID": student_id, "FullName": "x" * 50}])
+        assert cache.used_bytes <= 2000
+    assert not cache.put(retrieval_key(DataRetrieval("Student", "*", [])), 0, [{"FullName": "x" * 5000}])
+
+
+def test_results_are_never_stale_after_a_write_returns(make_sm):
+    sm = make_sm(result_cache_bytes=1 << 20)
+    lookup = DataRetrieval("Student", ["GPA"], [Condition("StudentID", "=", 1)])
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            sm.read_block(lookup)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    try:
+        for step in range(50):
+            gpa = 2.0 + step / 50
+            sm.write_block(DataWrite("Student", ["GPA"], [Condition("StudentID", "=", 1)], {"GPA": gpa}))
+            got = sm.read_block(lookup)
+            if got != [{"GPA": round(gpa, 2)}]:
+                errors.append((gpa, got))
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+    assert not errors, errors[:3]
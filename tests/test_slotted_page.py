@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from storagemanager_helper.row_serializer import RowSerializer
+from storagemanager_helper.schema_manager import SchemaManager
+from storagemanager_helper.slotted_page import (
+    PAGE_SIZE, SlottedPage, SlottedPageView, iter_page_views, read_page_view
+)
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def scan_table(base_path, table):
+    """Every row of a table, decoded page by page with a mutable SlottedPage."""
+    schema = SchemaManager(base_path)
+    schema.load_schemas()
+    schema = schema.get_table_schema(table)
+    serializer = RowSerializer()
+    rows = []
+    with open(os.path.join(base_path, f"{table}.dat"), "rb") as f:
+        while True:
+            page_bytes = f.read(PAGE_SIZE)
+            if not page_bytes:
+                break
+            page = SlottedPage()
+            page.load(page_bytes)
+            rows.extend(serializer.deserialize(schema, page.get_record(i)) for i in range(page.record_count))
+    return rows
+
+
+def test_view_reads_what_the_page_wrote():
+    page = SlottedPage()
+    records = [bytes([i]) * (i + 1) for i in range(20)]
+    for i, record in enumerate(records):
+        assert page.add_record(record) == i
+
+    view = SlottedPageView(page.serialize())
+    assert view.record_count == len(records)
+    assert [bytes(record) for _, record in view.iter_records()] == records
+    assert bytes(view.get_record(7)) == records[7]
+    with pytest.raises(IndexError):
+        view.get_slot(len(records))
+
+    copy = view.to_page()
+    assert [copy.get_record(i) for i in range(copy.record_count)] == records
+
+
+def test_page_views_match_a_plain_decode(make_db):
+    base_path = make_db(students=500)
+    table_path = os.path.join(base_path, "Student.dat")
+    with open(table_path, "rb") as f:
+        plain = []
+        for page_id in range(os.path.getsize(table_path) // PAGE_SIZE):
+            f.seek(page_id * PAGE_SIZE)
+            page = SlottedPage()
+            page.load(f.read(PAGE_SIZE))
+            plain.append([page.get_record(i) for i in range(page.record_count)])
+
+        f.seek(0)
+        viewed = [[bytes(record) for _, record in view.iter_records()] for _, view in iter_page_views(f)]
+        assert viewed == plain
+        assert [bytes(record) for _, record in read_page_view(f, 1).iter_records()] == plain[1]
+
+
+@pytest.mark.parametrize("index_type", [None, "hash", "btree"])
+def test_reads_match_a_full_scan(make_db, open_sm, index_type):
+    base_path = make_db(students=500)
+    sm = open_sm(base_path)
+    if index_type is not None:
+        sm._set_index("Student", "StudentID", index_type)
+    rows = scan_table(base_path, "Student")
+
+    assert sm.read_block(DataRetrieval("Student", "*", [])) == rows
+    lookup = sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", 321)]))
+    assert lookup == [row for row in rows if row["StudentID"] == 321]
+    if index_type != "hash":
+        in_range = sm.read_block(DataRetrieval("Student", ["StudentID"], [Condition("StudentID", ">", 480)]))
+        assert sorted(row["StudentID"] for row in in_range) == list(range(481, 501))
+
+
+def test_update_rewrites_only_matching_pages(make_db, open_sm):
+    base_path = make_db(students=500)
+    sm = open_sm(base_path)
+    before = scan_table(base_path, "Student")
+
+    sm.write_block(DataWrite("Student", "GPA", [Condition("StudentID", "<", 5)], 1.5))
+    after = scan_table(base_path, "Student")
+    assert after == [dict(row, GPA=1.5) if row["StudentID"] < 5 else row for row in before]
+    assert sm.read_block(DataRetrieval("Student", "*", [])) == after
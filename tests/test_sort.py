@@ -0,0 +1,40 @@
+import os
+import random
+
+import pytest
+
+from storagemanager_helper.external_sort import ExternalSorter, SORT_DIRNAME
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_external_sorter_spills_and_merges_stably(tmp_path, reverse):
+    items = [(random.Random(i).randint(0, 50), i) for i in range(20000)]
+    sort_path = str(tmp_path / "sort")
+    with ExternalSorter(sort_path, key=lambda item: item[0], reverse=reverse, memory_bytes=20000, max_fan_in=3) as sorter:
+        sorter.extend(items)
+        got = list(sorter)
+        assert sorter.runs_written > 10
+    assert got == sorted(items, key=lambda item: item[0], reverse=reverse)
+    assert os.listdir(sort_path) == []
+
+
+@pytest.mark.parametrize("columns, conditions, order_by, descending", [
+    ("*", [], "FullName", False),
+    (["StudentID"], [Condition("GPA", ">", 3.0)], "FullName", True),
+    ("*", [], "GPA", True),
+])
+def test_sort_block_matches_an_in_memory_sort(make_sm, columns, conditions, order_by, descending):
+    sm = make_sm(students=5000, sort_memory_bytes=64 * 1024)
+    retrieval = DataRetrieval("Student", columns, conditions, order_by, descending)
+    got = list(sm.sort_block(retrieval))
+    assert sm.metrics()["operations"]["sort_block"]["counters"]["sort_runs"] > 1
+
+    rows = sm.read_block(DataRetrieval("Student", "*", conditions))
+    keys = sorted((row[order_by] for row in rows), reverse=descending)
+    assert len(got) == len(rows)
+    if order_by in (columns if columns != "*" else [order_by]):
+        assert [row[order_by] for row in got] == keys
+    assert got == sm.read_block(retrieval)
+    assert os.listdir(os.path.join(sm.base_path, SORT_DIRNAME)) == []
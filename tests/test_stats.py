@@ -0,0 +1,124 @@
+import random
+import threading
+from collections import Counter
+
+from conftest import course, student
+from storagemanager_helper.histogram import ColumnHistogram
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_retrieval import DataRetrieval
+
+
+def test_save_stats_locks_one_table_at_a_time(make_sm):
+    sm = make_sm()
+    sm.analyze()
+    sm.write_block(course(9000))
+
+    # A long-running writer holds the last table in lock order
+    sm.locks.table("Student").acquire_write()
+    saver = threading.Thread(target=sm.save_stats, daemon=True)
+    try:
+        saver.start()
+        inserter = threading.Thread(target=sm.write_block, args=(course(9001),), daemon=True)
+        inserter.start()
+        inserter.join(5)
+        assert not inserter.is_alive(), "save_stats held up a write to another table"
+    finally:
+        sm.locks.table("Student").release_write()
+    saver.join(5)
+    assert not saver.is_alive()
+
+
+def test_saved_stats_survive_concurrent_writes(make_sm, open_sm):
+    sm = make_sm(stats_save_interval=5)
+    sm.analyze()
+
+    def insert(first):
+        for student_id in range(first, first + 100):
+            sm.write_block(student(student_id))
+
+    threads = [threading.Thread(target=insert, args=(first,)) for first in (10000, 20000)]
+    threads.append(threading.Thread(target=lambda: [sm.save_stats() for _ in range(20)]))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sm.close()
+
+    reopened = open_sm(sm.base_path)
+    assert reopened.get_stats("Student").n_r == len(reopened.read_block(DataRetrieval("Student", "*", [])))
+
+
+def test_exact_counts_fall_back_to_sketch_past_the_cap(make_sm, open_sm):
+    sm = make_sm(students=2000, stats_max_exact_distinct=100)
+    sm.analyze("Student")
+    table_stats = sm.stats_catalog.get("Student")
+    assert "StudentID" in table_stats.capped
+    assert all(len(counts) <= 100 for counts in table_stats.value_counts.values())
+
+    for student_id in range(10000, 10100):
+        sm.write_block(student(student_id))
+    assert abs(sm.get_stats("Student").v_a_r["StudentID"] - 2100) < 2100 * 0.05
+    sm.close()
+
+    reopened = open_sm(sm.base_path, stats_max_exact_distinct=100)
+    assert "StudentID" in reopened.stats_catalog.get("Student").capped
+    assert reopened.get_stats("Student").n_r == 2100
+
+
+def test_sampled_histogram_does_not_rule_out_unseen_values():
+    histogram = ColumnHistogram.build(Counter(range(100, 200)), sampled=True)
+    for operation, value in (("=", 5), ("=", 500), ("<", 50), (">", 500)):
+        assert histogram.selectivity(operation, value, distinct=1000, rows=1000) > 0
+    assert histogram.selectivity("=", 5, distinct=1000, rows=1000) == 1 / 1000
+    assert histogram.selectivity("<", 500, distinct=1000, rows=1000) == 1 - 1 / 1000
+    assert histogram.selectivity(">", 500, distinct=1000, rows=1000) == 1 / 1000
+
+    exact = ColumnHistogram.build(Counter(range(100, 200)))
+    assert exact.selectivity("=", 5) == 0.0
+    assert exact.selectivity("<", 50) == 0.0
+
+
+def test_sampled_analyze_estimates_values_outside_the_sample(make_sm, open_sm):
+    sm = make_sm(students=5000, stats_mode="sketch", stats_sample_rate=0.3, stats_max_sample_pages=5)
+    random.seed(1)
+    sm.analyze("Student")
+    histogram = sm.stats_catalog.get("Student").histograms["StudentID"]
+    assert histogram.sampled
+    low, high = histogram.bounds[0], histogram.bounds[-1]
+    assert low > 1 or high < 5000
+
+    outside = 1 if low > 1 else 5000
+    n_r = sm.get_stats("Student").n_r
+    assert sm.estimate_selectivity("Student", Condition("StudentID", "=", outside)) > 0
+    assert sm.estimate_selectivity("Student", Condition("StudentID", "<", low)) >= 1 / n_r
+    assert sm.estimate_selectivity("Student", Condition("StudentID", ">", high)) >= 1 / n_r
+    sm.close()
+
+    reopened = open_sm(sm.base_path, stats_mode="sketch")
+    assert reopened.stats_catalog.get("Student").histograms["StudentID"].sampled
+
+
+def test_extremes_are_exact_after_a_full_scan_and_widen_on_insert(make_sm, open_sm):
+    sm = make_sm(students=1000, stats_mode="sketch")
+    sm.analyze("Student")
+    assert sm.stats_catalog.get("Student").extremes["StudentID"] == [1, 1000]
+    assert sm.estimate_selectivity("Student", Condition("StudentID", "=", 5000)) == 0.0
+
+    sm.write_block(student(5000))
+    assert sm.stats_catalog.get("Student").extremes["StudentID"] == [1, 5000]
+    assert sm.estimate_selectivity("Student", Condition("StudentID", "=", 5000)) > 0
+    assert sm.estimate_selectivity("Student", Condition("StudentID", ">", 5000)) == 0.0
+    assert sm.estimate_selectivity("Student", Condition("StudentID", "<", 5001)) == 1.0
+    sm.close()
+
+    reopened = open_sm(sm.base_path, stats_mode="sketch")
+    assert reopened.stats_catalog.get("Student").extremes["StudentID"] == [1, 5000]
+
+
+def test_sampled_analyze_records_no_extremes(make_sm):
+    sm = make_sm(students=5000, stats_mode="sketch", stats_sample_rate=0.3, stats_max_sample_pages=5)
+    sm.analyze("Student")
+    table_stats = sm.stats_catalog.get("Student")
+    assert table_stats.extremes == {}
+    sm.write_block(student(9000))
+    assert table_stats.extremes == {}
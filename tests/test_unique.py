@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import student
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def rows(sm, student_id):
+    return sm.read_block(DataRetrieval("Student", "*", [Condition("StudentID", "=", student_id)]))
+
+
+def table_bytes(sm):
+    with open(sm._get_table_file_path("Student"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "wal"])
+def sm(request, make_sm):
+    sm = make_sm(wal=request.param)
+    sm._set_index("Student", "StudentID", "hash", unique=True)
+    return sm
+
+
+def test_duplicate_insert_and_update_are_rejected_before_writing(sm):
+    before = table_bytes(sm)
+    with pytest.raises(ValueError):
+        sm.write_block(student(1))
+    assert table_bytes(sm) == before
+
+    sm.write_block(student(9000))
+    before = table_bytes(sm)
+    with pytest.raises(ValueError):
+        sm.write_block(DataWrite("Student", ["StudentID"], [Condition("StudentID", "=", 9000)], {"StudentID": 2}))
+    with pytest.raises(ValueError):
+        # Several rows updated to one key
+        sm.write_block(DataWrite("Student", ["StudentID"], [Condition("StudentID", "<", 5)], {"StudentID": 8000}))
+    assert table_bytes(sm) == before
+    assert len(rows(sm, 2)) == 1
+
+
+def test_rewriting_own_key_and_reinserting_deleted_keys_are_allowed(sm):
+    assert sm.write_block(DataWrite("Student", ["StudentID", "FullName"], [Condition("StudentID", "=", 3)],
+                                    {"StudentID": 3, "FullName": "Same"})) == 1
+    sm.delete_block(DataDeletion("Student", [Condition("StudentID", "=", 4)]))
+    sm.write_block(student(4, gpa=1.5))
+    assert [row["GPA"] for row in rows(sm, 4)] == [1.5]
+
+
+def test_batches_check_keys_they_claim_and_free(sm):
+    with pytest.raises(ValueError):
+        with sm.batch() as batch:
+            batch.write_block(student(9100))
+            batch.write_block(student(9100))
+    assert rows(sm, 9100) == []
+
+    with sm.batch() as batch:
+        batch.delete_block(DataDeletion("Student", [Condition("StudentID", "=", 5)]))
+        batch.write_block(student(5, gpa=1.5))
+        batch.write_block(student(9200))
+        batch.write_block(DataWrite("Student", ["StudentID"], [Condition("StudentID", "=", 9200)], {"StudentID": 9201}))
+        batch.write_block(student(9200))
+    assert [row["GPA"] for row in rows(sm, 5)] == [1.5]
+    assert len(rows(sm, 9200)) == 1 and len(rows(sm, 9201)) == 1
+
+
+def test_unique_index_needs_distinct_data_and_survives_reopen(make_sm, open_sm):
+    sm = make_sm()
+    sm.write_block(student(9000))
+    sm.write_block(student(9000))
+    with pytest.raises(ValueError):
+        sm._set_index("Student", "StudentID", "btree", unique=True)
+    assert sm.bplus_tree_index_manager.list_indexes("Student") == []
+
+    sm.delete_block(DataDeletion("Student", [Condition("StudentID", "=", 9000)]))
+    sm._set_index("Student", "StudentID", "btree", unique=True)
+    sm.close()
+
+    reopened = open_sm(sm.base_path)
+    assert reopened.bplus_tree_index_manager.is_unique("Student", "StudentID")
+    with pytest.raises(ValueError):
+        reopened.write_block(student(7))
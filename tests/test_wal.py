@@ -0,0 +1,84 @@
+import os
+import shutil
+import threading
+
+from StorageManager import StorageManager
+from conftest import course
+from storagemanager_helper.wal import WAL_FILENAME
+from storagemanager_model.condition import Condition
+from storagemanager_model.data_deletion import DataDeletion
+from storagemanager_model.data_retrieval import DataRetrieval
+from storagemanager_model.data_write import DataWrite
+
+
+def all_rows(sm, conditions=()):
+    return sorted(map(repr, sm.read_block(DataRetrieval("Course", "*", list(conditions)))))
+
+
+def crash(sm):
+    # Drop the manager without the checkpoint close() would run
+    sm.wal.close()
+    sm.files.close()
+
+
+def test_recovery_redoes_logged_writes_onto_stale_files(make_db, tmp_path):
+    base_path = make_db()
+    sm = StorageManager(base_path)
+    sm._set_index("Course", "Year", "btree")
+    sm._set_index("Course", "CourseID", "hash")
+    sm.close()
+    snapshot = str(tmp_path / "snapshot")
+    shutil.copytree(base_path, snapshot)
+
+    sm = StorageManager(base_path, wal=True, group_commit_delay=0.001)
+
+    def insert(first):
+        for course_id in range(first, first + 50):
+            sm.write_block(course(course_id, 2030 + course_id % 3))
+
+    threads = [threading.Thread(target=insert, args=(first,)) for first in (1000, 2000, 3000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sm.write_block(DataWrite("Course", ["CourseName"], [Condition("Year", "=", 2031)], {"CourseName": "U"}))
+    sm.delete_block(DataDeletion("Course", [Condition("Year", "=", 2032)]))
+    expected = sm.read_block(DataRetrieval("Course", "*", []))
+    crash(sm)
+
+    # Only the log survives the crash; its last record is torn
+    wal_path = os.path.join(base_path, WAL_FILENAME)
+    with open(wal_path, "rb") as f:
+        log = f.read()
+    assert log
+    shutil.rmtree(base_path)
+    shutil.copytree(snapshot, base_path)
+    with open(wal_path, "wb") as f:
+        f.write(log + b"\x05\x00\x00\x00torn")
+
+    recovered = StorageManager(base_path)
+    try:
+        assert all_rows(recovered) == sorted(map(repr, expected))
+        assert os.path.getsize(wal_path) == 0
+        # Indexes were rebuilt against the redone pages
+        for year in (2030, 2031, 2032):
+            assert all_rows(recovered, [Condition("Year", "=", year)]) == sorted(
+                repr(row) for row in expected if row["Year"] == year
+            )
+        assert len(recovered.read_block(DataRetrieval("Course", "*", [Condition("CourseID", "=", 1000)]))) == 1
+    finally:
+        recovered.close()
+
+
+def test_checkpoint_bounds_the_log(make_sm, open_sm):
+    sm = make_sm(wal=True, checkpoint_bytes=20000)
+    base_path = sm.base_path
+    wal_path = os.path.join(base_path, WAL_FILENAME)
+    for course_id in range(5000, 5030):
+        sm.write_block(course(course_id, 2040))
+        assert os.path.getsize(wal_path) < 20000 + 5000
+    sm.close()
+    assert os.path.getsize(wal_path) == 0
+
+    reopened = open_sm(base_path)
+    assert len(reopened.read_block(DataRetrieval("Course", "*", [Condition("Year", "=", 2040)]))) == 30